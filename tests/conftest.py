@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+# the modules are not installed: import them from the root of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+
+@pytest.fixture(autouse=True)
+def user_profile(tmp_path, monkeypatch):
+    '''Log files and temporary files of xlsxParser (get_log_folder) in the folder of the test.'''
+    monkeypatch.setenv('USERPROFILE', str(tmp_path / 'user'))
+    return tmp_path / 'user'
+
+
+@pytest.fixture
+def sample_xls():
+    '''Legacy .xls workbook with 'Fzg' sheets, colored, struck out and rich text cells.'''
+    return os.path.join(DATA_FOLDER, 'sample.xls')
@@ -0,0 +1,221 @@
+import logging
+import multiprocessing
+import os
+import shutil
+import time
+
+import jpype
+import pandas as pd
+import pytest
+
+import xlsxDataParser
+from xlsxBenchmark import column_letter, make_workbook
+from xlsxDataParser import xlsConverter, xlsDecoder, xlsxDecoder, xlsxParser
+
+OPTIONS = dict(color_valid=['k', 'b'], trigger_metadata='Lfd. Nr.', double_metadata=True, trigger_double_metadata='bemerkung', trace=False)
+
+
+def has_jvm():
+    '''True if a JVM for aspose-cells is installed (xlsConverter).'''
+    try:
+        jpype.getDefaultJVMPath()
+    except Exception:
+        return False
+    return True
+
+
+requires_jvm = pytest.mark.skipif(not has_jvm(), reason='no JVM installed (aspose-cells)')
+requires_fork = pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(),
+                                   reason='the stub of the conversion subprocess needs the fork start method')
+
+
+def get_logger():
+    logger = logging.getLogger('TEST')
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    return logger
+
+
+def get_cell_values(decoder, sheet_nr):
+    '''Values of the cells of a worksheet by cell reference (empty cells left out).'''
+    return {cell_ref: cell["value"] for cell_ref, cell in decoder.decoder(sheet_nr, get_logger()).items() if cell["value"] is not None}
+
+
+def clean_sheets(parser, path):
+    '''Read a workbook and clean every 'Fzg' sheet: sheet -> (df_vehicle, df_pattern).'''
+    return {sheet_name: parser.data_cleaning(df, path, sheet_name) for sheet_name, df in parser.read_data(path).items()}
+
+
+def assert_sheets_equal(result, expected):
+    assert list(result) == list(expected)
+    for sheet_name, (df_vehicle, df_pattern) in expected.items():
+        pd.testing.assert_frame_equal(result[sheet_name][0], df_vehicle)
+        if df_pattern is None:
+            assert result[sheet_name][1] is None
+        else:
+            pd.testing.assert_frame_equal(result[sheet_name][1], df_pattern)
+
+
+N_ROWS, N_COLS = 120, 8
+
+
+def make_workbooks(folder, n_scratch_cols=0):
+    '''Workbooks of the same template with different values (see xlsxBenchmark.make_workbook).'''
+    return [make_workbook(str(folder / f'Ausrüstung_{seed}.xlsx'), n_rows=N_ROWS, n_cols=N_COLS, n_xfs=40, n_sheets=2, seed=seed,
+                          n_scratch_cols=n_scratch_cols) for seed in range(3)]
+
+
+@pytest.fixture(scope='module')
+def workbooks(tmp_path_factory):
+    return make_workbooks(tmp_path_factory.mktemp('workbooks'))
+
+
+@pytest.fixture(scope='module')
+def scratch_workbooks(tmp_path_factory):
+    '''Workbooks with a scratch area (notes) right of the vehicle columns.'''
+    return make_workbooks(tmp_path_factory.mktemp('scratch_workbooks'), n_scratch_cols=5)
+
+
+# --- equivalence of the options of xlsxParser: same frames with the option on and off ---
+
+@pytest.mark.parametrize('options', [
+    dict(layout_cache=True),
+    dict(cell_range='dimension'),
+    dict(layout_cache=True, cell_range='trigger'),
+    dict(xml_engine='expat'),
+], ids=['layout_cache', 'cell_range-dimension', 'cell_range-trigger', 'xml_engine-expat'])
+def test_option_equivalence(workbooks, options):
+    parser = xlsxParser(**OPTIONS, **options)
+    for path in workbooks:      # the later workbooks are read with the learned layout
+        assert_sheets_equal(clean_sheets(parser, path), clean_sheets(xlsxParser(**OPTIONS), path))
+    if options.get('layout_cache'):
+        assert parser.layouts
+
+
+def test_cell_range_trigger_skips_scratch_area(scratch_workbooks):
+    # once the layout is learned the scratch area right of the trigger row is not read: same frames as with the
+    # explicit range of the block
+    block = f'A1:{column_letter(N_COLS + 2)}{N_ROWS + 2}'
+    parser = xlsxParser(layout_cache=True, cell_range='trigger', **OPTIONS)
+    clean_sheets(parser, scratch_workbooks[0])
+    for path in scratch_workbooks[1:]:
+        result = clean_sheets(parser, path)
+        assert_sheets_equal(result, clean_sheets(xlsxParser(cell_range=block, **OPTIONS), path))
+        assert all(len(df_vehicle) == N_COLS for df_vehicle, _ in result.values())
+
+
+def test_decode_workers_equivalence(workbooks, monkeypatch):
+    merged = []
+    merge_partitions = xlsxDecoder.merge_partitions
+    monkeypatch.setattr(xlsxDecoder, 'merge_partitions', lambda self, partitions, parts: merged.append(len(partitions)) or merge_partitions(self, partitions, parts))
+    monkeypatch.setattr(xlsxDecoder, 'partition_size', 2**12)
+    monkeypatch.setattr(xlsxDecoder, 'partition_threshold', 0)
+    parser = xlsxParser(decode_workers=2, **OPTIONS)
+    for path in workbooks:
+        assert_sheets_equal(clean_sheets(parser, path), clean_sheets(xlsxParser(**OPTIONS), path))
+    assert merged and min(merged) >= 2      # the sheets were decoded in row partitions
+
+
+def test_partitioned_store_equivalence(workbooks, monkeypatch):
+    monkeypatch.setattr(xlsxDecoder, 'partition_size', 2**12)
+    monkeypatch.setattr(xlsxDecoder, 'partition_threshold', 0)
+    cell_store = xlsxDecoder(workbooks[0]).decode_columnar(2, get_logger())
+    with xlsxDecoder(workbooks[0], max_workers=2) as decoder:
+        partitioned = decoder.decode_columnar(2, get_logger())
+        assert decoder.executor is not None
+    for name in ('rows', 'columns', 'shared', 'xfs', 'value_ids', 'style_ids', 'type_ids'):
+        assert list(getattr(partitioned, name)) == list(getattr(cell_store, name)), name
+    assert {cell_ref: repr(partitioned[cell_ref]) for cell_ref in partitioned} == {cell_ref: repr(cell_store[cell_ref]) for cell_ref in cell_store}
+
+
+def test_metadata_names_equivalence(workbooks):
+    expected = {path: clean_sheets(xlsxParser(**OPTIONS), path) for path in workbooks}
+    columns = [str(column) for column in expected[workbooks[0]]['Fzg 1'][0].columns[1:-1]]
+    metadata_names = [columns[1], columns[len(columns) // 2].split('$')[-1], columns[-1]]
+    parser = xlsxParser(metadata_names=metadata_names, layout_cache=True, **OPTIONS)
+    for path in workbooks:
+        result = clean_sheets(parser, path)
+        for sheet_name, (df_vehicle, _) in expected[path].items():
+            # all metadata restricted to the wanted columns (the pattern only covers the wanted metadata)
+            df_expected = df_vehicle.iloc[:, [0] + parser.get_projection(df_vehicle.columns)].dropna(how='all').assign(Pfad=df_vehicle['Pfad'])
+            pd.testing.assert_frame_equal(result[sheet_name][0], df_expected)
+    assert parser.projections      # the later workbooks only decoded the rows of the wanted metadata
+
+
+# --- xlsConverter ---
+
+@requires_jvm
+def test_convert_round_trip(tmp_path, sample_xls):
+    with xlsConverter(str(tmp_path / 'cache')) as converter:
+        xlsx_path = converter.convert([sample_xls])[sample_xls]
+    assert not isinstance(xlsx_path, Exception), xlsx_path
+    xls_decoder, xlsx_decoder = xlsDecoder(sample_xls), xlsxDecoder(xlsx_path)
+    xlsx_sheets = xlsx_decoder.get_sheet_names()
+    for sheet_nr, sheet_name in enumerate(xls_decoder.get_sheet_names(), 1):
+        assert get_cell_values(xls_decoder, sheet_nr) == get_cell_values(xlsx_decoder, xlsx_sheets.index(sheet_name) + 1)
+
+
+def serve_stub(connection, marker, mode):
+    '''Conversion subprocess of which the first batch hangs or crashes (marker file not yet written); later batches
+    write empty .xlsx files.'''
+    while True:
+        try:
+            batch = connection.recv()
+        except EOFError:
+            break
+        if batch is None:
+            break
+        if not os.path.exists(marker):
+            open(marker, 'w').close()
+            if mode == 'hang':
+                time.sleep(60)
+            os._exit(1)
+        for _, xlsx_path in batch:
+            open(xlsx_path, 'w').close()
+        connection.send([None] * len(batch))
+
+
+@requires_fork
+@pytest.mark.parametrize('mode', ['hang', 'crash'])
+def test_convert_restarts_after_failure(tmp_path, monkeypatch, mode):
+    context = multiprocessing.get_context('fork')
+    monkeypatch.setattr(xlsxDataParser.multiprocessing, 'Process', context.Process)
+    monkeypatch.setattr(xlsxDataParser.multiprocessing, 'Pipe', context.Pipe)
+    marker = str(tmp_path / 'failed')
+    monkeypatch.setattr(xlsConverter, 'serve', staticmethod(lambda connection: serve_stub(connection, marker, mode)))
+    xls_file_paths = []
+    for id in range(3):
+        xls_file_paths.append(str(tmp_path / f'{id}.xls'))
+        with open(xls_file_paths[-1], 'w') as f:
+            f.write(str(id))
+
+    converter = xlsConverter(str(tmp_path / 'cache'), timeout=0.5, startup_timeout=0.5)
+    start = time.perf_counter()
+    results = converter.convert(xls_file_paths)
+    assert time.perf_counter() - start < 30
+    assert all(isinstance(result, RuntimeError) for result in results.values())
+    assert converter.process is None or not converter.process.is_alive()
+
+    # the next batch starts a new subprocess
+    results = converter.convert(xls_file_paths)
+    converter.close()
+    assert all(isinstance(result, str) and os.path.exists(result) for result in results.values())
+
+
+def test_convert_cached_without_subprocess(tmp_path, sample_xls):
+    converter = xlsConverter(str(tmp_path / 'cache'))
+    os.makedirs(converter.cache_folder)
+    shutil.copyfile(sample_xls, converter.get_cache_path(sample_xls))     # stands in for a converted file
+    assert converter.convert([sample_xls]) == {sample_xls: converter.get_cache_path(sample_xls)}
+    assert converter.process is None
+
+
+# --- xlsDecoder ---
+
+@requires_jvm
+def test_native_xls_equals_conversion(sample_xls):
+    results = {}
+    for native_xls in (True, False):
+        with xlsxParser(native_xls=native_xls, **OPTIONS) as parser:
+            results[native_xls] = clean_sheets(parser, sample_xls)
+    assert_sheets_equal(results[True], results[False])
@@ -0,0 +1,1187 @@
+### IMPORTS ##
+# math, data input
+import random
+
+# debug
+import logging
+
+# system
+import io, os, re, sys, time
+import tempfile
+import warnings
+import tracemalloc
+import zipfile
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from xlsxDataParser import xlsxDecoder, xlsxParser, ParallelPathFinder, TraceFormatter
+
+
+NAMESPACE = {"main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+TRIGGER_METADATA = 'Lfd. Nr.'
+
+# indexed colors of the standard Excel palette (first 16 entries are sufficient for the benchmarks)
+INDEXED_COLORS = ['000000', 'FFFFFF', 'FF0000', '00FF00', '0000FF', 'FFFF00', 'FF00FF', '00FFFF',
+                  '000000', 'FFFFFF', 'FF0000', '00FF00', '0000FF', 'FFFF00', 'FF00FF', '00FFFF']
+
+THEME_XML = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+             '<a:theme xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" name="Office">'
+             '<a:themeElements><a:clrScheme name="Office">'
+             '<a:dk1><a:sysClr val="windowText" lastClr="000000"/></a:dk1>'
+             '<a:lt1><a:sysClr val="window" lastClr="FFFFFF"/></a:lt1>'
+             '<a:dk2><a:srgbClr val="1F497D"/></a:dk2><a:lt2><a:srgbClr val="EEECE1"/></a:lt2>'
+             '<a:accent1><a:srgbClr val="4F81BD"/></a:accent1><a:accent2><a:srgbClr val="C0504D"/></a:accent2>'
+             '<a:accent3><a:srgbClr val="9BBB59"/></a:accent3><a:accent4><a:srgbClr val="8064A2"/></a:accent4>'
+             '<a:accent5><a:srgbClr val="4BACC6"/></a:accent5><a:accent6><a:srgbClr val="F79646"/></a:accent6>'
+             '<a:hlink><a:srgbClr val="0000FF"/></a:hlink><a:folHlink><a:srgbClr val="800080"/></a:folHlink>'
+             '</a:clrScheme></a:themeElements></a:theme>')
+
+
+def column_letter(col):
+    '''Convert a 1-based column number to Excel letters.
+
+    Attributes:
+    col -> int
+        Column number (1 = A).'''
+    letters = ''
+    while col > 0:
+        col, rest = divmod(col - 1, 26)
+        letters = chr(65 + rest) + letters
+    return letters
+
+
+def make_workbook(path, n_rows=200, n_cols=20, n_xfs=300, n_sheets=2, seed=0, n_info_strings=0, n_scratch_cols=0):
+    '''Write a synthetic 'Ausrüstung' workbook shaped like the production templates: a trigger row with vehicle
+    numbers, a metadata name column with main categories left of it and values in different fonts, colors,
+    struck out and rich text runs.
+
+    Attributes:
+    path -> str
+        Path of the xlsx file to be written.
+    n_rows -> int
+        Number of metadata rows per sheet.
+    n_cols -> int
+        Number of vehicle columns per sheet.
+    n_xfs -> int
+        Number of cell formats (xf records) in styles.xml.
+    n_sheets -> int
+        Number of 'Fzg' sheets.
+    seed -> int
+        Seed of the random generator.
+    n_info_strings -> int
+        Number of additional shared strings only used by the 'Info' sheet (every tenth one rich text).
+    n_scratch_cols -> int
+        Number of columns of a scratch area (notes) right of the vehicle columns, separated by ten empty columns.'''
+    rnd = random.Random(seed)
+
+    # fonts: theme black, indexed black/red/blue/green, struck out black and tinted theme colors
+    fonts = ['<font><sz val="11"/><color theme="1"/><name val="Calibri"/></font>',
+             '<font><sz val="11"/><color indexed="8"/><name val="Calibri"/></font>',
+             '<font><sz val="11"/><color indexed="10"/><name val="Calibri"/></font>',
+             '<font><sz val="11"/><color indexed="12"/><name val="Calibri"/></font>',
+             '<font><b/><sz val="11"/><color indexed="11"/><name val="Calibri"/></font>',
+             '<font><strike/><sz val="11"/><color indexed="8"/><name val="Calibri"/></font>',
+             '<font><i/><sz val="10"/><color theme="4" tint="-0.249977111117893"/><name val="Arial"/></font>']
+    num_fmt_ids = [0, 0, 49, 164, 14]
+    xfs = ['<xf numFmtId="%d" fontId="%d" fillId="0" borderId="%d" xfId="0"/>' % (num_fmt_ids[i % len(num_fmt_ids)], i % len(fonts), i // len(fonts))
+           for i in range(n_xfs)]
+    styles = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+              '<styleSheet xmlns="%s">' % NAMESPACE["main"] +
+              '<numFmts count="1"><numFmt numFmtId="164" formatCode="0.0"/></numFmts>'
+              '<fonts count="%d">%s</fonts>' % (len(fonts), ''.join(fonts)) +
+              '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+              '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+              '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+              '<cellXfs count="%d">%s</cellXfs>' % (len(xfs), ''.join(xfs)) +
+              '<cellStyles count="1"><cellStyle name="Standard" xfId="0" builtinId="0"/></cellStyles>'
+              '<dxfs count="0"/>'
+              '<colors><indexedColors>%s</indexedColors></colors>' % ''.join('<rgbColor rgb="00%s"/>' % c for c in INDEXED_COLORS) +
+              '</styleSheet>')
+
+    shared = []
+    shared_index = {}
+
+    def shared_string(text, rich=False):
+        key = (text, rich)
+        if key not in shared_index:
+            shared_index[key] = len(shared)
+            if rich:    # first run in red, second one inherits the cell font, last one struck out
+                words = text.split(' ')
+                shared.append('<si><r><rPr><sz val="11"/><color indexed="10"/><rFont val="Calibri"/></rPr><t xml:space="preserve">%s </t></r>'
+                              '<r><t xml:space="preserve">%s </t></r>'
+                              '<r><rPr><strike/><sz val="11"/><rFont val="Calibri"/></rPr><t>%s</t></r></si>'
+                              % (escape(words[0]), escape(' '.join(words[1:-1])), escape(words[-1])))
+            else:
+                shared.append('<si><t>%s</t></si>' % escape(text))
+        return shared_index[key]
+
+    def cell(ref, xf, value):
+        if value is None:   # empty cell with border of the template
+            return '<c r="%s" s="%d"/>' % (ref, xf)
+        if isinstance(value, tuple):   # rich text
+            return '<c r="%s" s="%d" t="s"><v>%d</v></c>' % (ref, xf, shared_string(value[0], rich=True))
+        if isinstance(value, str):
+            return '<c r="%s" s="%d" t="s"><v>%d</v></c>' % (ref, xf, shared_string(value))
+        return '<c r="%s" s="%d"><v>%s</v></c>' % (ref, xf, value)
+
+    categories = ['Fahrzeug', 'Bremse', 'Reifen', 'Messung']
+    sheets = []
+    for sheet in range(n_sheets):
+        header_row = [cell('A1', 1, 'Ausrüstung Fzg %d' % (sheet + 1))] + [cell(column_letter(col) + '1', 1, None) for col in range(2, n_cols + 3)]
+        rows = ['<row r="1">%s</row>' % ''.join(header_row)]
+        trigger_row = [cell('A2', 1, None), cell('B2', 1, TRIGGER_METADATA)]
+        for col in range(n_cols):
+            trigger_row.append(cell(column_letter(col + 3) + '2', 1, 'DL%04d' % (1000 + col)))
+        rows.append('<row r="2">%s</row>' % ''.join(trigger_row))
+        for row in range(n_rows):
+            r = row + 3
+            cells = []
+            cells.append(cell('A%d' % r, 1, categories[(row // 25) % len(categories)] if row % 25 == 0 else None))
+            name = 'Bemerkung' if row % 10 == 9 else 'Merkmal %d' % row
+            cells.append(cell('B%d' % r, 1, name))
+            for col in range(n_cols):
+                x = rnd.random()
+                if x < 0.1:
+                    value = None
+                elif x < 0.2:
+                    value = ('Wert %d %d alt' % (row, col),)
+                elif x < 0.5:
+                    value = rnd.randint(1, 99999)
+                else:
+                    value = 'Wert %d' % rnd.randint(0, 5 * n_rows)
+                cells.append(cell(column_letter(col + 3) + str(r), rnd.randrange(n_xfs), value))
+            for col in range(n_scratch_cols):
+                cells.append(cell(column_letter(n_cols + 13 + col) + str(r), 0, 'Notiz %d' % rnd.randint(0, 999) if col % 2 else rnd.randint(1, 99)))
+            rows.append('<row r="%d">%s</row>' % (r, ''.join(cells)))
+        sheets.append(('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                       '<worksheet xmlns="%s" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">' % NAMESPACE["main"] +
+                       '<dimension ref="A1:%s%d"/>' % (column_letter(n_cols + 2 + (n_scratch_cols + 10 if n_scratch_cols else 0)), n_rows + 2) +
+                       '<sheetData>%s</sheetData></worksheet>' % ''.join(rows)))
+
+    sheet_names = ['Info'] + ['Fzg %d' % (sheet + 1) for sheet in range(n_sheets)]
+    info_rows = ['<row r="1"><c r="A1" s="0" t="s"><v>%d</v></c></row>' % shared_string('Info')]
+    info_rows += ['<row r="%d"><c r="A%d" s="0" t="s"><v>%d</v></c></row>' % (id + 2, id + 2, shared_string('Info %d text %d' % (id, seed), rich=id % 10 == 0))
+                  for id in range(n_info_strings)]
+    sheets.insert(0, '<?xml version="1.0" encoding="UTF-8" standalone="yes"?><worksheet xmlns="%s">'
+                     '<sheetData>%s</sheetData></worksheet>' % (NAMESPACE["main"], ''.join(info_rows)))
+
+    shared_strings = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                      '<sst xmlns="%s" count="%d" uniqueCount="%d">%s</sst>' % (NAMESPACE["main"], len(shared), len(shared), ''.join(shared)))
+    content_types = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                     '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                     '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                     '<Default Extension="xml" ContentType="application/xml"/>'
+                     '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+                     + ''.join('<Override PartName="/xl/worksheets/sheet%d.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>' % (i + 1)
+                               for i in range(len(sheets))) +
+                     '<Override PartName="/xl/theme/theme1.xml" ContentType="application/vnd.openxmlformats-officedocument.theme+xml"/>'
+                     '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+                     '<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+                     '</Types>')
+    rels = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+            '</Relationships>')
+    workbook = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<workbook xmlns="%s" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>' % NAMESPACE["main"] +
+                ''.join('<sheet name="%s" sheetId="%d" r:id="rId%d"/>' % (escape(name), i + 1, i + 1) for i, name in enumerate(sheet_names)) +
+                '</sheets></workbook>')
+    n = len(sheets)
+    workbook_rels = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                     '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">' +
+                     ''.join('<Relationship Id="rId%d" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet%d.xml"/>' % (i + 1, i + 1)
+                             for i in range(n)) +
+                     '<Relationship Id="rId%d" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/theme" Target="theme/theme1.xml"/>' % (n + 1) +
+                     '<Relationship Id="rId%d" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>' % (n + 2) +
+                     '<Relationship Id="rId%d" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" Target="sharedStrings.xml"/>' % (n + 3) +
+                     '</Relationships>')
+
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.writestr('[Content_Types].xml', content_types)
+        z.writestr('_rels/.rels', rels)
+        z.writestr('xl/workbook.xml', workbook)
+        z.writestr('xl/_rels/workbook.xml.rels', workbook_rels)
+        z.writestr('xl/styles.xml', styles)
+        z.writestr('xl/theme/theme1.xml', THEME_XML)
+        z.writestr('xl/sharedStrings.xml', shared_strings)
+        for i, sheet in enumerate(sheets):
+            z.writestr('xl/worksheets/sheet%d.xml' % (i + 1), sheet)
+
+    return path
+
+
+class EagerSharedStringsDecoder(xlsxDecoder):
+    '''xlsxDecoder decoding all entries of sharedStrings.xml when the workbook is opened (former behavior).'''
+
+    def get_shared_parts(self, styles, themes, shared_strings, logger, style_parts=None):
+        parts = super().get_shared_parts(styles, themes, shared_strings, logger, style_parts)
+        colors = (style_parts or self.get_style_parts(styles, themes))["colors"]
+        parts["shared_list"], parts["style_shared_list"] = self.get_shared_strings(ET.fromstring(shared_strings), NAMESPACE, colors)
+        return parts
+
+
+def get_logger():
+    '''Logger without output used by the benchmarks.'''
+    logger = logging.getLogger('BENCHMARK')
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    return logger
+
+
+def setup_sync_logger(log_file):
+    '''Logger of xlsxParser without background writer: DEBUG level and a synchronous FileHandler.
+
+    Attributes:
+    log_file -> str
+        Path to the log file.'''
+    logger = logging.getLogger('FORMAT-LOG')
+    logger.setLevel(logging.DEBUG)
+    file_handler = logging.FileHandler(log_file)
+    file_handler.setLevel(logging.DEBUG)
+    file_handler.setFormatter(TraceFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    logger.addHandler(file_handler)
+    return logger
+
+
+class SyncLogParser(xlsxParser):
+    '''xlsxParser writing its debug log synchronously in the decoding thread.'''
+
+    def setup_logger(self, log_file=None):
+        logger = logging.getLogger('FORMAT-LOG')
+        self.close_logger(logger)
+        return setup_sync_logger(log_file)
+
+
+def timeit(func, repeat=3):
+    '''Return the best wall time of a function in seconds.
+
+    Attributes:
+    func -> callable
+        Function without arguments to be timed.
+    repeat -> int
+        Number of repetitions.'''
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_style_table(folder, n_xfs_list=(10, 100, 300, 1000), n_rows=500, n_cols=20):
+    '''Compare the per-cell style lookup via ElementTree (cellXfs.findall()[style_index] and parse_styles_xml for
+    every styled cell) with the resolved style table of xlsxDecoder.
+
+    Attributes:
+    folder -> str
+        Folder for the generated workbooks.
+    n_xfs_list -> tuple
+        Numbers of xf records to be benchmarked.
+    n_rows -> int
+        Number of metadata rows per sheet.
+    n_cols -> int
+        Number of vehicle columns per sheet.'''
+    logger = get_logger()
+    print('--- Style resolution: per-cell ElementTree lookup vs. resolved style table ---')
+    print(f'{"xf records":>10} {"cells":>8} {"per-cell [s]":>13} {"table [s]":>10} {"speedup":>8} {"decoder [s]":>12}')
+    for n_xfs in n_xfs_list:
+        path = make_workbook(os.path.join(folder, f'bench_xf_{n_xfs}.xlsx'), n_rows=n_rows, n_cols=n_cols, n_xfs=n_xfs, n_sheets=1)
+        decoder = xlsxDecoder(xlsx_file=path)
+        sheet, styles, themes, _ = decoder.unzip_xlsx(sheet_nr=2)
+        styles_tree = ET.fromstring(styles)
+        themes = decoder.get_themes(ET.fromstring(themes), {"main": "http://schemas.openxmlformats.org/drawingml/2006/main"})
+        fonts = decoder.get_fonts(styles_tree, NAMESPACE, decoder.get_colors(styles_tree, NAMESPACE), themes)
+        sheet_tree = ET.fromstring(sheet)
+        style_indices = [int(cell.attrib['s']) for row in sheet_tree.find("main:sheetData", NAMESPACE) for cell in row if 's' in cell.attrib]
+
+        def per_cell_lookup():
+            for style_index in style_indices:
+                cellXfs = styles_tree.find("main:cellXfs", NAMESPACE)
+                target_style = cellXfs.findall("main:xf", NAMESPACE)[style_index]
+                target_style.attrib.get('fontId')
+                target_style.attrib.get('numFmtId')
+                decoder.parse_styles_xml(styles_tree.find("main:numFmts", NAMESPACE), NAMESPACE)
+
+        def table_lookup():
+            style_table = decoder.get_style_table(styles_tree, NAMESPACE, fonts)
+            for style_index in style_indices:
+                style_table[style_index]
+
+        t_cell = timeit(per_cell_lookup)
+        t_table = timeit(table_lookup)
+        t_decoder = timeit(lambda: decoder.decoder(sheet_nr=2, logger=logger))
+        print(f'{n_xfs:>10} {len(style_indices):>8} {t_cell:>13.4f} {t_table:>10.4f} {t_cell / t_table:>7.1f}x {t_decoder:>12.4f}')
+
+
+def peak_memory(func):
+    '''Return the peak memory of a function in MB (tracemalloc).
+
+    Attributes:
+    func -> callable
+        Function without arguments to be measured.'''
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1e6
+
+
+def bench_stream_memory(folder, n_rows_list=(1000, 4000, 16000), n_cols=20):
+    '''Compare the peak memory of decoding a worksheet as full ElementTree with the streaming mode (iter_cells) for
+    growing sheets. The cells are consumed one by one as in a filtering pipeline.
+
+    Attributes:
+    folder -> str
+        Folder for the generated workbooks.
+    n_rows_list -> tuple
+        Numbers of metadata rows per sheet.
+    n_cols -> int
+        Number of vehicle columns per sheet.'''
+    logger = get_logger()
+    print('--- Worksheet decoding: full ElementTree vs. streaming iterparse (peak memory) ---')
+    print(f'{"cells":>8} {"sheet.xml [MB]":>15} {"tree [MB]":>10} {"stream [MB]":>12} {"tree [s]":>9} {"stream [s]":>11}')
+    for n_rows in n_rows_list:
+        path = make_workbook(os.path.join(folder, f'bench_rows_{n_rows}.xlsx'), n_rows=n_rows, n_cols=n_cols, n_xfs=50, n_sheets=1)
+        decoder = xlsxDecoder(xlsx_file=path)
+        with zipfile.ZipFile(path) as z:
+            sheet_size = z.getinfo('xl/worksheets/sheet2.xml').file_size / 1e6
+        parts = decoder.get_shared_parts(*decoder.unzip_shared_parts(), logger=logger)
+
+        def tree():
+            sheet = decoder.unzip_xlsx(sheet_nr=2)[0]
+            for row in ET.fromstring(sheet).find("main:sheetData", NAMESPACE):
+                for cell in row:
+                    value_element = cell.find("main:v", NAMESPACE)
+                    decoder.decode_cell(cell.attrib.get("t"), cell.attrib.get("s"), value_element.text if value_element is not None else None, parts)
+
+        def stream():
+            for _ in decoder.iter_cells(sheet_nr=2, logger=logger, parts=parts):
+                pass
+
+        n_cells = (n_rows + 2) * (n_cols + 2)
+        print(f'{n_cells:>8} {sheet_size:>15.2f} {peak_memory(tree):>10.1f} {peak_memory(stream):>12.1f} {timeit(tree, 1):>9.3f} {timeit(stream, 1):>11.3f}')
+
+
+def bench_read_data(folder, n_rows=300, n_cols=30, n_sheets=10):
+    '''Compare the former triple read of a workbook in xlsxParser.read_data (pandas parse of every 'Fzg' sheet,
+    openpyxl load_workbook for the cell coordinates and xlsxDecoder per sheet) with the single-pass engine of
+    get_data_formatting. Both filter and log every cell the same way.
+
+    Attributes:
+    folder -> str
+        Folder for the generated workbooks and logs.
+    n_rows -> int
+        Number of metadata rows per sheet.
+    n_cols -> int
+        Number of vehicle columns per sheet.
+    n_sheets -> int
+        Number of 'Fzg' sheets.'''
+    os.environ.setdefault('USERPROFILE', folder)
+    path = make_workbook(os.path.join(folder, 'bench_read_data.xlsx'), n_rows=n_rows, n_cols=n_cols, n_xfs=100, n_sheets=n_sheets)
+    parser = xlsxParser(color_valid=['k', 'b'], trigger_metadata=TRIGGER_METADATA)
+    parsers = {debug_log: xlsxParser(color_valid=['k', 'b'], trigger_metadata=TRIGGER_METADATA, trace=debug_log) for debug_log in (True, False)}
+
+    def triple_read():
+        excel_file = pd.ExcelFile(path)
+        sheet_names = [(id, sheet) for id, sheet in enumerate(excel_file.sheet_names) if sheet.startswith('Fzg')]
+        dfs = {sheet: excel_file.parse(sheet, header=None) for id, sheet in sheet_names}
+        matches = {sheet: parser.find_string_in_dataframe(dfs[sheet]) for id, sheet in sheet_names}
+        workbook = load_workbook(excel_file, data_only=True)
+        for id, sheet_name in sheet_names:
+            row_trigger, col_trigger = matches[sheet_name][0]
+            logger = setup_sync_logger(os.path.join(folder, 'bench_triple_read.log'))
+            cell_data = xlsxDecoder(xlsx_file=path).decoder(sheet_nr=id + 1, logger=logger)
+            for row in workbook[sheet_name].iter_rows():
+                for cell in row:
+                    if cell.coordinate in cell_data:
+                        trigger_cell = cell.row == row_trigger + 1 or cell.column in (col_trigger, col_trigger + 1)
+                        parser.filter_cell_value(cell_data[cell.coordinate], trigger_cell, logger)
+            for handler in logger.handlers[:]:
+                handler.close()
+                logger.removeHandler(handler)
+
+    print('--- Workbook reading: triple read (pandas + openpyxl + decoder) vs. single-pass engine ---')
+    print(f'{"debug log":>9} {"sheets":>6} {"cells":>8} {"triple read [s]":>16} {"single pass [s]":>16} {"speedup":>8}')
+    for debug_log in (True, False):
+        if not debug_log:
+            logging.disable(logging.DEBUG)
+        t_triple = timeit(triple_read, 1)
+        t_single = timeit(lambda: parsers[debug_log].get_data_formatting(path), 1)
+        logging.disable(logging.NOTSET)
+        print(f'{str(debug_log):>9} {n_sheets:>6} {n_sheets * (n_rows + 2) * (n_cols + 2):>8} {t_triple:>16.3f} {t_single:>16.3f} {t_triple / t_single:>7.1f}x')
+
+
+def retained_memory(func):
+    '''Return the result of a function and the memory it still holds afterwards in MB (tracemalloc).
+
+    Attributes:
+    func -> callable
+        Function without arguments to be measured.'''
+    tracemalloc.start()
+    result = func()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current / 1e6
+
+
+def bench_cell_store(folder, n_rows=4000, n_cols=20):
+    '''Compare the dict of dicts keyed by cell reference with the columnar cell store (xlsxCellStore): memory held by the
+    decoded cells and the time to get row, column and style of every cell.
+
+    Attributes:
+    folder -> str
+        Folder for the generated workbooks.
+    n_rows -> int
+        Number of metadata rows per sheet.
+    n_cols -> int
+        Number of vehicle columns per sheet.'''
+    logger = get_logger()
+    path = make_workbook(os.path.join(folder, f'bench_store_{n_rows}.xlsx'), n_rows=n_rows, n_cols=n_cols, n_xfs=100, n_sheets=1)
+    decoder = xlsxDecoder(xlsx_file=path)
+    decoder.load_shared_parts(logger)
+
+    cell_data, mem_dict = retained_memory(lambda: decoder.decoder(sheet_nr=2, logger=logger, stream=True))
+    cell_store, mem_store = retained_memory(lambda: decoder.decoder(sheet_nr=2, logger=logger, columnar=True))
+
+    def dict_lookup():
+        for cell_ref, cell_format in cell_data.items():
+            decoder.split_cell_ref(cell_ref)
+            cell_format['style']
+
+    def store_lookup():
+        cell_store.rows.max(), cell_store.columns.max()
+        [cell_store.styles[style_id] for style_id in np.unique(cell_store.style_ids)]
+
+    n_cells = len(cell_data)
+    print('--- Decoded cells: dict keyed by "A1" vs. columnar cell store ---')
+    print(f'{"cells":>8} {"dict [B/cell]":>14} {"store [B/cell]":>15} {"dict lookup [s]":>16} {"store lookup [s]":>17}')
+    print(f'{n_cells:>8} {mem_dict * 1e6 / n_cells:>14.0f} {mem_store * 1e6 / n_cells:>15.0f} {timeit(dict_lookup):>16.4f} {timeit(store_lookup):>17.4f}')
+
+
+def bench_filter(folder, n_rows=4000, n_cols=20):
+    '''Compare filtering the cells of a worksheet one by one (filter_cell_value with compare_font_color per cell) with
+    the boolean mask of xlsxParser.filter_cells (validity computed once per style).
+
+    Attributes:
+    folder -> str
+        Folder for the generated workbooks.
+    n_rows -> int
+        Number of metadata rows per sheet.
+    n_cols -> int
+        Number of vehicle columns per sheet.'''
+    logger = get_logger()
+    path = make_workbook(os.path.join(folder, f'bench_filter_{n_rows}.xlsx'), n_rows=n_rows, n_cols=n_cols, n_xfs=100, n_sheets=1)
+    parser = xlsxParser(color_valid=['k', 'b'], trigger_metadata=TRIGGER_METADATA)
+    cell_store = xlsxDecoder(xlsx_file=path).decoder(sheet_nr=2, logger=logger, columnar=True)
+    row_trigger, col_trigger = parser.find_trigger_in_cells(cell_store)[0]
+
+    def per_cell():
+        for pos, (row, column) in enumerate(zip(cell_store.rows.tolist(), cell_store.columns.tolist())):
+            trigger_cell = row == row_trigger or column in (col_trigger - 1, col_trigger)
+            parser.filter_cell_value(cell_store.get_cell(pos), trigger_cell, logger)
+
+    def mask():
+        parser.filter_cells(cell_store, row_trigger, col_trigger, logger)
+
+    print('--- Cell filtering: per-cell compare_font_color vs. vectorized validity mask ---')
+    print(f'{"cells":>8} {"styles":>7} {"per cell [s]":>13} {"mask [s]":>9} {"speedup":>8}')
+    t_cell, t_mask = timeit(per_cell), timeit(mask)
+    print(f'{len(cell_store):>8} {len(cell_store.styles):>7} {t_cell:>13.4f} {t_mask:>9.4f} {t_cell / t_mask:>7.1f}x')
+
+
+def bench_trace(folder, n_rows=300, n_cols=30, n_sheets=10):
+    '''Compare the synchronous debug log (FileHandler per sheet written in the decoding thread) with tracing
+    through a queue to a background writer thread (trace=True) and no tracing (trace=False) in get_data_formatting.
+
+    Attributes:
+    folder -> str
+        Folder for the generated workbooks and logs (USERPROFILE if not set).
+    n_rows -> int
+        Number of metadata rows per sheet.
+    n_cols -> int
+        Number of vehicle columns per sheet.
+    n_sheets -> int
+        Number of 'Fzg' sheets.'''
+    os.environ.setdefault('USERPROFILE', folder)
+    path = make_workbook(os.path.join(folder, 'bench_trace.xlsx'), n_rows=n_rows, n_cols=n_cols, n_xfs=100, n_sheets=n_sheets)
+    options = dict(color_valid=['k', 'b'], trigger_metadata=TRIGGER_METADATA)
+
+    print('--- Tracing: synchronous debug log vs. queued background writer vs. trace off ---')
+    print(f'{"mode":>12} {"cells":>8} {"time [s]":>9} {"vs. sync":>9}')
+    t_sync = timeit(lambda: SyncLogParser(trace=True, **options).get_data_formatting(path), 1)
+    for mode, parser in (('sync log', None), ('trace on', xlsxParser(trace=True, **options)), ('trace off', xlsxParser(trace=False, **options))):
+        t_mode = t_sync if parser is None else timeit(lambda: parser.get_data_formatting(path), 1)
+        print(f'{mode:>12} {n_sheets * (n_rows + 2) * (n_cols + 2):>8} {t_mode:>9.3f} {t_sync / t_mode:>8.1f}x')
+
+
+def bench_audit(folder, n_rows=300, n_cols=30, n_sheets=10):
+    '''Compare the text debug log (trace=True) with the audit table of the keep/drop decisions (audit=True) in
+    get_data_formatting.
+
+    Attributes:
+    folder -> str
+        Folder for the generated workbooks and logs (USERPROFILE if not set).
+    n_rows -> int
+        Number of metadata rows per sheet.
+    n_cols -> int
+        Number of vehicle columns per sheet.
+    n_sheets -> int
+        Number of 'Fzg' sheets.'''
+    os.environ.setdefault('USERPROFILE', folder)
+    path = make_workbook(os.path.join(folder, 'bench_audit.xlsx'), n_rows=n_rows, n_cols=n_cols, n_xfs=100, n_sheets=n_sheets)
+    options = dict(color_valid=['k', 'b'], trigger_metadata=TRIGGER_METADATA)
+
+    print('--- Cell decisions: text debug log vs. audit table ---')
+    print(f'{"mode":>12} {"cells":>8} {"time [s]":>9}')
+    for mode, parser in (('no record', xlsxParser(trace=False, **options)), ('trace log', xlsxParser(trace=True, **options)), ('audit table', xlsxParser(trace=False, audit=True, **options))):
+        print(f'{mode:>12} {n_sheets * (n_rows + 2) * (n_cols + 2):>8} {timeit(lambda: parser.get_data_formatting(path), 1):>9.3f}')
+
+
+def bench_batch(folder, n_files=16, n_cols=20):
+    '''Compare reading and cleaning a folder of workbooks one after the other on a single core with the process pool of
+    xlsxParser.read_files (largest files first) for growing numbers of workers.
+
+    Attributes:
+    folder -> str
+        Folder for the generated workbooks (USERPROFILE if not set).
+    n_files -> int
+        Number of workbooks (different sizes).
+    n_cols -> int
+        Number of vehicle columns per sheet.'''
+    os.environ.setdefault('USERPROFILE', folder)
+    batch_folder = os.path.join(folder, 'batch')
+    os.makedirs(batch_folder, exist_ok=True)
+    paths = [make_workbook(os.path.join(batch_folder, f'Ausrüstung_{id}.xlsx'), n_rows=50 + 50 * (id % 8), n_cols=n_cols, n_xfs=50, n_sheets=2, seed=id) for id in range(n_files)]
+    parser = xlsxParser(color_valid=['k', 'b'], trigger_metadata=TRIGGER_METADATA, double_metadata=True, trigger_double_metadata='bemerkung')
+
+    def sequential():
+        for path in paths:
+            dfs = parser.read_data(path)
+            for df in dfs.values():
+                parser.data_cleaning(df, path)
+
+    t_seq = timeit(sequential, 1)
+    rows = []
+    for workers in sorted({1, 2, os.cpu_count() or 1}):
+        rows.append((workers, timeit(lambda: parser.read_files(paths, max_workers=workers), 1)))
+    print(f'--- Batch pipeline: sequential read_data + data_cleaning vs. process pool (read_files, {os.cpu_count()} CPUs) ---')
+    print(f'{"files":>6} {"sequential [s]":>15} {"workers":>8} {"pool [s]":>9} {"speedup":>8}')
+    for workers, t_pool in rows:
+        print(f'{n_files:>6} {t_seq:>15.3f} {workers:>8} {t_pool:>9.3f} {t_seq / t_pool:>7.1f}x')
+
+
+def bench_cache(folder, n_rows=400, n_cols=20, n_sheets=3):
+    '''Compare reading and cleaning a workbook (cache miss) with the result from the persistent cache of
+    xlsxParser.process_file (cache hit).
+
+    Attributes:
+    folder -> str
+        Folder for the generated workbooks and the cache (USERPROFILE if not set).
+    n_rows -> int
+        Number of metadata rows per sheet.
+    n_cols -> int
+        Number of vehicle columns per sheet.
+    n_sheets -> int
+        Number of 'Fzg' sheets.'''
+    os.environ.setdefault('USERPROFILE', folder)
+    path = make_workbook(os.path.join(folder, 'bench_cache.xlsx'), n_rows=n_rows, n_cols=n_cols, n_xfs=50, n_sheets=n_sheets)
+    cache_folder = os.path.join(folder, 'cache')
+    parser = xlsxParser(color_valid=['k', 'b'], trigger_metadata=TRIGGER_METADATA, double_metadata=True, trigger_double_metadata='bemerkung', cache_folder=cache_folder)
+
+    t_miss = parser.process_file(path)['time']
+    t_hit = timeit(lambda: parser.process_file(path))
+    print('--- Workbook cache: read and clean (miss) vs. cached result (hit) ---')
+    print(f'{"sheets":>6} {"cells":>8} {"miss [s]":>9} {"hit [s]":>8} {"speedup":>8}')
+    print(f'{n_sheets:>6} {n_sheets * (n_rows + 2) * (n_cols + 2):>8} {t_miss:>9.3f} {t_hit:>8.3f} {t_miss / t_hit:>7.0f}x')
+
+
+def make_tree(folder, n_dirs=2000, files_per_dir=5, seed=0):
+    '''Write an empty folder tree shaped like the production share (nested test folders with 'Ausrüstung' workbooks and
+    other files).
+
+    Attributes:
+    folder -> str
+        Root of the tree.
+    n_dirs -> int
+        Number of directories.
+    files_per_dir -> int
+        Number of files per directory.
+    seed -> int
+        Seed of the random tree.'''
+    rnd = random.Random(seed)
+    directories = [folder]
+    for id in range(n_dirs):
+        directory = os.path.join(rnd.choice(directories), f'Versuch_{id}')
+        os.makedirs(directory)
+        directories.append(directory)
+        for nr in range(files_per_dir):
+            name = rnd.choice(['Ausrüstung', 'Auswertung', 'Protokoll']) + f'_{nr}' + rnd.choice(['.xlsx', '.xls', '.pdf', '.csv'])
+            open(os.path.join(directory, name), 'w').close()
+    return folder
+
+
+def find_files_walk(path, allowed_extensions):
+    '''Former ParallelPathFinder.find_files: os.walk over the whole tree, then os.listdir and os.path.isfile per
+    directory in a thread pool.
+
+    Attributes:
+    path -> str
+        Path to the directory.
+    allowed_extensions -> list
+        List of allowed extensions.'''
+    def search_in_directory(directory):
+        matches = []
+        for entry in os.listdir(directory):
+            full_path = os.path.join(directory, entry)
+            if os.path.isfile(full_path):
+                name, ext = os.path.splitext(entry)
+                if entry.startswith("Ausrüstung") and ext.lower() in allowed_extensions:
+                    matches.append(full_path)
+        return matches
+
+    directories = [root for root, dirs, files in os.walk(path)]
+    found_files = []
+    with ThreadPoolExecutor() as executor:
+        for future in as_completed([executor.submit(search_in_directory, directory) for directory in directories]):
+            found_files.extend(future.result())
+    return found_files
+
+
+def bench_path_finder(folder, n_dirs=2000, files_per_dir=5):
+    '''Compare the former os.walk + os.listdir search with the os.scandir walker of ParallelPathFinder: time until all
+    files are found and until the first file is found (the generator iter_files).
+
+    Attributes:
+    folder -> str
+        Folder for the generated tree.
+    n_dirs -> int
+        Number of directories.
+    files_per_dir -> int
+        Number of files per directory.'''
+    path = make_tree(os.path.join(folder, 'tree'), n_dirs=n_dirs, files_per_dir=files_per_dir)
+    allowed_extensions = ['.xlsx', '.xls']
+    finder = ParallelPathFinder(path, allowed_extensions)
+
+    def first_file():
+        files = finder.iter_files()
+        next(files)
+        files.close()
+
+    t_walk, t_scandir, t_first = timeit(lambda: find_files_walk(path, allowed_extensions)), timeit(finder.find_files), timeit(first_file)
+    print('--- File search: os.walk + listdir + isfile vs. concurrent os.scandir walker ---')
+    print(f'{"dirs":>6} {"files":>6} {"walk [s]":>9} {"scandir [s]":>12} {"first file [s]":>15} {"speedup":>8}')
+    print(f'{n_dirs:>6} {len(finder.find_files()):>6} {t_walk:>9.3f} {t_scandir:>12.3f} {t_first:>15.4f} {t_walk / t_scandir:>7.1f}x')
+
+
+def bench_rescan(folder, n_dirs=2000, files_per_dir=50, n_changes=10):
+    '''Compare the full search of ParallelPathFinder with the delta search of rescan (manifest of the last search) after
+    a few files changed, and with the delta search checking every matching file (check_files=True).
+
+    Attributes:
+    folder -> str
+        Folder for the generated tree and the manifest.
+    n_dirs -> int
+        Number of directories.
+    files_per_dir -> int
+        Number of files per directory.
+    n_changes -> int
+        Number of files added between the searches.'''
+    path = make_tree(os.path.join(folder, 'rescan_tree'), n_dirs=n_dirs, files_per_dir=files_per_dir)
+    finder = ParallelPathFinder(path, ['.xlsx', '.xls'], manifest_file=os.path.join(folder, 'manifest.json'))
+    finder.rescan()
+    directories = sorted({os.path.dirname(file) for file in finder.find_files()})
+    for id, directory in enumerate(directories[:n_changes]):
+        open(os.path.join(directory, f'Ausrüstung_neu_{id}.xlsx'), 'w').close()
+
+    listed = []     # directories listed with os.scandir
+    scan_directory = finder.scan_directory
+    finder.scan_directory = lambda directory: listed.append(directory) or scan_directory(directory)
+
+    t_full = timeit(finder.find_files, 1)
+    listed_full = len(listed)
+    start = time.perf_counter()
+    changes = finder.rescan()
+    t_delta = time.perf_counter() - start
+    t_files = timeit(lambda: finder.rescan(check_files=True), 1)     # every matching file checked as well
+    print('--- Rescan: full search vs. delta search with manifest (directory mtimes, check_files=True) ---')
+    print(f'{"dirs":>6} {"entries":>8} {"changes":>8} {"full [s]":>9} {"listed":>7} {"delta [s]":>10} {"listed":>7} {"files [s]":>10}')
+    print(f'{n_dirs:>6} {n_dirs * files_per_dir:>8} {len(changes["added"]):>8} {t_full:>9.3f} {listed_full:>7} {t_delta:>10.3f} {len(listed) - listed_full:>7} {t_files:>10.3f}')
+
+
+def bench_style_cache(folder, n_files=20, n_xfs=1000, n_rows=50, n_cols=10):
+    '''Compare parsing the style parts (styles.xml, theme1.xml) of every workbook with the template cache of xlsxDecoder
+    for workbooks of the same template.
+
+    Attributes:
+    folder -> str
+        Folder for the generated workbooks and the disk tier of the cache.
+    n_files -> int
+        Number of workbooks of the template.
+    n_xfs -> int
+        Number of cell formats (xf records) of the template.
+    n_rows -> int
+        Number of metadata rows per sheet.
+    n_cols -> int
+        Number of vehicle columns per sheet.'''
+    logger = get_logger()
+    paths = [make_workbook(os.path.join(folder, f'bench_template_{id}.xlsx'), n_rows=n_rows, n_cols=n_cols, n_xfs=n_xfs, n_sheets=1, seed=id)
+             for id in range(n_files)]
+
+    def load(clear, style_cache_folder=None):
+        for path in paths:
+            if clear:
+                xlsxDecoder.style_cache.clear()
+            xlsxDecoder(xlsx_file=path, style_cache_folder=style_cache_folder).load_shared_parts(logger)
+
+    xlsxDecoder.style_cache.clear()
+    t_parse = timeit(lambda: load(True))
+    t_memory = timeit(lambda: load(False))
+    load(True, os.path.join(folder, 'style_cache'))
+    t_disk = timeit(lambda: load(True, os.path.join(folder, 'style_cache')))
+    xlsxDecoder.style_cache.clear()
+    print('--- Style parts: parsed per workbook vs. template cache (memory / disk) ---')
+    print(f'{"files":>6} {"xfs":>5} {"parse [s]":>10} {"memory [s]":>11} {"disk [s]":>9} {"speedup":>8}')
+    print(f'{n_files:>6} {n_xfs:>5} {t_parse:>10.3f} {t_memory:>11.3f} {t_disk:>9.3f} {t_parse / t_memory:>7.1f}x')
+
+
+def bench_layout(folder, n_files=10, n_rows=400, n_cols=20):
+    '''Compare searching the trigger of metadata and naming the columns in every sheet with the learned layout of the
+    template (layout_cache) for workbooks of the same template.
+
+    Attributes:
+    folder -> str
+        Folder for the generated workbooks (USERPROFILE if not set).
+    n_files -> int
+        Number of workbooks of the template.
+    n_rows -> int
+        Number of metadata rows per sheet.
+    n_cols -> int
+        Number of vehicle columns per sheet.'''
+    os.environ.setdefault('USERPROFILE', folder)
+    paths = [make_workbook(os.path.join(folder, f'bench_layout_{id}.xlsx'), n_rows=n_rows, n_cols=n_cols, n_xfs=50, n_sheets=2, seed=id)
+             for id in range(n_files)]
+    options = dict(color_valid=['k', 'b'], trigger_metadata=TRIGGER_METADATA, double_metadata=True, trigger_double_metadata='bemerkung')
+    dfs = {path: xlsxParser(**options).read_data(path) for path in paths}
+    rows = []
+    for layout_cache in (False, True):
+        parser = xlsxParser(layout_cache=layout_cache, **options)
+        t_read = timeit(lambda: [parser.read_data(path) for path in paths], 1)
+        t_clean = timeit(lambda: [parser.data_cleaning(df, path) for path in paths for df in dfs[path].values()], 1)
+        rows.append((layout_cache, t_read, t_clean))
+    print('--- Layout: trigger search and column naming per sheet vs. learned layout of the template ---')
+    print(f'{"files":>6} {"layout":>7} {"read_data [s]":>14} {"data_cleaning [s]":>18}')
+    for layout_cache, t_read, t_clean in rows:
+        print(f'{n_files:>6} {str(layout_cache):>7} {t_read:>14.3f} {t_clean:>18.3f}')
+
+
+def bench_shared_strings(folder, n_info_strings_list=(10000, 100000), n_rows=300, n_cols=20):
+    '''Compare decoding all shared strings when a workbook is opened with the lazy shared string table (xlsxSharedStrings)
+    for workbooks whose 'Info' sheet holds most of the shared strings. Only the 'Fzg' sheet is decoded.
+
+    Attributes:
+    folder -> str
+        Folder for the generated workbooks.
+    n_info_strings_list -> tuple
+        Numbers of shared strings only used by the 'Info' sheet.
+    n_rows -> int
+        Number of metadata rows of the 'Fzg' sheet.
+    n_cols -> int
+        Number of vehicle columns of the 'Fzg' sheet.'''
+    logger = get_logger()
+    rows = []
+    for n_info_strings in n_info_strings_list:
+        path = make_workbook(os.path.join(folder, f'bench_shared_{n_info_strings}.xlsx'), n_rows=n_rows, n_cols=n_cols, n_xfs=50, n_sheets=1, n_info_strings=n_info_strings)
+        with open(path, 'rb') as f:
+            xlsx_file = f.read()
+        result = {}
+        for mode, decoder_class in (('eager', EagerSharedStringsDecoder), ('lazy', xlsxDecoder)):
+            def decode():
+                decoder = decoder_class(xlsx_file=io.BytesIO(xlsx_file))
+                result[mode] = decoder.decoder(2, logger, columnar=True), decoder
+            result[mode + '_time'] = timeit(decode)
+            result[mode + '_memory'] = peak_memory(decode)
+        shared_list = result['lazy'][1].parts["shared_list"]
+        rows.append((n_info_strings, len(shared_list), len(shared_list.entries), result['eager_time'], result['lazy_time'], result['eager_memory'], result['lazy_memory']))
+    print('--- Shared strings: all decoded when opened vs. lazy table (only the Fzg sheet is read) ---')
+    print(f'{"strings":>8} {"decoded":>8} {"eager [s]":>10} {"lazy [s]":>9} {"speedup":>8} {"eager [MB]":>11} {"lazy [MB]":>10}')
+    for n_info_strings, n_strings, n_decoded, t_eager, t_lazy, m_eager, m_lazy in rows:
+        print(f'{n_strings:>8} {n_decoded:>8} {t_eager:>10.3f} {t_lazy:>9.3f} {t_eager / t_lazy:>7.1f}x {m_eager:>11.1f} {m_lazy:>10.1f}')
+
+
+def bench_cell_range(folder, n_rows=1000, n_cols=20, n_scratch_cols=200):
+    '''Compare decoding all cells of a worksheet with the range-restricted decoding (cell_range) for a sheet with a
+    wide scratch area right of the metadata block.
+
+    Attributes:
+    folder -> str
+        Folder for the generated workbooks (USERPROFILE if not set).
+    n_rows -> int
+        Number of metadata rows per sheet.
+    n_cols -> int
+        Number of vehicle columns per sheet.
+    n_scratch_cols -> int
+        Number of columns of the scratch area.'''
+    os.environ.setdefault('USERPROFILE', folder)
+    path = make_workbook(os.path.join(folder, 'bench_range.xlsx'), n_rows=n_rows, n_cols=n_cols, n_xfs=50, n_sheets=1, n_scratch_cols=n_scratch_cols)
+    options = dict(color_valid=['k', 'b'], trigger_metadata=TRIGGER_METADATA, double_metadata=True, trigger_double_metadata='bemerkung', layout_cache=True)
+    block = 'A1:%s%d' % (column_letter(n_cols + 2), n_rows + 2)
+    rows = []
+    for mode in (None, 'dimension', block, 'trigger'):
+        parser = xlsxParser(cell_range=mode, **options)
+        parser.data_cleaning(parser.read_data(path)['Fzg 1'], path, 'Fzg 1')     # learn the layout
+        rows.append((str(mode), timeit(lambda: parser.read_data(path), 1)))
+    print('--- Range-restricted decoding: all cells vs. cell_range (sheet with scratch area) ---')
+    print(f'{"cells":>8} {"block":>7} {"cell_range":>12} {"read_data [s]":>14} {"speedup":>8}')
+    for mode, t_read in rows:
+        print(f'{(n_rows + 2) * (n_cols + 2 + n_scratch_cols):>8} {(n_rows + 2) * (n_cols + 2):>7} {mode:>12} {t_read:>14.3f} {rows[0][1] / t_read:>7.1f}x')
+
+
+def bench_projection(folder, n_rows=2000, n_cols=20, n_names_list=(1, 10, 100, 1000)):
+    '''Compare reading and cleaning all metadata of a worksheet with reading only a few wanted metadata
+    (metadata_names) of a known layout.
+
+    Attributes:
+    folder -> str
+        Folder for the generated workbooks (USERPROFILE if not set).
+    n_rows -> int
+        Number of metadata rows per sheet.
+    n_cols -> int
+        Number of vehicle columns per sheet.
+    n_names_list -> tuple
+        Numbers of wanted metadata.'''
+    os.environ.setdefault('USERPROFILE', folder)
+    path = make_workbook(os.path.join(folder, 'bench_projection.xlsx'), n_rows=n_rows, n_cols=n_cols, n_xfs=50, n_sheets=1)
+    options = dict(color_valid=['k', 'b'], trigger_metadata=TRIGGER_METADATA, double_metadata=True, trigger_double_metadata='bemerkung', layout_cache=True)
+    rows = []
+    for n_names in (None,) + tuple(n_names_list):
+        names = None if n_names is None else ['Merkmal %d' % row for row in range(0, n_rows, n_rows // n_names) if row % 10 != 9]
+        parser = xlsxParser(metadata_names=names, **options)
+        parser.data_cleaning(parser.read_data(path)['Fzg 1'], path, 'Fzg 1')     # learn the layout
+        df_vehicle = parser.data_cleaning(parser.read_data(path)['Fzg 1'], path, 'Fzg 1')[0]
+        rows.append(('all' if names is None else str(len(names)), df_vehicle.shape[1],
+                     timeit(lambda: parser.data_cleaning(parser.read_data(path)['Fzg 1'], path, 'Fzg 1'))))
+    print('--- Projection: all metadata vs. only the wanted metadata (metadata_names) of a known layout ---')
+    print(f'{"rows":>6} {"names":>6} {"columns":>8} {"read + clean [s]":>17} {"speedup":>8}')
+    for names, n_columns, t_read in rows:
+        print(f'{n_rows:>6} {names:>6} {n_columns:>8} {t_read:>17.3f} {rows[0][2] / t_read:>7.1f}x')
+
+
+def bench_intra_sheet(folder, n_rows=20000, n_cols=20):
+    '''Compare decoding one large worksheet in a single pass with decoding its row partitions in a process pool
+    (xlsxDecoder(max_workers=...), see decode_partitioned) for growing numbers of workers.
+
+    Attributes:
+    folder -> str
+        Folder for the generated workbook.
+    n_rows -> int
+        Number of metadata rows of the sheet.
+    n_cols -> int
+        Number of vehicle columns of the sheet.'''
+    path = make_workbook(os.path.join(folder, 'bench_intra_sheet.xlsx'), n_rows=n_rows, n_cols=n_cols, n_xfs=50, n_sheets=1)
+    logger = get_logger()
+    t_serial = timeit(lambda: xlsxDecoder(path).decode_columnar(2, logger), 1)
+    rows = []
+    for workers in sorted({2, 4, os.cpu_count() or 1} - {1}):
+        rows.append((workers, timeit(lambda: xlsxDecoder(path, max_workers=workers).decode_columnar(2, logger), 1)))
+    print(f'--- Intra-sheet decoding: single pass vs. row partitions in a process pool (max_workers, {os.cpu_count()} CPUs) ---')
+    print(f'{"rows":>6} {"single [s]":>11} {"workers":>8} {"partitioned [s]":>16} {"speedup":>8}')
+    for workers, t_pool in rows:
+        print(f'{n_rows:>6} {t_serial:>11.3f} {workers:>8} {t_pool:>16.3f} {t_serial / t_pool:>7.1f}x')
+
+
+def bench_xml_engine(folder, n_rows_list=(1000, 4000, 16000), n_cols=20):
+    '''Compare decoding a worksheet and its shared strings with ElementTree (engine 'etree') and with the callbacks of
+    the expat parser (engine 'expat') for growing sheets.
+
+    Attributes:
+    folder -> str
+        Folder for the generated workbooks.
+    n_rows_list -> tuple
+        Numbers of metadata rows of the sheet.
+    n_cols -> int
+        Number of vehicle columns of the sheet.'''
+    logger = get_logger()
+    rows = []
+    for n_rows in n_rows_list:
+        path = make_workbook(os.path.join(folder, f'bench_xml_engine_{n_rows}.xlsx'), n_rows=n_rows, n_cols=n_cols, n_xfs=50, n_sheets=1)
+        times = [timeit(lambda: xlsxDecoder(path, engine=engine).decode_columnar(2, logger)) for engine in xlsxDecoder.engines]
+        rows.append((n_rows, *times))
+    print('--- XML engine: ElementTree vs. expat callbacks (decode_columnar incl. shared strings) ---')
+    print(f'{"rows":>6} {"etree [s]":>10} {"expat [s]":>10} {"speedup":>8}')
+    for n_rows, t_etree, t_expat in rows:
+        print(f'{n_rows:>6} {t_etree:>10.3f} {t_expat:>10.3f} {t_etree / t_expat:>7.1f}x')
+
+
+def get_dataframe_info_loop(parser, df):
+    '''Former xlsxParser.get_dataframe_info: re.match of the raw pattern on every value of every column, matches
+    written one by one with result_df.at.
+
+    Attributes:
+    parser -> xlsxParser
+        Parser of the pattern (see get_pattern).
+    df -> pd.DataFrame
+        Metadata rows of the vehicles.'''
+    pattern = parser.get_pattern()
+    group_names = list(re.compile(pattern).groupindex.keys())
+    result_df = pd.DataFrame(index=df.columns.tolist(), columns=group_names)
+    for col in df.columns:
+        for idx, value in df[col].items():
+            regex_match = re.match(pattern, str(value))
+            if regex_match:
+                for group_name, group_value in regex_match.groupdict().items():
+                    if group_value:
+                        result_df.iloc()
+                        result_df.at[col, group_name] = group_value
+    return result_df
+
+
+def bench_dataframe_info(n_rows=2000, n_cols_list=(10, 50, 200), seed=0):
+    '''Compare the former loop of get_dataframe_info with the single pass over the distinct values of the stacked
+    frame, with the endurance number only and with two additional patterns (info_patterns).
+
+    Attributes:
+    n_rows -> int
+        Number of metadata rows.
+    n_cols_list -> tuple
+        Numbers of vehicle columns.
+    seed -> int
+        Seed of the random generator.'''
+    rnd = random.Random(seed)
+    parser = xlsxParser()
+    parser_patterns = xlsxParser(info_patterns=[r'.*?(?P<vds_number>VDS\d{5})', r'.*?(?P<record_date>\d{2}\.\d{2}\.\d{4})'])
+    rows = []
+    for n_cols in n_cols_list:
+        values = [[rnd.choice((f'Wert {rnd.randint(0, 500)}', f'DL{rnd.randint(1000, 9999)}', f'VDS{rnd.randint(10000, 99999)}', rnd.randint(0, 99), np.nan))
+                   for _ in range(n_cols)] for _ in range(n_rows)]
+        df = pd.DataFrame(values, columns=[f'DL{1000 + col}' for col in range(n_cols)])
+        rows.append((n_cols, timeit(lambda: get_dataframe_info_loop(parser, df), 1), timeit(lambda: parser.get_dataframe_info(df)),
+                     timeit(lambda: parser_patterns.get_dataframe_info(df))))
+    print('--- Pattern extraction: loop per value vs. one pass over the distinct values (get_dataframe_info) ---')
+    print(f'{"rows":>6} {"columns":>8} {"loop [s]":>9} {"pass [s]":>9} {"speedup":>8} {"3 patterns [s]":>15}')
+    for n_cols, t_loop, t_pass, t_patterns in rows:
+        print(f'{n_rows:>6} {n_cols:>8} {t_loop:>9.3f} {t_pass:>9.3f} {t_loop / t_pass:>7.1f}x {t_patterns:>15.3f}')
+
+
+def bench_join_columns(n_rows=400, n_vehicles_list=(10, 100, 500), seed=0):
+    '''Compare combining the columns of each vehicle with conditional_join per row (former get_single_columns) with
+    the joined columns of xlsxParser.join_columns for growing numbers of vehicles (two columns each).
+
+    Attributes:
+    n_rows -> int
+        Number of metadata rows.
+    n_vehicles_list -> tuple
+        Numbers of vehicles.
+    seed -> int
+        Seed of the random generator.'''
+    rnd = random.Random(seed)
+    parser = xlsxParser()
+
+    def apply_rows(df, trigger_metadata_dict):
+        df_vehicle = pd.DataFrame()
+        for keys, values in trigger_metadata_dict.items():
+            df_vehicle[keys] = df[df.columns[values]].apply(parser.conditional_join, axis=1)
+        return df_vehicle
+
+    rows = []
+    for n_vehicles in n_vehicles_list:
+        values = [[rnd.choice((f'Wert {rnd.randint(0, 500)}', rnd.randint(0, 99), np.nan, None)) for _ in range(2 * n_vehicles)] for _ in range(n_rows)]
+        df = pd.DataFrame(np.array(values, dtype=object))
+        trigger_metadata_dict = {f'DL{1000 + id}': [2 * id, 2 * id + 1] for id in range(n_vehicles)}
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')     # fragmented frame of the former column by column assignment
+            t_apply = timeit(lambda: apply_rows(df, trigger_metadata_dict), 1)
+        rows.append((n_vehicles, t_apply, timeit(lambda: parser.join_columns(df, trigger_metadata_dict))))
+    print('--- Combined columns: conditional_join per row vs. joined columns (join_columns) ---')
+    print(f'{"rows":>6} {"vehicles":>9} {"apply [s]":>10} {"joined [s]":>11} {"speedup":>8}')
+    for n_vehicles, t_apply, t_join in rows:
+        print(f'{n_rows:>6} {n_vehicles:>9} {t_apply:>10.3f} {t_join:>11.3f} {t_apply / t_join:>7.1f}x')
+
+
+def vehicle_frame_copies(parser, df, row_trigger_metadata, col_trigger_metadata, trigger_metadata_dict):
+    '''Former reshaping of get_single_columns: combined columns assigned one by one, then replace, iloc, reindex,
+    set_index, transpose and reset_index, each step a copy of the values.
+
+    Attributes:
+    parser -> xlsxParser
+        Parser of the sheet.
+    df -> pd.DataFrame
+        Dataframe of the xlsx file.
+    row_trigger_metadata -> int
+        Row of the trigger of metadata.
+    col_trigger_metadata -> int
+        Column of the trigger of metadata.
+    trigger_metadata_dict -> dict
+        Vehicles and their columns (see get_trigger_metadata).'''
+    index_name = pd.Series(df[col_trigger_metadata].iloc[row_trigger_metadata+1:].to_numpy())
+    df_vehicle = pd.DataFrame()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')     # fragmented frame of the column by column assignment
+        for keys, values in trigger_metadata_dict.items():
+            df_vehicle[keys] = df[df.columns[values]].apply(parser.conditional_join, axis=1)
+    vehicle_nr = df_vehicle.iloc[row_trigger_metadata]
+    df_vehicle = df_vehicle.replace(["", " ", None], np.nan)
+    df_vehicle.columns = vehicle_nr
+    df_vehicle = df_vehicle.iloc[row_trigger_metadata+1:].reset_index(drop=True)
+    df_vehicle = df_vehicle.reindex(index_name.index, fill_value=np.nan)
+    df_vehicle[parser.trigger_metadata] = index_name
+    df_vehicle.set_index(parser.trigger_metadata, inplace=True)
+    col_names = df_vehicle.columns
+    df_vehicle = df_vehicle.transpose()
+    df_vehicle.index.name = parser.trigger_metadata
+    df_vehicle.index = col_names
+    return df_vehicle.reset_index().dropna(how="all")
+
+
+def bench_vehicle_frame(n_rows_list=(500, 2000, 8000), n_vehicles=100, seed=0):
+    '''Compare the former reshaping of get_single_columns (a copy per step) with the vehicle frame built in one step
+    (xlsxParser.get_vehicle_frame): time and peak memory for growing sheets.
+
+    Attributes:
+    n_rows_list -> tuple
+        Numbers of metadata rows.
+    n_vehicles -> int
+        Number of vehicles (one column each).
+    seed -> int
+        Seed of the random generator.'''
+    rnd = random.Random(seed)
+    parser = xlsxParser(trigger_metadata=TRIGGER_METADATA)
+    rows = []
+    for n_rows in n_rows_list:
+        values = [[None, 'Header'] + [None] * n_vehicles, [None, TRIGGER_METADATA] + [f'DL{1000 + id}' for id in range(n_vehicles)]]
+        values += [[None, f'Merkmal {row}'] + [rnd.choice((f'Wert {rnd.randint(0, 500)}', np.nan)) for _ in range(n_vehicles)] for row in range(n_rows)]
+        df = pd.DataFrame(np.array(values, dtype=object))
+        trigger_metadata_dict = {f'DL{1000 + id}': [2 + id] for id in range(n_vehicles)}
+        sheet_size = retained_memory(lambda: df.to_numpy(dtype=object).copy())[1]     # one copy of the values
+
+        def copies():
+            vehicle_frame_copies(parser, df, 1, 1, trigger_metadata_dict)
+
+        def one_step():
+            parser.drop_empty_rows(parser.get_vehicle_frame(df.iloc[1:], trigger_metadata_dict, pd.Index(df[1].iloc[2:].to_numpy(), name=parser.trigger_metadata))[0])
+
+        rows.append((n_rows, sheet_size, timeit(copies, 1), peak_memory(copies), timeit(one_step), peak_memory(one_step)))
+    print('--- Vehicle frame: reshaping step by step vs. one step (get_vehicle_frame) ---')
+    print(f'{"rows":>6} {"vehicles":>9} {"sheet [MB]":>11} {"steps [s]":>10} {"steps [MB]":>11} {"one step [s]":>13} {"one step [MB]":>14}')
+    for n_rows, sheet_size, t_steps, m_steps, t_one, m_one in rows:
+        print(f'{n_rows:>6} {n_vehicles:>9} {sheet_size:>11.1f} {t_steps:>10.3f} {m_steps:>11.1f} {t_one:>13.3f} {m_one:>14.1f}')
+
+
+def category_naming_loops(parser, df, df_vehicle, row_trigger_metadata):
+    '''Former category naming of get_single_columns: category names and main categories row by row, positions of
+    the duplicate columns by one scan of all columns per name and the category of a subcategory by a scan of all
+    categories per trigger field.
+
+    Attributes:
+    parser -> xlsxParser
+        Parser of the sheet.
+    df -> pd.DataFrame
+        Dataframe of the xlsx file (categories in column 0).
+    df_vehicle -> pd.DataFrame
+        Vehicles x metadata, columns renamed in place.
+    row_trigger_metadata -> int
+        Row of the trigger of metadata.'''
+    cat_names = {}
+    cat_name = ''
+    for idx, cat in enumerate(df[df.columns[0]]):
+        if pd.notna(cat):
+            cat_name = cat
+        if cat_name:
+            if cat_name not in cat_names.keys():
+                cat_names[cat_name] = []
+            cat_names[cat_name].append(idx - row_trigger_metadata)
+    duplicates = df_vehicle.columns[df_vehicle.columns.duplicated()].unique()
+    duplicates_positions = {col: [i for i, x in enumerate(df_vehicle.columns) if x == col] for col in duplicates}
+    for col, positions in duplicates_positions.items():
+        if parser.trigger_double_metadata in str(col).lower():
+            for pos in positions:
+                for _, idx_cat in cat_names.items():
+                    if pos + 1 in idx_cat:
+                        last_cat_idx = idx_cat[0]
+    cat_name = ''
+    for idx, cat in enumerate(df[df.columns[0]]):
+        if pd.notna(cat):
+            cat_name = cat
+        if cat_name:
+            if idx == 0:
+                df_vehicle.index.name = cat_name + '$' + str(df_vehicle.index.name)
+            else:
+                colname = df_vehicle.columns.values[idx - row_trigger_metadata]
+                df_vehicle.columns.values[idx - row_trigger_metadata] = cat_name + '$' + str(colname)
+
+
+def bench_category_naming(n_rows_list=(500, 2000, 8000), n_categories=20, seed=0):
+    '''Compare the former category naming of get_single_columns (loops per row, per duplicate name and per category)
+    with the forward fill of the categories and the position arrays of get_category_names, get_duplicate_columns,
+    reset_duplicate_columns and set_main_categories for growing sheets.
+
+    Attributes:
+    n_rows_list -> tuple
+        Numbers of metadata rows.
+    n_categories -> int
+        Number of main categories.
+    seed -> int
+        Seed of the random generator.'''
+    rnd = random.Random(seed)
+    parser = xlsxParser(trigger_metadata=TRIGGER_METADATA, trigger_double_metadata='bemerkung')
+    rows = []
+    for n_rows in n_rows_list:
+        values = [['Titel', 'Header'], [None, TRIGGER_METADATA]]
+        values += [[f'Kategorie {row * n_categories // n_rows}' if row % (n_rows // n_categories) == 0 else None,
+                    'Bemerkung' if row % 10 == 9 else f'Merkmal {rnd.randint(0, 50)}'] for row in range(n_rows)]
+        df = pd.DataFrame(np.array(values, dtype=object))
+        metadata_index = pd.Index(df[1].iloc[2:].to_numpy(), name=parser.trigger_metadata)
+
+        def vehicle_frame():
+            return pd.DataFrame(np.zeros((1, n_rows + 1)), columns=metadata_index.insert(0, parser.trigger_metadata))
+
+        def loops():
+            category_naming_loops(parser, df, vehicle_frame(), 1)
+
+        def arrays():
+            df_vehicle = vehicle_frame()
+            category_names = parser.get_category_names(df, 1, 1)
+            df_vehicle, iter_unnamed = parser.reset_duplicate_columns(df_vehicle, category_names)
+            parser.set_main_categories(df, df_vehicle, 0, 1, iter_unnamed)
+
+        rows.append((n_rows, timeit(loops, 1), timeit(arrays)))
+    print('--- Category naming: loops vs. forward fill and position arrays ---')
+    print(f'{"rows":>6} {"loops [s]":>10} {"arrays [s]":>11} {"speedup":>8}')
+    for n_rows, t_loops, t_arrays in rows:
+        print(f'{n_rows:>6} {t_loops:>10.3f} {t_arrays:>11.3f} {t_loops / t_arrays:>7.1f}x')
+
+
+def main():
+    '''Run all benchmarks on synthetic workbooks in a temporary folder.'''
+    with tempfile.TemporaryDirectory() as folder:
+        bench_style_table(folder)
+        bench_stream_memory(folder)
+        bench_read_data(folder)
+        bench_cell_store(folder)
+        bench_filter(folder)
+        bench_trace(folder)
+        bench_audit(folder)
+        bench_batch(folder)
+        bench_cache(folder)
+        bench_path_finder(folder)
+        bench_rescan(folder)
+        bench_style_cache(folder)
+        bench_layout(folder)
+        bench_shared_strings(folder)
+        bench_cell_range(folder)
+        bench_projection(folder)
+        bench_intra_sheet(folder)
+        bench_xml_engine(folder)
+        bench_dataframe_info()
+        bench_join_columns()
+        bench_vehicle_frame()
+        bench_category_naming()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,21 +7,29 @@ from datetime import datetime, timedelta
 
 # debug
 import logging
+import logging.handlers
+import queue
 from distutils.log import debug
 
 # system
-import os, re
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import os, re, io, time, traceback
+import importlib.util
+import multiprocessing
+import hashlib, pickle, json
+from array import array
+from collections.abc import Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
 
 from turtle import shape
 from unicodedata import category
 from xml.dom.expatbuilder import parseString
 
 # Excel
-from openpyxl import load_workbook
 import xlrd
 import zipfile
 import xml.etree.ElementTree as ET
+from xml.parsers import expat
 
 # GUI
 from tkinter import filedialog
@@ -36,14 +44,71 @@ import asposecells
 
 class xlsxDecoder():
     '''Class to decode xlsx files.'''
-    
-    def __init__(self,xlsx_file='') -> None:
+
+    # built-in number formats of Excel
+    EXCEL_NUMFMTS = {
+        0: "General",
+        1: "0",
+        2: "0.00",
+        3: "#,##0",
+        4: "#,##0.00",
+        9: "0%",
+        10: "0.00%",
+        11: "0.00E+00",
+        12: "# ?/?",
+        13: "# ??/??",
+        14: "DD/MM/YYYY",
+        15: "D-MMM-YY",
+        16: "D-MMM",
+        17: "MMM-YY",
+        18: "h:mm AM/PM",
+        19: "h:mm:ss AM/PM",
+        20: "h:mm",
+        21: "h:mm:ss",
+        22: "DD/MM/YYYY h:mm",
+        37: "#,##0 ;(#,##0)",  # Währung/Buchhaltung
+        38: "#,##0 ;[Red](#,##0)",
+        39: "#,##0.00;(#,##0.00)",
+        40: "#,##0.00;[Red](#,##0.00)",
+        45: "h:mm",
+        46: "h:mm:ss",
+        47: "h:mm:ss.0",
+        48: "0.00E+00",
+        49: "@",  # Text
+    }
+
+    style_cache = {}            # template key -> style parts, shared by all objects of a process (see load_style_parts)
+    style_cache_size = 64       # maximum number of templates in style_cache
+    engines = ("etree", "expat")   # XML engines of the worksheets and shared strings
+    chunk_size = 2**16          # bytes of a worksheet fed to the expat parser at once
+
+    def __init__(self,xlsx_file='', style_cache_folder=None, max_workers=None, engine='etree', source_path=None) -> None:
             '''Initialize the xlsxDecoder class.
 
             Attributes:
             xlsx_file -> str
-                Path to xlsx file'''
+                Path to xlsx file
+            style_cache_folder -> str
+                Folder of the style parts of known templates (disk tier of the template cache). None: only in memory.
+            max_workers -> int
+                Number of worker processes to decode large worksheets in row partitions (see decode_partitioned). The
+                pool is started once per object (workbook) and stopped by close(). None: one pass in this process.
+            engine -> str
+                Parser of the worksheets and shared strings: 'etree' (ElementTree, reference) or 'expat' (callbacks
+                of the expat parser without building elements, see parse_cells_expat). Both give the same cells.
+            source_path -> str
+                Path of the xlsx file if xlsx_file is a file object. The workers of decode_partitioned open the file by
+                this path (page cache of the OS) instead of receiving a copy of its content. None: xlsx_file is the
+                path.'''
+            if engine not in self.engines:
+                raise ValueError(f"Unknown XML engine: {engine} (expected one of {', '.join(self.engines)})")
             self.xlsx_file = xlsx_file
+            self.style_cache_folder = style_cache_folder
+            self.max_workers = max_workers
+            self.engine = engine
+            self.source_path = source_path if source_path is not None or not isinstance(xlsx_file, (str, os.PathLike)) else xlsx_file
+            self.parts = None       # shared parts of all worksheets (parsed once, see load_shared_parts)
+            self.executor = None    # process pool of the row partitions of all worksheets (see decode_partitioned)
 
     def hex_to_rgb(self, hex_color):
         '''Convert a hexadecimal color (e.g. 'FF0000') to [R, G, B].
@@ -149,10 +214,58 @@ class xlsxDecoder():
         shared_list = []
         style_shared_list = []
         for si in shared_tree.findall("main:si", namespace):
-            value = si.findall("main:t", namespace)
-            if len(value) > 0:  # not nested values (in sharedStrings.xml)
-                shared_list.append([value[0].text])
-                style_props = si.findall("main:rPr", namespace)
+            values, styles = self.get_shared_string(si, namespace, colors)
+            shared_list.extend(values)
+            style_shared_list.extend(styles)
+
+        return shared_list, style_shared_list
+
+    def get_shared_string(self, si, namespace, colors):
+        '''Decode a single shared string (<si>): value list and style list as entries of get_shared_strings.
+
+        Attributes:
+        si -> xml.etree.ElementTree.Element
+            <si> element of the sharedStrings.xml file.
+        namespace -> dict
+            Namespace for Excel files.
+        colors -> list
+            List of colors in the Excel file.'''
+        values = []
+        styles = []
+        value = si.findall("main:t", namespace)
+        if len(value) > 0:  # not nested values (in sharedStrings.xml)
+            values.append([value[0].text])
+            style_props = si.findall("main:rPr", namespace)
+            if style_props:
+                for style_prop in style_props:
+                    if style_prop.find("main:color", namespace) is not None:
+                        if style_prop.find("main:color", namespace).get("indexed") is not None:
+                            color_style = colors[int(style_prop.find("main:color", namespace).get("indexed"))]
+                        else:
+                            color_style = None
+                    else:
+                        color_style = None
+
+                    dict_style = {
+                            "bold": style_prop.find("main:b", namespace) is not None,
+                            "italic": style_prop.find("main:i", namespace) is not None,
+                            "underline": style_prop.find("main:u", namespace) is not None,
+                            "strike": style_prop.find("main:strike", namespace) is not None,
+                            "font": style_prop.find("main:rFont", namespace).get("val") if style_prop.find("main:rFont", namespace) is not None else None,
+                            "size": style_prop.find("main:sz", namespace).get("val") if style_prop.find("main:sz", namespace) is not None else None,
+                            "color": color_style
+                        }
+                    styles.append([dict_style])
+            else:
+                styles.append([np.nan])
+        else: # nested values (in sharedStrings.xml)
+            nested_xml = si.findall("main:r", namespace)
+            nested_list = []
+            style_nested_list = []
+            for ne in nested_xml:
+                value_nested = ne.findall("main:t", namespace)
+                nested_list.append(value_nested[0].text)
+                style_props = ne.findall("main:rPr", namespace)
                 if style_props:
                     for style_prop in style_props:
                         if style_prop.find("main:color", namespace) is not None:
@@ -164,51 +277,98 @@ class xlsxDecoder():
                             color_style = None
 
                         dict_style = {
-                                "bold": style_prop.find("main:b", namespace) is not None,
-                                "italic": style_prop.find("main:i", namespace) is not None,
-                                "underline": style_prop.find("main:u", namespace) is not None,
-                                "strike": style_prop.find("main:strike", namespace) is not None,
-                                "font": style_prop.find("main:rFont", namespace).get("val") if style_prop.find("main:rFont", namespace) is not None else None,
-                                "size": style_prop.find("main:sz", namespace).get("val") if style_prop.find("main:sz", namespace) is not None else None,
-                                "color": color_style
-                            }
-                        style_shared_list.append([dict_style])
+                            "bold": style_prop.find("main:b", namespace) is not None,
+                            "italic": style_prop.find("main:i", namespace) is not None,
+                            "underline": style_prop.find("main:u", namespace) is not None,
+                            "strike": style_prop.find("main:strike", namespace) is not None,
+                            "font": style_prop.find("main:rFont", namespace).get("val") if style_prop.find("main:rFont", namespace) is not None else None,
+                            "size": style_prop.find("main:sz", namespace).get("val") if style_prop.find("main:sz", namespace) is not None else None,
+                            "color": color_style
+                        }
+                        style_nested_list.append(dict_style)
                 else:
-                    style_shared_list.append([np.nan])
-            else: # nested values (in sharedStrings.xml)
-                nested_xml = si.findall("main:r", namespace)
-                nested_list = []
-                style_nested_list = []
-                for ne in nested_xml:
-                    value_nested = ne.findall("main:t", namespace)
-                    nested_list.append(value_nested[0].text)
-                    style_props = ne.findall("main:rPr", namespace)
-                    if style_props:
-                        for style_prop in style_props:
-                            if style_prop.find("main:color", namespace) is not None:
-                                if style_prop.find("main:color", namespace).get("indexed") is not None:
-                                    color_style = colors[int(style_prop.find("main:color", namespace).get("indexed"))]
-                                else:
-                                    color_style = None
-                            else:
-                                color_style = None
+                    style_nested_list.append(np.nan)
+            values.append(nested_list)
+            styles.append(style_nested_list)
 
-                            dict_style = {
-                                "bold": style_prop.find("main:b", namespace) is not None,
-                                "italic": style_prop.find("main:i", namespace) is not None,
-                                "underline": style_prop.find("main:u", namespace) is not None,
-                                "strike": style_prop.find("main:strike", namespace) is not None,
-                                "font": style_prop.find("main:rFont", namespace).get("val") if style_prop.find("main:rFont", namespace) is not None else None,
-                                "size": style_prop.find("main:sz", namespace).get("val") if style_prop.find("main:sz", namespace) is not None else None,
-                                "color": color_style
-                            }
-                            style_nested_list.append(dict_style)
-                    else:
-                        style_nested_list.append(np.nan)
-                shared_list.append(nested_list)
-                style_shared_list.append(style_nested_list)
+        return values, styles
 
-        return shared_list, style_shared_list
+    def get_shared_string_expat(self, si_xml, colors):
+        '''Decode a single shared string with the expat parser: same value list and style list as get_shared_string,
+        but only the text of <t> and the run properties (<rPr>) are tracked instead of building the elements.
+
+        Attributes:
+        si_xml -> bytes
+            <si> element within the root element of the sharedStrings.xml file (namespace declarations).
+        colors -> list
+            List of colors in the Excel file.'''
+        main = "http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+        tag_si, tag_r, tag_t, tag_rpr = main + "si", main + "r", main + "t", main + "rPr"
+        tag_color = main + "color"
+        flags = {main + "b": "bold", main + "i": "italic", main + "u": "underline", main + "strike": "strike"}
+        attributes = {main + "rFont": "font", main + "sz": "size"}
+        path = []               # tags of the open elements
+        texts, runs = [], []    # texts of <t> directly in <si>, [texts of <t>, run properties] of each <r>
+        si_props = []           # run properties directly in <si>
+        state = {"text": None, "props": None}      # open text of <t>, open <rPr>
+
+        def start(tag, attrib):
+            parent = path[-1] if path else None
+            grandparent = path[-2] if len(path) > 1 else None
+            state["text"] = None        # text of <t> ends at its first child (as ElementTree .text)
+            if parent == tag_si:
+                if tag == tag_t:
+                    texts.append(None)
+                    state["text"] = texts
+                elif tag == tag_r:
+                    runs.append([[], []])
+                elif tag == tag_rpr:
+                    si_props.append(self.new_run_style())
+                    state["props"] = si_props[-1]
+            elif parent == tag_r and grandparent == tag_si:
+                if tag == tag_t:
+                    runs[-1][0].append(None)
+                    state["text"] = runs[-1][0]
+                elif tag == tag_rpr:
+                    runs[-1][1].append(self.new_run_style())
+                    state["props"] = runs[-1][1][-1]
+            elif parent == tag_rpr and state["props"] is not None:
+                props = state["props"]
+                if tag in flags:
+                    props[flags[tag]] = True
+                elif tag in attributes and "#" + attributes[tag] not in props:
+                    props["#" + attributes[tag]] = True     # only the first element counts (as find)
+                    props[attributes[tag]] = attrib.get("val")
+                elif tag == tag_color and "#color" not in props:
+                    props["#color"] = True
+                    props["color"] = colors[int(attrib["indexed"])] if attrib.get("indexed") is not None else None
+            path.append(tag)
+
+        def end(tag):
+            path.pop()
+            state["text"] = None
+            if tag == tag_rpr:
+                state["props"] = None
+
+        def data(text):
+            if state["text"] is not None:
+                target = state["text"]
+                target[-1] = text if target[-1] is None else target[-1] + text
+
+        parser = expat.ParserCreate(namespace_separator="}")
+        parser.buffer_text = True
+        parser.StartElementHandler, parser.EndElementHandler, parser.CharacterDataHandler = start, end, data
+        parser.Parse(si_xml, True)
+
+        clean = lambda props: {key: value for key, value in props.items() if not key.startswith("#")}
+        if texts:   # not nested values
+            return [[texts[0]]], [[clean(props)] for props in si_props] or [[np.nan]]
+        # nested values
+        return [[run_texts[0] for run_texts, props in runs]], [[style for run_texts, props in runs for style in ([clean(prop) for prop in props] or [np.nan])]]
+
+    def new_run_style(self) -> dict:
+        '''Return the run style of a <rPr> without child elements (see get_shared_string).'''
+        return {"bold": False, "italic": False, "underline": False, "strike": False, "font": None, "size": None, "color": None}
 
     def apply_tint(self, color, tint, black_theme):
         '''Apply the tint value to lighten or darken the color.
@@ -295,6 +455,66 @@ class xlsxDecoder():
 
         return num_fmts
 
+    def resolve_xf(self, font_id, numFmtId, fonts, num_fmts):
+        '''Resolve a single cell format (xf record) to its font, number format, color and strike flag.
+
+        Attributes:
+        font_id -> int
+            Font ID of the cell format.
+        numFmtId -> str
+            Number format ID of the cell format (None if not defined).
+        fonts -> list
+            List of fonts in the Excel file.
+        num_fmts -> dict
+            Dictionary of user-defined number formats.'''
+        standard_color = [0, 0, 0]
+
+        font = fonts[font_id] if font_id < len(fonts) else {}
+        # Fallback: cells without font color are shown in standard color
+        if font and (font["color"] is None or font["color"] is np.nan):
+            font["color"] = standard_color
+
+        num_format = None
+        if numFmtId is not None:
+            num_format = num_fmts.get(int(numFmtId), self.EXCEL_NUMFMTS.get(int(numFmtId)))
+
+        return {
+            "font_id": font_id,
+            "font": font,
+            "numFmtId": numFmtId,
+            "num_format": num_format,
+            "num_fmts": num_fmts,
+            "color": font.get("color"),
+            "strike": font.get("strike", False)
+        }
+
+    def get_style_table(self, styles_tree, namespace, fonts):
+        '''Create the resolved style table with one entry per xf index of <cellXfs>. Each cell only needs a
+        list lookup with its style index instead of searching styles.xml again.
+
+        Attributes:
+        styles_tree -> xml.etree.ElementTree
+            XML tree of the styles.xml file.
+        namespace -> dict
+            Namespace for Excel files.
+        fonts -> list
+            List of fonts in the Excel file.'''
+        numFmts = styles_tree.find("main:numFmts", namespace)
+        num_fmts = self.parse_styles_xml(numFmts, namespace) if numFmts is not None else {}
+
+        style_table = []
+        cellXfs = styles_tree.find("main:cellXfs", namespace)
+        if cellXfs is None:
+            return style_table
+        for xf in cellXfs.findall("main:xf", namespace):
+            try:
+                font_id = int(xf.attrib.get('fontId', 0))
+                style_table.append(self.resolve_xf(font_id, xf.attrib.get('numFmtId'), fonts, num_fmts))
+            except ValueError:
+                style_table.append(self.resolve_xf(0, None, fonts, num_fmts))   # font-ID or number format ID ungültig
+
+        return style_table
+
     def get_excel_format(self, value, numFmtId, num_fmts):
         '''Convert the Excel number format to a readable format.
         
@@ -305,38 +525,9 @@ class xlsxDecoder():
             Number format ID.
         num_fmts -> dict
             Dictionary of number formats.'''
-        
-        excel_start_date = datetime(1899, 12, 30)  
-        excel_numfmts = {
-            0: "General",
-            1: "0",
-            2: "0.00",
-            3: "#,##0",
-            4: "#,##0.00",
-            9: "0%",
-            10: "0.00%",
-            11: "0.00E+00",
-            12: "# ?/?",
-            13: "# ??/??",
-            14: "DD/MM/YYYY",  
-            15: "D-MMM-YY",
-            16: "D-MMM",
-            17: "MMM-YY",
-            18: "h:mm AM/PM",
-            19: "h:mm:ss AM/PM",
-            20: "h:mm",
-            21: "h:mm:ss",
-            22: "DD/MM/YYYY h:mm",
-            37: "#,##0 ;(#,##0)",  # Währung/Buchhaltung
-            38: "#,##0 ;[Red](#,##0)",
-            39: "#,##0.00;(#,##0.00)",
-            40: "#,##0.00;[Red](#,##0.00)",
-            45: "h:mm",
-            46: "h:mm:ss",
-            47: "h:mm:ss.0",
-            48: "0.00E+00",
-            49: "@",  # Text
-        }
+
+        excel_start_date = datetime(1899, 12, 30)
+        excel_numfmts = self.EXCEL_NUMFMTS
 
         numFmtId = int(numFmtId)
 
@@ -379,67 +570,880 @@ class xlsxDecoder():
         # Standard-Zahlenformat
         return value
 
-    def decoder(self, sheet_nr, logger) -> dict:
-        '''Decode the xlsx file and return the content of the cells.
-        
+    def get_sheet_names(self):
+        '''Return the names of all worksheets in the order of the workbook (sheet_nr = position + 1).'''
+        namespace = {"main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+        with zipfile.ZipFile(self.xlsx_file, "r") as z:
+            workbook_tree = ET.fromstring(z.read("xl/workbook.xml"))
+        return [sheet.attrib.get("name") for sheet in workbook_tree.find("main:sheets", namespace)]
+
+    def split_cell_ref(self, cell_ref):
+        '''Split a cell reference into its row and column number (1-based, e.g. 'AB12' -> 12, 28).
+
+        Attributes:
+        cell_ref -> str
+            Cell reference (e.g. "A1").'''
+        col = 0
+        for pos, char in enumerate(cell_ref):
+            if char.isdigit():
+                return int(cell_ref[pos:]), col
+            col = col * 26 + ord(char.upper()) - 64
+        return 0, col
+
+    max_rows, max_columns = 1048576, 16384     # size of a worksheet (Excel 2007+)
+
+    def parse_cell_range(self, cell_range):
+        '''Return a cell range as (first row, first column, last row, last column), 1-based and inclusive. A reference
+        without row number (e.g. 'A:C') covers all rows.
+
+        Attributes:
+        cell_range -> str or tuple
+            Cell range (e.g. "B2:K400" or "B2") or tuple (first row, first column, last row, last column).'''
+        if cell_range is None or isinstance(cell_range, tuple):
+            return cell_range
+        first, _, last = cell_range.replace('$', '').partition(':')
+        first_row, first_col = self.split_cell_ref(first)
+        last_row, last_col = self.split_cell_ref(last or first)
+        return (max(first_row, 1), max(first_col, 1), last_row or self.max_rows, last_col or self.max_columns)
+
+    def get_dimension(self, sheet_nr):
+        '''Return the used range of a worksheet from <dimension> (see parse_cell_range) or None if the worksheet has
+        none. Only the start of the worksheet is read.
+
+        Attributes:
+        sheet_nr -> int
+            Number of the sheet to be read.'''
+        main = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+        with zipfile.ZipFile(self.xlsx_file, "r") as z:
+            with z.open("xl/worksheets/sheet"+str(sheet_nr)+".xml") as sheet:
+                for event, elem in ET.iterparse(sheet, events=("start",)):
+                    if elem.tag == main + "dimension" and elem.attrib.get("ref"):
+                        return self.parse_cell_range(elem.attrib.get("ref"))
+                    if elem.tag == main + "sheetData":
+                        break
+        return None
+
+    def get_cell_range(self, sheet_nr, cell_range):
+        '''Return the cell range of a worksheet to be decoded (see parse_cell_range, None: all cells).
+
         Attributes:
         sheet_nr -> int
             Number of the sheet to be read.
+        cell_range -> str or tuple
+            Cell range, 'dimension' for the range of <dimension> or None.'''
+        if cell_range == 'dimension':
+            return self.get_dimension(sheet_nr)
+        return self.parse_cell_range(cell_range)
+
+    def unzip_shared_parts(self):
+        '''Unpack xlsx file and return the content of the styles.xml, theme.xml and sharedStrings.xml without the worksheets.'''
+        with zipfile.ZipFile(self.xlsx_file, "r") as z:
+            styles = z.read("xl/styles.xml").decode("utf-8")
+            themes = z.read("xl/theme/theme1.xml").decode("utf-8")
+            shared_strings = z.read("xl/sharedStrings.xml").decode("utf-8")
+        return styles, themes, shared_strings
+
+    def unzip_sheet(self, sheet_nr):
+        '''Unpack xlsx file and return the content of a single worksheet.
+
+        Attributes:
+        sheet_nr -> int
+            Number of the sheet to be read.'''
+        with zipfile.ZipFile(self.xlsx_file, "r") as z:
+            sheet = z.read("xl/worksheets/sheet"+str(sheet_nr)+".xml").decode("utf-8")
+        return sheet
+
+    def load_shared_parts(self, logger) -> dict:
+        '''Return the shared parts of the workbook. They are parsed on the first call and reused for every worksheet
+        decoded with this object. The style parts are taken from the template cache if styles.xml and theme1.xml of
+        the workbook are known (see get_template_key).
+
+        Attributes:
         logger -> logging.Logger
             Logger object.'''
+        if self.parts is None:
+            with zipfile.ZipFile(self.xlsx_file, "r") as z:
+                template_key = self.get_template_key(z)
+                style_parts = self.load_style_parts(template_key)
+                if style_parts is None:
+                    style_parts = self.get_style_parts(z.read("xl/styles.xml").decode("utf-8"), z.read("xl/theme/theme1.xml").decode("utf-8"))
+                    self.store_style_parts(template_key, style_parts)
+                shared_strings = z.read("xl/sharedStrings.xml")
+            self.parts = self.get_shared_parts(None, None, shared_strings, logger=logger, style_parts=style_parts)
+        return self.parts
+
+    def get_template_key(self, z) -> str:
+        '''Return the key of the template of a workbook: CRC32 and size of styles.xml and theme1.xml from the central
+        directory of the zip file (no part has to be read).
+
+        Attributes:
+        z -> zipfile.ZipFile
+            Opened xlsx file.'''
+        return '_'.join(f'{info.CRC:08x}{info.file_size:x}' for info in (z.getinfo("xl/styles.xml"), z.getinfo("xl/theme/theme1.xml")))
+
+    def load_style_parts(self, template_key):
+        '''Return the style parts of a template from the cache of this process or from style_cache_folder (None if
+        the template is unknown).
+
+        Attributes:
+        template_key -> str
+            Key of the template (see get_template_key).'''
+        style_parts = xlsxDecoder.style_cache.get(template_key)
+        if style_parts is None and self.style_cache_folder is not None:
+            try:
+                with open(os.path.join(self.style_cache_folder, template_key + '.pkl'), 'rb') as f:
+                    style_parts = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                return None
+            self.store_style_parts(template_key, style_parts, disk=False)
+        return style_parts
+
+    def store_style_parts(self, template_key, style_parts, disk=True):
+        '''Store the style parts of a template in the cache of this process (the oldest templates are removed if it
+        exceeds style_cache_size) and in style_cache_folder.
+
+        Attributes:
+        template_key -> str
+            Key of the template (see get_template_key).
+        style_parts -> dict
+            Style parts (see get_style_parts).
+        disk -> bool
+            True to write the style parts to style_cache_folder.'''
+        xlsxDecoder.style_cache[template_key] = style_parts
+        while len(xlsxDecoder.style_cache) > xlsxDecoder.style_cache_size:
+            del xlsxDecoder.style_cache[next(iter(xlsxDecoder.style_cache))]
+        if disk and self.style_cache_folder is not None:
+            os.makedirs(self.style_cache_folder, exist_ok=True)
+            cache_file = os.path.join(self.style_cache_folder, template_key + '.pkl')
+            temp_file = f'{cache_file}.{os.getpid()}.tmp'
+            with open(temp_file, 'wb') as f:
+                pickle.dump(style_parts, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_file, cache_file)
+
+    def get_style_parts(self, styles, themes) -> dict:
+        '''Parse the style parts of the xlsx file (colors, themes, fonts and resolved cell formats). They only depend on
+        styles.xml and theme1.xml and are the same for all workbooks of a template.
+
+        Attributes:
+        styles -> str
+            Content of the styles.xml file.
+        themes -> str
+            Content of the theme.xml file.'''
         # Namespace für Excel-Dateien
         namespace = {"main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
         theme_namespace = {"main": "http://schemas.openxmlformats.org/drawingml/2006/main"}
 
-        logger.info('Funktion DECODER gestartet')
-
-        sheet, styles, themes, shared_strings = self.unzip_xlsx(sheet_nr)
         # Parsen der XML-Dateien
-        shared_tree = ET.fromstring(shared_strings)
         styles_tree = ET.fromstring(styles)
         themes_tree = ET.fromstring(themes)
-        sheet_tree = ET.fromstring(sheet)
 
         # Get colors in excel file
         colors = self.get_colors(styles_tree, namespace)
+        # Get theme colors
+        themes = self.get_themes(themes_tree, theme_namespace)
+        # Get all possible fonts in excel file
+        fonts = self.get_fonts(styles_tree, namespace, colors, themes)
+        # Resolve all xfs_cell entities once (index = style index of the cell)
+        style_table = self.get_style_table(styles_tree, namespace, fonts)
+
+        return {
+            "colors": colors,
+            "themes": themes,
+            "fonts": fonts,
+            "style_table": style_table,
+            "fallback_style": self.resolve_xf(0, None, fonts, {}),     # style index not in <cellXfs>
+        }
+
+    def get_shared_parts(self, styles, themes, shared_strings, logger, style_parts=None) -> dict:
+        '''Parse the parts of the xlsx file which are shared by all worksheets (colors, themes, fonts, resolved cell
+        formats and shared strings).
+
+        Attributes:
+        styles -> str
+            Content of the styles.xml file.
+        themes -> str
+            Content of the theme.xml file.
+        shared_strings -> str
+            Content of the sharedStrings.xml file (str or bytes). The entries are decoded on demand (see
+            xlsxSharedStrings).
+        logger -> logging.Logger
+            Logger object.
+        style_parts -> dict
+            Style parts of the template (see get_style_parts). Parsed from styles and themes if None.'''
+        # Namespace für Excel-Dateien
+        namespace = {"main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+        if style_parts is None:
+            style_parts = self.get_style_parts(styles, themes)
+        colors, themes, fonts, style_table = style_parts["colors"], style_parts["themes"], style_parts["fonts"], style_parts["style_table"]
+
         # print all colors in use as RGB values
+        trace = logger.isEnabledFor(logging.DEBUG)
         logger.debug('--- Print all color entities. ---')
-        for id, color in enumerate(colors):
-            logger.debug(f'Color ID {id}: {color}')
+        for id, color in enumerate(colors if trace else []):
+            logger.debug('Color ID %s: %s', id, color)
 
-        # Get theme colors
-        themes = self.get_themes(themes_tree, theme_namespace)
         # print all themes in use as RGB values
         logger.debug('--- Print all theme entities. ---')
-        for id, theme in enumerate(themes):
-            logger.debug(f'Color ID {id}: {theme}')
-
-        # print xfs_cell ids
-        logger.debug('--- Print all xfs_cell entities. ---')
-        for id, xfs_cell in enumerate(styles_tree.find("main:cellXfs", namespace)):
-            font_id = xfs_cell.attrib.get('fontId')
-            numFmtId = xfs_cell.attrib.get('numFmtId')
-            logger.debug(f'xfs_cell ID {id} has font ID {font_id} and number format ID {numFmtId}')
+        for id, theme in enumerate(themes if trace else []):
+            logger.debug('Color ID %s: %s', id, theme)
 
         # Get styles and values of cells containing numerous amount of different styles
-        shared_list, style_shared_list = self.get_shared_strings(shared_tree, namespace, colors)
+        shared_list = xlsxSharedStrings(shared_strings, self, colors)
+        style_shared_list = shared_list.styles
 
-        # Get all possible fonts in excel file
-        fonts = self.get_fonts(styles_tree, namespace, colors, themes)
         # Print fonts with their ids
         logger.debug('--- Print all font entities. ---')
-        for id, font_prop in enumerate(fonts):
-            logger.debug(f"Font ID {id}: {font_prop}")
+        for id, font_prop in enumerate(fonts if trace else []):
+            logger.debug('Font ID %s: %s', id, font_prop)
 
-        # Decode each cell. cell_data -> dict with each different formatted values as entries of a list with its style in a different list
-        cell_data = {}
+        # print xfs_cell ids
+        logger.debug('--- Print all xfs_cell entities. ---')
+        for id, xfs_cell in enumerate(style_table if trace else []):
+            logger.debug('xfs_cell ID %s has font ID %s and number format ID %s', id, xfs_cell['font_id'], xfs_cell['numFmtId'])
 
         # print styles of shared strings
         logger.debug('--- Print all style entities (if exist) of all shared strings. ---')
-        for id, shared_str in enumerate(style_shared_list):
-            logger.debug(f'Shared Style ID {id} for shared value {shared_list[id]} has shared style: {shared_str}')
+        for id, shared_str in enumerate(style_shared_list if trace else []):
+            logger.debug('Shared Style ID %s for shared value %s has shared style: %s', id, shared_list[id], shared_str)
+
+        return {
+            "shared_list": shared_list,
+            "style_shared_list": style_shared_list,
+            "fonts": fonts,
+            "style_table": style_table,
+            "fallback_style": style_parts["fallback_style"],
+        }
 
-        standard_color = [0, 0, 0]
+    def get_xf_style(self, style_index, parts):
+        '''Return the resolved cell format of a style index (None if the cell has no style index).
+
+        Attributes:
+        style_index -> str
+            Style index (attribute s of <c>).
+        parts -> dict
+            Shared parts of the xlsx file (see get_shared_parts).'''
+        if style_index is None:
+            return None
+        # Look up the resolved <cellXfs> entry (fallback: font-ID 0 if not defined)
+        try:
+            return parts["style_table"][int(style_index)]
+        except (IndexError, ValueError):
+            return parts["fallback_style"]
+
+    def decode_value(self, cell_type, value_text, xf_style, parts):
+        '''Decode the value(s) of a single cell in its number format.
+
+        Attributes:
+        cell_type -> str
+            Cell type (attribute t of <c>).
+        value_text -> str
+            Text of <v> (None if the cell has no value).
+        xf_style -> dict
+            Resolved cell format (see get_xf_style).
+        parts -> dict
+            Shared parts of the xlsx file (see get_shared_parts).'''
+        if cell_type == "s":  # Shared String
+            cell_value = list(parts["shared_list"][int(value_text)])     # copy: shared list is reused by all cells and sheets
+        elif value_text is not None:
+            cell_value = [value_text]
+        else:
+            return None
+
+        if xf_style is not None and xf_style["numFmtId"] is not None:
+            for id, value in enumerate(cell_value):
+                cell_value[id] = self.get_excel_format(value, xf_style["numFmtId"], xf_style["num_fmts"])
+        return cell_value
+
+    def decode_style(self, cell_type, value_index, xf_style, parts):
+        '''Decode the style(s) of a single cell. The result only depends on the cell format and the shared string, so
+        it can be shared by all cells with the same combination.
+
+        Attributes:
+        cell_type -> str
+            Cell type (attribute t of <c>).
+        value_index -> int
+            Index of the shared string (None if the cell is no shared string).
+        xf_style -> dict
+            Resolved cell format (see get_xf_style).
+        parts -> dict
+            Shared parts of the xlsx file (see get_shared_parts).'''
+        shared_list = parts["shared_list"]
+        style_shared_list = parts["style_shared_list"]
+
+        cell_style = style_shared_list[value_index] if cell_type == "s" else {}
+        if xf_style is None:
+            return cell_style
+
+        # Check if color in nested_xml is None (fallback color already set in style table)
+        standard_style = xf_style["font"]     # style of the whole cell
+        cell_style_nested = []
+        if cell_type == "s":
+            if xf_style["color"] is not None:
+                if isinstance(shared_list[value_index], list) and len(shared_list[value_index]) > 1:  # nested styles
+                    for embedded_style in style_shared_list[value_index]:
+                        if embedded_style is np.nan:
+                            cell_style_nested.append(standard_style)    # use style of the whole cell
+                        elif embedded_style["color"] is None:
+                            embedded_style_color = dict(embedded_style)
+                            embedded_style_color["color"] = xf_style["color"]
+                            cell_style_nested.append(embedded_style_color)
+                        else:
+                            cell_style_nested.append(embedded_style)
+                    cell_style = cell_style_nested
+                else:
+                    if style_shared_list[value_index][0] is np.nan:
+                        cell_style = [standard_style]
+                    else:
+                        cell_style = [style_shared_list[value_index][0]]
+        else:
+            cell_style = [standard_style]
+
+        return cell_style
+
+    def decode_cell(self, cell_type, style_index, value_text, parts):
+        '''Decode the value(s) and style(s) of a single cell.
+
+        Attributes:
+        cell_type -> str
+            Cell type (attribute t of <c>).
+        style_index -> str
+            Style index (attribute s of <c>).
+        value_text -> str
+            Text of <v> (None if the cell has no value).
+        parts -> dict
+            Shared parts of the xlsx file (see get_shared_parts).'''
+        xf_style = self.get_xf_style(style_index, parts)
+        cell_value = self.decode_value(cell_type, value_text, xf_style, parts)
+        cell_style = self.decode_style(cell_type, int(value_text) if cell_type == "s" else None, xf_style, parts)
+        return cell_value, cell_style
+
+    def iter_raw_cells(self, sheet_nr, cell_range=None, rows=None):
+        '''Stream the raw cells of a worksheet directly from the zip member. Only one <row> is held in memory at a time,
+        finished rows are cleared. Yields cell reference, cell type, style index and text of <v> of each cell.
+
+        Attributes:
+        sheet_nr -> int
+            Number of the sheet to be read.
+        cell_range -> str or tuple
+            Only cells in this range are yielded (see get_cell_range). The cells of the range are selected in the raw
+            worksheet before parsing (see select_range_cells), cells outside are not parsed at all. None: all cells.
+        rows -> set
+            Only cells of these rows (1-based) are yielded, selected like cell_range. None: all rows.'''
+        main = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+        tag_sheet_data, tag_row, tag_c, tag_v = main + "sheetData", main + "row", main + "c", main + "v"
+        bounds = self.get_cell_range(sheet_nr, cell_range)
+        if rows is not None:
+            rows = set(rows)
+            first_row, first_col, last_row, last_col = bounds or (1, 1, self.max_rows, self.max_columns)
+            bounds = (max(first_row, min(rows, default=1)), first_col, min(last_row, max(rows, default=0)), last_col)
+
+        with zipfile.ZipFile(self.xlsx_file, "r") as z:
+            range_cells = self.select_range_cells(z.read("xl/worksheets/sheet"+str(sheet_nr)+".xml"), bounds, rows) if bounds is not None else None
+            if self.engine == "expat":
+                with z.open("xl/worksheets/sheet"+str(sheet_nr)+".xml") as sheet:
+                    chunks = (range_cells,) if range_cells is not None else iter(lambda: sheet.read(self.chunk_size), b'')
+                    for cell_ref, cell_type, style_index, value_text in self.parse_cells_expat(chunks, bounds[2] if bounds is not None else None):
+                        if bounds is not None and range_cells is None:
+                            cell_row, cell_col = self.split_cell_ref(cell_ref)
+                            if not (bounds[0] <= cell_row <= bounds[2] and bounds[1] <= cell_col <= bounds[3]) or (rows is not None and cell_row not in rows):
+                                continue
+                        yield cell_ref, cell_type, style_index, value_text
+                return
+            if range_cells is not None:
+                for cell in ET.fromstring(range_cells).iter(tag_c):
+                    value_element = cell.find(tag_v)
+                    yield cell.attrib.get("r"), cell.attrib.get("t"), cell.attrib.get("s"), value_element.text if value_element is not None else None
+                return
+            with z.open("xl/worksheets/sheet"+str(sheet_nr)+".xml") as sheet:
+                sheet_data = None
+                for event, elem in ET.iterparse(sheet, events=("start", "end")):
+                    if event == "start":
+                        if elem.tag == tag_sheet_data:
+                            sheet_data = elem
+                        continue
+                    if elem.tag != tag_row:
+                        continue
+                    row_nr = int(elem.attrib["r"]) if bounds is not None and "r" in elem.attrib else None
+                    if row_nr is not None and row_nr > bounds[2]:
+                        break   # rows are in ascending order
+                    for cell in elem.iter(tag_c) if row_nr is None or row_nr >= bounds[0] else ():
+                        cell_ref = cell.attrib.get("r")
+                        if bounds is not None:
+                            cell_row, cell_col = self.split_cell_ref(cell_ref)
+                            if not (bounds[0] <= cell_row <= bounds[2] and bounds[1] <= cell_col <= bounds[3]) or (rows is not None and cell_row not in rows):
+                                continue
+                        value_element = cell.find(tag_v)
+                        yield cell_ref, cell.attrib.get("t"), cell.attrib.get("s"), value_element.text if value_element is not None else None
+                    # remove finished row from the tree
+                    if sheet_data is not None:
+                        sheet_data.clear()
+                    else:
+                        elem.clear()
+
+    def parse_cells_expat(self, chunks, last_row=None):
+        '''Yield cell reference, cell type, style index and text of <v> of each cell of a worksheet with the expat parser
+        (engine 'expat'). Only the open cell is tracked in the callbacks and character data is only reported within
+        <v>; no elements are built. The cells of each chunk are yielded after it was parsed.
+
+        Attributes:
+        chunks -> iterable
+            Content of the worksheet in parts (bytes).
+        last_row -> int
+            Parsing stops at the first <row> after this row (rows are in ascending order). None: all rows.'''
+        main = "http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+        tag_row, tag_c, tag_v = main + "row", main + "c", main + "v"
+        cells = []
+        cell, depth, found_v, done = None, 0, False, False     # open cell [ref, type, style, value], depth within the cell
+
+        def start(tag, attrib):
+            nonlocal cell, depth, found_v, done
+            if cell is not None:
+                parser.CharacterDataHandler = None      # text of <v> ends at its first child (as ElementTree .text)
+                if tag == tag_v and depth == 0 and not found_v:
+                    found_v = True      # only the first <v> of a cell counts (as find)
+                    parser.CharacterDataHandler = add_text
+                depth += 1
+            elif tag == tag_c:
+                if not done:
+                    cell, depth, found_v = [attrib.get("r"), attrib.get("t"), attrib.get("s"), None], 0, False
+            elif tag == tag_row and last_row is not None and "r" in attrib and int(attrib["r"]) > last_row:
+                done = True
+
+        def end(tag):
+            nonlocal cell, depth
+            if cell is None:
+                return
+            parser.CharacterDataHandler = None
+            if depth == 0:
+                cells.append(tuple(cell))
+                cell = None
+            else:
+                depth -= 1
+
+        def add_text(text):
+            cell[3] = text if cell[3] is None else cell[3] + text
+
+        parser = expat.ParserCreate(namespace_separator="}")
+        parser.buffer_text = True
+        parser.StartElementHandler, parser.EndElementHandler = start, end
+        for chunk in chunks:
+            parser.Parse(chunk, False)
+            yield from cells
+            cells.clear()
+            if done:
+                return
+        parser.Parse(b'', True)
+        yield from cells
+
+    worksheet_pattern = re.compile(rb'<worksheet\b[^>]*>')
+    row_pattern = re.compile(rb'<row\b[^>]*?\sr="(\d+)"')
+    cell_start_pattern = re.compile(rb'<c\b[^>]*>')
+
+    def get_column_letters(self, col) -> str:
+        '''Return the letters of a column (1-based, e.g. 28 -> 'AB').
+
+        Attributes:
+        col -> int
+            Column number.'''
+        letters = ''
+        while col > 0:
+            col, rest = divmod(col - 1, 26)
+            letters = chr(65 + rest) + letters
+        return letters
+
+    def select_range_cells(self, sheet_xml, bounds, rows=None):
+        '''Return a worksheet with only the <c> elements of a cell range, selected by their reference in the raw XML:
+        rows before the range are skipped by their offset, the columns of the range are part of the search pattern
+        (up to 1024 columns, wider ranges are checked per cell) and the search stops after the last row. With rows only
+        the <row> elements of these rows are searched. None if the worksheet cannot be searched this way (prefixed
+        elements, cells without reference).
+
+        Attributes:
+        sheet_xml -> bytes
+            Content of the worksheet.
+        bounds -> tuple
+            Cell range (first row, first column, last row, last column), see parse_cell_range.
+        rows -> set
+            Rows to be selected (1-based). None: all rows of the range.'''
+        first_row, first_col, last_row, last_col = bounds
+        root = self.worksheet_pattern.search(sheet_xml)
+        start = sheet_xml.find(b'<sheetData', root.end()) if root is not None else -1
+        if start < 0:
+            return None
+        end = sheet_xml.find(b'</sheetData>', start)
+        end = len(sheet_xml) if end < 0 else end
+        first_cell = self.cell_start_pattern.search(sheet_xml, start, end)
+        if first_cell is not None and b' r="' not in first_cell.group():
+            return None
+
+        spans = [(start, end)]
+        row_starts = []     # (row, offset) of the rows of the range
+        for row in self.row_pattern.finditer(sheet_xml, start, end):
+            row_nr = int(row.group(1))
+            if row_nr >= first_row:
+                if rows is None:
+                    spans = [(row.start(), end)]
+                    break
+                row_starts.append((row_nr, row.start()))
+                if row_nr > last_row:
+                    break
+        if rows is not None and row_starts:
+            row_starts.append((None, end))
+            spans = [(offset, row_starts[id + 1][1]) for id, (row_nr, offset) in enumerate(row_starts[:-1]) if row_nr in rows]
+        check_col = last_col - first_col >= 1024
+        letters = b'[A-Z]+' if check_col else b'|'.join(self.get_column_letters(col).encode() for col in range(first_col, last_col + 1))
+        cell_pattern = re.compile(rb'<c\b[^>]*?\sr="(' + letters + rb')(\d+)"[^>]*?(?:/>|>.*?</c>)', re.DOTALL)
+
+        cells = []
+        for begin, end in spans:
+            for cell in cell_pattern.finditer(sheet_xml, begin, end):
+                row = int(cell.group(2))
+                if row > last_row:
+                    break   # rows are in ascending order
+                if row >= first_row and (rows is None or row in rows) and (not check_col or first_col <= self.split_cell_ref(cell.group(1).decode())[1] <= last_col):
+                    cells.append(cell.group())
+        return root.group() + b'<sheetData>' + b''.join(cells) + b'</sheetData></worksheet>'
+
+    def iter_cells(self, sheet_nr, logger, parts=None, cell_range=None, rows=None):
+        '''Stream the decoded cells of a worksheet (bounded memory, see iter_raw_cells). Yields the cell reference and the
+        decoded cell (same entries as decoder).
+
+        Attributes:
+        sheet_nr -> int
+            Number of the sheet to be read.
+        logger -> logging.Logger
+            Logger object.
+        parts -> dict
+            Shared parts of the xlsx file (see get_shared_parts). Parsed once per object if None.
+        cell_range -> str or tuple
+            Only cells in this range are decoded (see iter_raw_cells). None: all cells.
+        rows -> set
+            Only cells of these rows (1-based) are decoded. None: all rows.'''
+        if parts is None:
+            parts = self.load_shared_parts(logger)
+
+        for cell_ref, cell_type, style_index, value_text in self.iter_raw_cells(sheet_nr, cell_range, rows):
+            cell_value, cell_style = self.decode_cell(cell_type, style_index, value_text, parts)
+            yield cell_ref, {
+                "value": cell_value,
+                "type": cell_type,
+                "style": cell_style,
+            }
+
+    def decode_columnar(self, sheet_nr, logger, parts=None, cell_range=None, rows=None):
+        '''Decode a worksheet into a columnar cell store (see xlsxCellStore). Values, styles and cell types are interned,
+        so each cell only costs a few integers. With max_workers large worksheets are decoded in row partitions in a
+        process pool (see decode_partitioned), the store is the same as decoded in one pass.
+
+        Attributes:
+        sheet_nr -> int
+            Number of the sheet to be read.
+        logger -> logging.Logger
+            Logger object.
+        parts -> dict
+            Shared parts of the xlsx file (see get_shared_parts). Parsed once per object if None.
+        cell_range -> str or tuple
+            Only cells in this range are decoded (see iter_raw_cells). None: all cells.
+        rows -> set
+            Only cells of these rows (1-based) are decoded. None: all rows.'''
+        if parts is None:
+            parts = self.load_shared_parts(logger)
+        if self.max_workers is not None and self.max_workers > 1 and cell_range is None and rows is None:
+            cell_store = self.decode_partitioned(sheet_nr, logger, parts)
+            if cell_store is not None:
+                return cell_store
+        return self.decode_cells(self.iter_raw_cells(sheet_nr, cell_range, rows), parts)[0]
+
+    def intern_style(self, cell_style, styles, style_content_index) -> int:
+        '''Return the index of a style list in the interned styles. Equal style lists (same font and run style objects)
+        of different cell formats are stored once.
+
+        Attributes:
+        cell_style -> list
+            Style of a cell (see decode_style).
+        styles -> list
+            Interned style lists.
+        style_content_index -> dict
+            Object ids of the style list -> index in styles.'''
+        content_key = tuple(id(style) for style in cell_style) if isinstance(cell_style, list) else id(cell_style)
+        style_id = style_content_index.get(content_key)
+        if style_id is None:
+            style_id = style_content_index[content_key] = len(styles)
+            styles.append(cell_style)
+        return style_id
+
+    def decode_cells(self, raw_cells, parts):
+        '''Decode raw cells (see iter_raw_cells) into a columnar cell store. Returns the store, the style keys (cell
+        format, shared string index) in order of their first cell and the key index of each cell (see
+        merge_partitions).
+
+        Attributes:
+        raw_cells -> iterable
+            Cell reference, cell type, style index and value text of each cell.
+        parts -> dict
+            Shared parts of the xlsx file (see get_shared_parts).'''
+        rows, columns, shared, xfs = array('i'), array('i'), array('i'), array('i')
+        value_ids, key_ids, type_ids = array('i'), array('i'), array('b')
+        values, styles, types = [], [], []
+        value_index, key_index, style_content_index, type_index = {}, {}, {}, {}
+        style_keys, key_styles = [], []     # (cell format, shared string) -> index in styles
+
+        for cell_ref, cell_type, style_index, value_text in raw_cells:
+            row, column = self.split_cell_ref(cell_ref)
+            xf = int(style_index) if style_index is not None else -1
+            sst = int(value_text) if cell_type == "s" else -1
+            xf_style = self.get_xf_style(style_index, parts)
+
+            # value: index of the shared string if unchanged by the number format, else interned value
+            cell_value = self.decode_value(cell_type, value_text, xf_style, parts)
+            if cell_value is None or (sst >= 0 and cell_value == parts["shared_list"][sst]):
+                value_id = -1
+            else:
+                key = cell_value[0] if len(cell_value) == 1 else tuple(cell_value)     # single values are stored unwrapped
+                value_id = value_index.get(key)
+                if value_id is None:
+                    value_id = value_index[key] = len(values)
+                    values.append(key)
+
+            # style: same for all cells with equal cell format and shared string
+            key = (xf, sst)
+            key_id = key_index.get(key)
+            if key_id is None:
+                key_id = key_index[key] = len(style_keys)
+                style_keys.append(key)
+                key_styles.append(self.intern_style(self.decode_style(cell_type, sst if sst >= 0 else None, xf_style, parts), styles, style_content_index))
+
+            type_id = type_index.get(cell_type)
+            if type_id is None:
+                type_id = type_index[cell_type] = len(types)
+                types.append(cell_type)
+
+            rows.append(row - 1)
+            columns.append(column - 1)
+            shared.append(sst if value_id == -1 else -1)
+            xfs.append(xf)
+            value_ids.append(value_id)
+            key_ids.append(key_id)
+            type_ids.append(type_id)
+
+        style_ids = np.asarray(key_styles, dtype=np.int32)[np.asarray(key_ids, dtype=np.int32)]
+        return xlsxCellStore(rows, columns, shared, xfs, value_ids, style_ids, type_ids, values, styles, types, parts["shared_list"]), style_keys, key_ids
+
+    row_start_pattern = re.compile(rb'<row\b')
+    partition_size = 2**21          # minimum size of a row partition in bytes (see decode_partitioned)
+    partition_threshold = 2**22     # minimum size of a worksheet in bytes to be decoded in row partitions (below, pickling and merging cost about what two workers save)
+    partition_decoder = None        # decoder of the workbook in the worker processes of decode_partitioned
+
+    def split_sheet_rows(self, sheet_xml, n_partitions):
+        '''Split the <sheetData> of a worksheet on <row> boundaries into partitions of about equal size. Returns each
+        partition as worksheet (root element with the namespaces and the rows of the partition) or None if the
+        worksheet cannot be split this way (prefixed elements, no <sheetData>).
+
+        Attributes:
+        sheet_xml -> bytes
+            Content of the worksheet.
+        n_partitions -> int
+            Number of partitions.'''
+        root = self.worksheet_pattern.search(sheet_xml)
+        start = sheet_xml.find(b'<sheetData', root.end()) if root is not None else -1
+        end = sheet_xml.find(b'</sheetData>', start) if start >= 0 else -1
+        if end < 0:
+            return None
+        start = sheet_xml.find(b'>', start) + 1
+        offsets = [start]
+        for id in range(1, n_partitions):
+            row = self.row_start_pattern.search(sheet_xml, max(offsets[-1] + 1, start + (end - start) * id // n_partitions), end)
+            if row is None:
+                break
+            offsets.append(row.start())
+        offsets.append(end)
+        return [root.group() + b'<sheetData>' + sheet_xml[begin:stop] + b'</sheetData></worksheet>' for begin, stop in zip(offsets, offsets[1:])]
+
+    def iter_xml_cells(self, sheet_xml):
+        '''Yield cell reference, cell type, style index and text of <v> of each cell of a worksheet document (see
+        iter_raw_cells).
+
+        Attributes:
+        sheet_xml -> bytes
+            Content of the worksheet.'''
+        if self.engine == "expat":
+            yield from self.parse_cells_expat((sheet_xml,))
+            return
+        main = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+        tag_c, tag_v = main + "c", main + "v"
+        for cell in ET.fromstring(sheet_xml).iter(tag_c):
+            value_element = cell.find(tag_v)
+            yield cell.attrib.get("r"), cell.attrib.get("t"), cell.attrib.get("s"), value_element.text if value_element is not None else None
+
+    @staticmethod
+    def init_partition_worker(xlsx_file, engine, template_key, style_parts):
+        '''Initializer of the worker processes of decode_partitioned: each worker opens the workbook once. The resolved
+        style parts are passed by the decoder of the workbook, so the workers only index the shared strings.
+
+        Attributes:
+        xlsx_file -> str
+            Path to the xlsx file.
+        engine -> str
+            XML engine of the worksheets and shared strings.
+        template_key -> str
+            Key of the template of the workbook (see get_template_key).
+        style_parts -> dict
+            Style parts of the workbook (see get_style_parts). None: parsed by the worker.'''
+        if style_parts is not None:
+            xlsxDecoder.style_cache[template_key] = style_parts     # read only: found by load_shared_parts
+        xlsxDecoder.partition_decoder = xlsxDecoder(xlsx_file, engine=engine)
+
+    @staticmethod
+    def decode_partition(partition) -> dict:
+        '''Decode a row partition of a worksheet in a worker process (see decode_partitioned). Returns the arrays and
+        interned values of the cell store, the style keys and the shared strings used by the partition; the styles are
+        resolved by merge_partitions.
+
+        Attributes:
+        partition -> bytes
+            Worksheet with the rows of the partition (see split_sheet_rows).'''
+        decoder = xlsxDecoder.partition_decoder
+        parts = decoder.load_shared_parts(logging.getLogger(__name__))
+        cell_store, style_keys, key_ids = decoder.decode_cells(decoder.iter_xml_cells(partition), parts)
+        shared_list = parts["shared_list"]
+        return {
+            "rows": cell_store.rows, "columns": cell_store.columns, "shared": cell_store.shared, "xfs": cell_store.xfs,
+            "value_ids": cell_store.value_ids, "type_ids": cell_store.type_ids, "values": cell_store.values, "types": cell_store.types,
+            "style_keys": style_keys, "key_ids": np.asarray(key_ids, dtype=np.int32),
+            "entries": {sst: shared_list.get_entry(sst) for xf, sst in style_keys if sst >= 0},
+        }
+
+    def merge_partitions(self, partitions, parts):
+        '''Merge the decoded row partitions of a worksheet (see decode_partition) in row order into one cell store.
+        Values, cell types and styles are interned in the order of their first cell as by decode_cells, so the store is
+        the same as decoded in one pass. The shared strings decoded by the workers are taken into the shared string
+        table of this object. Raises ValueError if the partitions are not in row order or their arrays do not match.
+
+        Attributes:
+        partitions -> list
+            Decoded partitions in row order.
+        parts -> dict
+            Shared parts of the xlsx file (see get_shared_parts).'''
+        shared_list = parts["shared_list"]
+        values, styles, types = [], [], []
+        value_index, key_index, style_content_index, type_index = {}, {}, {}, {}
+        arrays = {name: [] for name in ("rows", "columns", "shared", "xfs", "value_ids", "style_ids", "type_ids")}
+        last_row = -1
+        for id, partition in enumerate(partitions):
+            # the partitions must follow each other in row order with one entry per cell in every array
+            n_cells = len(partition["rows"])
+            if any(len(partition[name]) != n_cells for name in ("columns", "shared", "xfs", "value_ids", "type_ids", "key_ids")):
+                raise ValueError(f'Row partition {id}: arrays of different length (cells: {n_cells})')
+            if n_cells:
+                if partition["rows"][0] <= last_row:
+                    raise ValueError(f'Row partition {id} starts in row {partition["rows"][0] + 1}, previous partition ends in row {last_row + 1}')
+                last_row = partition["rows"][-1]
+
+            for sst, (value, style) in partition["entries"].items():
+                # NaN of runs without own style is compared by identity (see decode_style)
+                shared_list.entries.setdefault(sst, (value, [np.nan if isinstance(run, float) and run != run else run for run in style]))
+            # interned values and cell types: the ones new to the merged store are appended in the order of the partition
+            n_values, n_types = len(values), len(types)
+            value_map = [value_index.setdefault(value, len(value_index)) for value in partition["values"]]
+            values += [value for value, value_id in zip(partition["values"], value_map) if value_id >= n_values]
+            type_map = [type_index.setdefault(cell_type, len(type_index)) for cell_type in partition["types"]]
+            types += [cell_type for cell_type, type_id in zip(partition["types"], type_map) if type_id >= n_types]
+            if len(values) != len(value_index) or len(types) != len(type_index):
+                raise ValueError(f'Row partition {id}: interned values or cell types not unique')
+            key_map = []
+            for xf, sst in partition["style_keys"]:
+                style_id = key_index.get((xf, sst))
+                if style_id is None:
+                    cell_style = self.decode_style("s" if sst >= 0 else None, sst if sst >= 0 else None, self.get_xf_style(xf if xf >= 0 else None, parts), parts)
+                    style_id = key_index[(xf, sst)] = self.intern_style(cell_style, styles, style_content_index)
+                key_map.append(style_id)
+
+            for name in ("rows", "columns", "shared", "xfs"):
+                arrays[name].append(partition[name])
+            arrays["value_ids"].append(np.append(np.asarray(value_map, dtype=np.int32), -1)[partition["value_ids"]])     # -1: shared string or no value
+            arrays["type_ids"].append(np.asarray(type_map, dtype=np.int8)[partition["type_ids"]])
+            arrays["style_ids"].append(np.asarray(key_map, dtype=np.int32)[partition["key_ids"]])
+        merged = {name: np.concatenate(chunks) if chunks else [] for name, chunks in arrays.items()}
+        return xlsxCellStore(merged["rows"], merged["columns"], merged["shared"], merged["xfs"], merged["value_ids"], merged["style_ids"],
+                             merged["type_ids"], values, styles, types, shared_list)
+
+    def decode_partitioned(self, sheet_nr, logger, parts):
+        '''Decode a large worksheet in row partitions in a process pool of max_workers (see split_sheet_rows,
+        decode_partition, merge_partitions). The workers open the workbook by its path (source_path), only the
+        partitions are sent to them. Returns None if the worksheet is smaller than partition_threshold, cannot be split
+        or the workbook has no path; it is then decoded in one pass.
+
+        Attributes:
+        sheet_nr -> int
+            Number of the sheet to be read.
+        logger -> logging.Logger
+            Logger object.
+        parts -> dict
+            Shared parts of the xlsx file (see get_shared_parts).'''
+        if self.source_path is None:
+            return None
+        with zipfile.ZipFile(self.xlsx_file, "r") as z:
+            info = z.getinfo("xl/worksheets/sheet"+str(sheet_nr)+".xml")
+            n_partitions = min(4 * self.max_workers, info.file_size // self.partition_size)
+            if info.file_size < self.partition_threshold or n_partitions < 2:
+                return None
+            partitions = self.split_sheet_rows(z.read(info), n_partitions)
+            template_key = self.get_template_key(z)
+        if partitions is None or len(partitions) < 2:
+            return None
+        logger.debug('Decode sheet %s in %s row partitions', sheet_nr, len(partitions))
+        if self.executor is None:
+            # one pool for all worksheets of the workbook; the style parts are resolved (see load_shared_parts)
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=xlsxDecoder.init_partition_worker,
+                                                initargs=(self.source_path, self.engine, template_key, self.load_style_parts(template_key)))
+        return self.merge_partitions(list(self.executor.map(xlsxDecoder.decode_partition, partitions)), parts)
+
+    def close(self):
+        '''Stop the process pool of the row partitions (see decode_partitioned).'''
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def decoder(self, sheet_nr, logger, stream=False, columnar=False, cell_range=None, rows=None) -> dict:
+        '''Decode the xlsx file and return the content of the cells.
+        
+        Attributes:
+        sheet_nr -> int
+            Number of the sheet to be read.
+        logger -> logging.Logger
+            Logger object.
+        stream -> bool
+            True to parse the worksheet row by row from the zip member (bounded memory, see iter_cells).
+        columnar -> bool
+            True to return a columnar cell store (see xlsxCellStore) instead of a dict. The store offers the same
+            dict-like access by cell reference.
+        cell_range -> str or tuple
+            Only decode the cells in this range: explicit range (e.g. "B2:K400"), 'dimension' for the range of
+            <dimension> or None for all cells (see get_cell_range). Cells outside are skipped while parsing.
+        rows -> set
+            Only decode the cells of these rows (1-based, e.g. the rows of wanted metadata). None: all rows.'''
+        # Namespace für Excel-Dateien
+        namespace = {"main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+        logger.info('Funktion DECODER gestartet')
+
+        if columnar:
+            return self.decode_columnar(sheet_nr, logger, cell_range=cell_range, rows=rows)
+        if stream or cell_range is not None or rows is not None:
+            return dict(self.iter_cells(sheet_nr, logger, cell_range=cell_range, rows=rows))
+
+        parts = self.load_shared_parts(logger)
+        sheet_tree = ET.fromstring(self.unzip_sheet(sheet_nr))
+
+        # Decode each cell. cell_data -> dict with each different formatted values as entries of a list with its style in a different list
+        cell_data = {}
 
         for row in sheet_tree.find("main:sheetData", namespace):
             for cell in row:
@@ -447,77 +1451,9 @@ class xlsxDecoder():
                 cell_type = cell.attrib.get("t")  # Zelltyp
                 style_index = cell.attrib.get("s")  # Stilindex
 
-                # default values
-                cell_value = None
-                cell_style = {}
-
-                # 1. Identify cell value and style
-                if cell_type == "s":  # Shared String
-                    value_index = int(cell.find("main:v", namespace).text)
-                    cell_value = shared_list[value_index]
-                    cell_style = style_shared_list[value_index]
-                else:
-                    value_element = cell.find("main:v", namespace)
-                    if value_element is not None:
-                        cell_value = [value_element.text]
-
-                # 2. Add style to each cell value
-                if style_index is not None:
-                    style_index = int(style_index)
-                    font_id = None
-                    cellXfs = styles_tree.find("main:cellXfs", namespace)
-                    # 2.1. Check if <cellXfs> is defined
-                    try:
-                        target_style = cellXfs.findall("main:xf", namespace)[style_index]
-                        font_id = target_style.attrib.get('fontId') 
-                        numFmtId = target_style.attrib.get('numFmtId')  
-                        if font_id is not None:
-                            font_id = int(font_id)
-                        if numFmtId is not None:
-                            numFmts = styles_tree.find("main:numFmts", namespace)
-                            num_fmt = self.parse_styles_xml(numFmts, namespace)
-                            if cell_value is not None:
-                                for id, value in enumerate(cell_value):
-                                    cell_value[id] = self.get_excel_format(value, numFmtId, num_fmt)
-                    except (IndexError, ValueError):
-                        font_id = 0 # font-ID ungültig
-
-                    # 2.2. Fallback
-                    if fonts[font_id]["color"] is None or fonts[font_id]["color"] is np.nan:
-                        fonts[font_id]["color"] = standard_color
-                        
-                    # 2.3. Check of dynamic styles in <dxfs>
-                    dxfs = styles_tree.find("main:dxfs", namespace)
-                    if dxfs is not None and font_id is None:
-                        dynamic_style = dxfs.findall("main:dxf", namespace)
-                        font_id = dynamic_style.attrib.get('fontId')
-                        if font_id is not None:
-                            font_id = int(font_id)
-
-                    # 2.4. Check if font_id exists and if color in nested_xml is None
-                    standard_style = fonts[font_id] if font_id < len(fonts) and font_id is not None else {}     # style of the whole cell
-                    cell_style_nested = []
-                    if cell_type == "s":
-                        if fonts[font_id]["color"] is not None:
-                            if isinstance(shared_list[value_index], list) and len(shared_list[value_index]) > 1:  # nested styles
-                                for embedded_style in style_shared_list[value_index]:
-                                    if embedded_style is np.nan:
-                                        cell_style_nested.append(standard_style)    # use style of the whole cell
-                                    elif embedded_style["color"] is None:
-                                        embedded_style_color = embedded_style
-                                        embedded_style_color["color"] = fonts[font_id]["color"]
-                                        cell_style_nested.append(embedded_style_color)
-                                    else:
-                                        cell_style_nested.append(embedded_style)
-                                cell_style = cell_style_nested
-                            else:
-                                if style_shared_list[value_index][0] is np.nan:
-                                    cell_style = [standard_style]
-                                else:
-                                    cell_style = [style_shared_list[value_index][0]]
-                    else:
-                        cell_style = [standard_style]
-
+                value_element = cell.find("main:v", namespace)
+                cell_value, cell_style = self.decode_cell(cell_type, style_index,
+                                                          value_element.text if value_element is not None else None, parts)
 
                 # 3. Write data in dict
                 cell_data[cell_ref] = {
@@ -528,13 +1464,640 @@ class xlsxDecoder():
 
         return cell_data
 
+class xlsDecoder(xlsxDecoder):
+    '''Decoding of legacy .xls files (BIFF) with xlrd. The XF, font and palette records are resolved like styles.xml
+    and the text cells are collected in a shared string table, so the cells are decoded to the same structure as
+    xlsxDecoder (value, type, style with color and strike) without converting the file to .xlsx.'''
+
+    def __init__(self, xls_file='') -> None:
+        '''Initialize the xlsDecoder class.
+
+        Attributes:
+        xls_file -> str
+            Path to xls file (or file object).'''
+        super().__init__(xlsx_file=xls_file)
+        self.book = None            # xlrd workbook (opened on first access)
+        self.column_letters = {}    # column index -> letters of the cell reference
+
+    def open_book(self):
+        '''Return the xlrd workbook with formatting information (opened once per object).'''
+        if self.book is None:
+            if isinstance(self.xlsx_file, (str, os.PathLike)):
+                self.book = xlrd.open_workbook(self.xlsx_file, formatting_info=True, on_demand=True)
+            else:
+                self.xlsx_file.seek(0)
+                self.book = xlrd.open_workbook(file_contents=self.xlsx_file.read(), formatting_info=True, on_demand=True)
+        return self.book
+
+    def get_sheet_names(self):
+        '''Return the names of all worksheets in the order of the workbook (sheet_nr = position + 1).'''
+        return self.open_book().sheet_names()
+
+    def get_font(self, font, colour_map) -> dict:
+        '''Convert a font record of xlrd to the font properties of xlsxDecoder.get_fonts.
+
+        Attributes:
+        font -> xlrd.formatting.Font
+            Font record.
+        colour_map -> dict
+            Palette of the workbook (color index -> (R, G, B), None for system colors).'''
+        color = colour_map.get(font.colour_index)
+        return {
+            "bold": bool(font.bold),
+            "italic": bool(font.italic),
+            "underline": font.underline_type != 0,
+            "strike": bool(font.struck_out),
+            "font": font.name,
+            "size": '%g' % (font.height / 20),    # height in twips
+            "color": list(color) if color is not None else None
+        }
+
+    def load_shared_parts(self, logger=None) -> dict:
+        '''Return the parts shared by all worksheets in the structure of xlsxDecoder.get_shared_parts. The shared string
+        table is filled while the worksheets are read (see get_shared_index).
+
+        Attributes:
+        logger -> logging.Logger
+            Logger object.'''
+        if self.parts is None:
+            book = self.open_book()
+            fonts = [self.get_font(font, book.colour_map) for font in book.font_list]
+            run_fonts = [self.get_font(font, book.colour_map) for font in book.font_list]   # rich text runs keep their own color (no fallback)
+            num_fmts = {key: num_fmt.format_str for key, num_fmt in book.format_map.items()}
+            style_table = [self.resolve_xf(xf.font_index, str(xf.format_key), fonts, num_fmts) for xf in book.xf_list]
+            self.parts = {
+                "shared_list": [],
+                "style_shared_list": [],
+                "shared_index": {},
+                "run_fonts": run_fonts,
+                "fonts": fonts,
+                "style_table": style_table,
+                "fallback_style": self.resolve_xf(0, None, fonts, {}),
+            }
+            if logger is not None and logger.isEnabledFor(logging.DEBUG):
+                logger.debug('--- Print all font entities. ---')
+                for id, font_prop in enumerate(fonts):
+                    logger.debug('Font ID %s: %s', id, font_prop)
+                logger.debug('--- Print all xf entities. ---')
+                for id, xf in enumerate(book.xf_list):
+                    logger.debug('xf ID %s has font ID %s and number format ID %s', id, xf.font_index, xf.format_key)
+        return self.parts
+
+    def get_shared_index(self, text, runlist, parts) -> int:
+        '''Return the index of a text in the shared string table (added if new). Rich text is split into its runs; the
+        text before the first run has the font of the cell (np.nan as in sharedStrings.xml).
+
+        Attributes:
+        text -> str
+            Text of the cell.
+        runlist -> list
+            Rich text runs of the cell as (offset, font index) (None if the text has one font).
+        parts -> dict
+            Shared parts of the xls file (see load_shared_parts).'''
+        key = (text, tuple(runlist) if runlist else None)
+        shared_index = parts["shared_index"].get(key)
+        if shared_index is None:
+            if not runlist:
+                values, styles = [text], [np.nan]
+            else:
+                runs = ([(0, None)] if runlist[0][0] > 0 else []) + list(runlist)
+                values, styles = [], []
+                for id, (offset, font_index) in enumerate(runs):
+                    end = runs[id + 1][0] if id + 1 < len(runs) else len(text)
+                    if end > offset:
+                        values.append(text[offset:end])
+                        styles.append(parts["run_fonts"][font_index] if font_index is not None else np.nan)
+            shared_index = parts["shared_index"][key] = len(parts["shared_list"])
+            parts["shared_list"].append(values)
+            parts["style_shared_list"].append(styles)
+        return shared_index
+
+    def get_cell_ref(self, rowx, colx) -> str:
+        '''Return the cell reference (e.g. "A1") of a cell.
+
+        Attributes:
+        rowx -> int
+            Row index (0-based).
+        colx -> int
+            Column index (0-based).'''
+        letters = self.column_letters.get(colx)
+        if letters is None:
+            col, letters = colx + 1, ''
+            while col > 0:
+                col, rest = divmod(col - 1, 26)
+                letters = chr(65 + rest) + letters
+            self.column_letters[colx] = letters
+        return letters + str(rowx + 1)
+
+    def get_number_text(self, value) -> str:
+        '''Return a number as written in <v> of a xlsx file (e.g. 12 instead of 12.0).
+
+        Attributes:
+        value -> float
+            Number of the cell.'''
+        if value.is_integer() and abs(value) < 1e15:
+            return str(int(value))
+        return repr(value)
+
+    def get_dimension(self, sheet_nr):
+        '''Return the used range of a worksheet (see xlsxDecoder.get_dimension) or None if the worksheet is empty.
+
+        Attributes:
+        sheet_nr -> int
+            Number of the sheet to be read.'''
+        sheet = self.open_book().sheet_by_index(sheet_nr - 1)
+        return (1, 1, sheet.nrows, sheet.ncols) if sheet.nrows and sheet.ncols else None
+
+    def iter_raw_cells(self, sheet_nr, cell_range=None, rows=None):
+        '''Yield cell reference, cell type, style index and value text of each cell of a worksheet in the form of the
+        <c> elements of a xlsx worksheet (see xlsxDecoder.iter_raw_cells). Text cells refer to the shared string table.
+
+        Attributes:
+        sheet_nr -> int
+            Number of the sheet to be read.
+        cell_range -> str or tuple
+            Only cells in this range are yielded (see xlsxDecoder.get_cell_range). None: all cells.
+        rows -> set
+            Only cells of these rows (1-based) are yielded. None: all rows.'''
+        parts = self.load_shared_parts()
+        book = self.open_book()
+        sheet = book.sheet_by_index(sheet_nr - 1)
+        runlists = sheet.rich_text_runlist_map
+        first_row, first_col, last_row, last_col = self.get_cell_range(sheet_nr, cell_range) or (1, 1, sheet.nrows, sheet.ncols)
+        for rowx in range(first_row - 1, min(last_row, sheet.nrows)):
+            if rows is not None and rowx + 1 not in rows:
+                continue
+            for colx, (cell_type, value) in enumerate(zip(sheet.row_types(rowx, first_col - 1, last_col), sheet.row_values(rowx, first_col - 1, last_col)), first_col - 1):
+                if cell_type == xlrd.XL_CELL_EMPTY:
+                    continue
+                cell_ref = self.get_cell_ref(rowx, colx)
+                style_index = str(sheet.cell_xf_index(rowx, colx))
+                if cell_type == xlrd.XL_CELL_TEXT:
+                    yield cell_ref, "s", style_index, str(self.get_shared_index(value, runlists.get((rowx, colx)), parts))
+                elif cell_type in (xlrd.XL_CELL_NUMBER, xlrd.XL_CELL_DATE):
+                    yield cell_ref, None, style_index, self.get_number_text(value)
+                elif cell_type == xlrd.XL_CELL_BOOLEAN:
+                    yield cell_ref, "b", style_index, str(int(value))
+                elif cell_type == xlrd.XL_CELL_ERROR:
+                    yield cell_ref, "e", style_index, xlrd.error_text_from_code.get(value)
+                else:   # blank cell with format
+                    yield cell_ref, None, style_index, None
+        book.unload_sheet(sheet_nr - 1)
+
+    def decoder(self, sheet_nr, logger, stream=False, columnar=False, cell_range=None, rows=None) -> dict:
+        '''Decode the xls file and return the content of the cells (see xlsxDecoder.decoder).
+
+        Attributes:
+        sheet_nr -> int
+            Number of the sheet to be read.
+        logger -> logging.Logger
+            Logger object.
+        stream -> bool
+            Without effect (xlrd reads the whole worksheet).
+        columnar -> bool
+            True to return a columnar cell store (see xlsxCellStore) instead of a dict.
+        cell_range -> str or tuple
+            Only decode the cells in this range (see xlsxDecoder.decoder).
+        rows -> set
+            Only decode the cells of these rows (1-based). None: all rows.'''
+        logger.info('Funktion DECODER gestartet')
+        self.load_shared_parts(logger)
+        if columnar:
+            return self.decode_columnar(sheet_nr, logger, cell_range=cell_range, rows=rows)
+        return dict(self.iter_cells(sheet_nr, logger, cell_range=cell_range, rows=rows))
+
+class xlsxSharedStrings(Sequence):
+    '''Lazy table of the shared strings of a workbook (sharedStrings.xml). A single pass over the raw part only
+    indexes the offsets of the <si> entries; value and style list of an entry are decoded on first access and memoized,
+    so only the strings referenced by the decoded worksheets are parsed. Indexed like the shared_list of
+    xlsxDecoder.get_shared_strings, the style lists (style_shared_list) are read through styles.'''
+
+    root_pattern = re.compile(rb'<sst\b[^>]*>')
+    si_pattern = re.compile(rb'<si\b[^>]*?(?:/>|>.*?</si>)', re.DOTALL)
+
+    def __init__(self, shared_strings, decoder, colors) -> None:
+        '''Initialize the xlsxSharedStrings class.
+
+        Attributes:
+        shared_strings -> bytes
+            Content of the sharedStrings.xml file.
+        decoder -> xlsxDecoder
+            Decoder of the entries (see xlsxDecoder.get_shared_string).
+        colors -> list
+            List of colors in the Excel file.'''
+        if isinstance(shared_strings, str):
+            shared_strings = shared_strings.encode("utf-8")
+        self.decoder = decoder
+        self.colors = colors
+        self.namespace = {"main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+        self.entries = {}       # index -> (value list, style list) of the decoded entries
+        self.styles = xlsxSharedStyles(self)
+
+        root = self.root_pattern.search(shared_strings)
+        if root is None:        # root with namespace prefix: decode all entries at once
+            shared_list, style_shared_list = decoder.get_shared_strings(ET.fromstring(shared_strings), self.namespace, colors)
+            self.entries = dict(enumerate(zip(shared_list, style_shared_list)))
+            self.data, self.root_tag, self.offsets = b'', b'', array('q', [0] * 2 * len(self.entries))
+            return
+        self.data = shared_strings
+        self.root_tag = root.group()    # namespace declarations of the entries
+        self.offsets = array('q')       # start and end of each <si>
+        for match in self.si_pattern.finditer(shared_strings, root.end()):
+            self.offsets.extend(match.span())
+
+    def get_entry(self, index):
+        '''Return value list and style list of an entry, decoded on first access.
+
+        Attributes:
+        index -> int
+            Index of the shared string.'''
+        entry = self.entries.get(index)
+        if entry is None:
+            start, end = self.offsets[2 * index], self.offsets[2 * index + 1]
+            if self.decoder.engine == "expat":
+                values, styles = self.decoder.get_shared_string_expat(self.root_tag + self.data[start:end] + b'</sst>', self.colors)
+            else:
+                si = ET.fromstring(self.root_tag + self.data[start:end] + b'</sst>')[0]
+                values, styles = self.decoder.get_shared_string(si, self.namespace, self.colors)
+            entry = self.entries[index] = (values[0], styles[0])
+        return entry
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[id] for id in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('shared string index out of range')
+        return self.get_entry(index)[0]
+
+    def __len__(self):
+        return len(self.offsets) // 2
+
+class xlsxSharedStyles(Sequence):
+    '''Style lists of the entries of a lazy shared string table (see xlsxSharedStrings).'''
+
+    def __init__(self, shared_strings) -> None:
+        '''Initialize the xlsxSharedStyles class.
+
+        Attributes:
+        shared_strings -> xlsxSharedStrings
+            Lazy table of the shared strings.'''
+        self.shared_strings = shared_strings
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[id] for id in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('shared string index out of range')
+        return self.shared_strings.get_entry(index)[1]
+
+    def __len__(self):
+        return len(self.shared_strings)
+
+class xlsxCellStore(Mapping):
+    '''Columnar store of the decoded cells of a worksheet. Row index, column index (both 0-based), shared string index,
+    xf index and the ids of the interned values, styles and cell types are held in NumPy arrays. The store can be read
+    like the dict returned by xlsxDecoder.decoder (cell reference -> {"value", "type", "style"}).'''
+
+    def __init__(self, rows, columns, shared, xfs, value_ids, style_ids, type_ids, values, styles, types, shared_list) -> None:
+        '''Initialize the xlsxCellStore class.
+
+        Attributes:
+        rows -> array
+            Row index of each cell (0-based).
+        columns -> array
+            Column index of each cell (0-based).
+        shared -> array
+            Index of the shared string of each cell (-1 if the value is not a shared string).
+        xfs -> array
+            Index of the cell format (xf record) of each cell (-1 if the cell has no style index).
+        value_ids -> array
+            Index in values of each cell (-1 if the value is a shared string or None).
+        style_ids -> array
+            Index in styles of each cell.
+        type_ids -> array
+            Index in types of each cell.
+        values -> list
+            Interned values which are no unchanged shared strings (single values unwrapped, multiple values as tuple).
+        styles -> list
+            Interned style lists.
+        types -> list
+            Interned cell types.
+        shared_list -> list
+            List of shared strings of the workbook.'''
+        self.rows = np.asarray(rows, dtype=np.int32)
+        self.columns = np.asarray(columns, dtype=np.int32)
+        self.shared = np.asarray(shared, dtype=np.int32)
+        self.xfs = np.asarray(xfs, dtype=np.int32)
+        self.value_ids = np.asarray(value_ids, dtype=np.int32)
+        self.style_ids = np.asarray(style_ids, dtype=np.int32)
+        self.type_ids = np.asarray(type_ids, dtype=np.int8)
+        self.values = values
+        self.styles = styles
+        self.types = types
+        self.shared_list = shared_list
+        self._positions = None      # cell reference -> position (built on first access by cell reference)
+
+    def get_value(self, pos):
+        '''Return the value list of the cell at a position (None if the cell has no value).
+
+        Attributes:
+        pos -> int
+            Position of the cell in the store.'''
+        if self.value_ids[pos] >= 0:
+            value = self.values[self.value_ids[pos]]
+            return list(value) if isinstance(value, tuple) else [value]
+        if self.shared[pos] >= 0:
+            return list(self.shared_list[self.shared[pos]])
+        return None
+
+    def get_value_counts(self):
+        '''Return the number of values (rich text runs) of each cell (0 if the cell has no value).'''
+        counts = np.zeros(len(self), dtype=np.int32)
+        is_value = self.value_ids >= 0
+        value_counts = np.array([len(value) if isinstance(value, tuple) else 1 for value in self.values], dtype=np.int32)
+        counts[is_value] = value_counts[self.value_ids[is_value]]
+        is_shared = self.shared >= 0
+        shared_ids, inverse = np.unique(self.shared[is_shared], return_inverse=True)
+        shared_counts = np.array([len(self.shared_list[id]) for id in shared_ids], dtype=np.int32)
+        counts[is_shared] = shared_counts[inverse]
+        return counts
+
+    def get_first_values(self):
+        '''Return the first value of each cell as object array (None if the cell has no value).'''
+        first_values = np.full(len(self), None, dtype=object)
+        is_value = self.value_ids >= 0
+        values = np.empty(len(self.values), dtype=object)
+        values[:] = [value[0] if isinstance(value, tuple) else value for value in self.values]
+        first_values[is_value] = values[self.value_ids[is_value]]
+        is_shared = self.shared >= 0
+        shared_ids, inverse = np.unique(self.shared[is_shared], return_inverse=True)
+        shared_values = np.empty(len(shared_ids), dtype=object)
+        shared_values[:] = [self.shared_list[id][0] for id in shared_ids]
+        first_values[is_shared] = shared_values[inverse]
+        return first_values
+
+    def get_cell(self, pos) -> dict:
+        '''Return the cell at a position in the format of xlsxDecoder.decoder.
+
+        Attributes:
+        pos -> int
+            Position of the cell in the store.'''
+        return {
+            "value": self.get_value(pos),
+            "type": self.types[self.type_ids[pos]],
+            "style": self.styles[self.style_ids[pos]],
+        }
+
+    def get_cell_ref(self, pos) -> str:
+        '''Return the cell reference (e.g. "A1") of the cell at a position.
+
+        Attributes:
+        pos -> int
+            Position of the cell in the store.'''
+        col = int(self.columns[pos]) + 1
+        letters = ''
+        while col > 0:
+            col, rest = divmod(col - 1, 26)
+            letters = chr(65 + rest) + letters
+        return letters + str(int(self.rows[pos]) + 1)
+
+    def find_cell(self, row, col) -> int:
+        '''Return the position of the cell at row and column (0-based) or -1 if the sheet has no such cell. The rows
+        are stored in ascending order (as in the sheet), so only the cells of the row are searched.
+
+        Attributes:
+        row -> int
+            Row index of the cell.
+        col -> int
+            Column index of the cell.'''
+        start, end = np.searchsorted(self.rows, [row, row + 1])
+        found = np.flatnonzero(self.columns[start:end] == col)
+        return int(start + found[0]) if found.size else -1
+
+    def __getitem__(self, cell_ref):
+        if self._positions is None:
+            self._positions = {self.get_cell_ref(pos): pos for pos in range(len(self))}
+        return self.get_cell(self._positions[cell_ref])
+
+    def __iter__(self):
+        for pos in range(len(self)):
+            yield self.get_cell_ref(pos)
+
+    def __len__(self):
+        return len(self.rows)
+
+class TraceBatch():
+    '''Debug records of a sheet collected as raw tuples (message, arguments) and logged as one record. It is passed
+    instead of the logger to the per-cell checks (only debug and isEnabledFor are used), so the per-cell trace costs
+    one append; the messages are merged with their arguments by the background writer (see TraceFormatter).'''
+
+    def __init__(self) -> None:
+        self.records = []
+
+    def isEnabledFor(self, level):
+        return True
+
+    def debug(self, msg, *args):
+        self.records.append((msg, args))
+
+    def get_lines(self):
+        '''Return the messages of the collected records merged with their arguments.'''
+        return [msg % args if args else msg for msg, args in self.records]
+
+class TraceQueueHandler(logging.handlers.QueueHandler):
+    '''Queue handler of the trace log. Only the message is merged with its arguments in the logging thread; formatting
+    and writing of the record are left to the background writer (see xlsxParser.setup_logger). A TraceBatch is not
+    changed after it was logged, so it is merged by the writer.'''
+
+    def prepare(self, record):
+        if isinstance(record.msg, TraceBatch):
+            return record
+        record.msg = record.getMessage()    # arguments may change after the call
+        record.args = None
+        return record
+
+class TraceFormatter(logging.Formatter):
+    '''Formatter of the trace log. A TraceBatch is written as one line per collected record, each with the prefix of
+    the batch record (same layout as single records).'''
+
+    def format(self, record):
+        if not isinstance(record.msg, TraceBatch):
+            return super().format(record)
+        if self.usesTime():
+            record.asctime = self.formatTime(record, self.datefmt)
+        lines = []
+        for line in record.msg.get_lines():
+            record.message = line
+            lines.append(self.formatMessage(record))
+        return '\n'.join(lines)
+
+class xlsConverter():
+    '''Conversion service of .xls files to .xlsx files. One subprocess keeps the JVM (aspose-cells) running and converts
+    batches of files sent over a pipe. The converted files are cached by the SHA-256 of the .xls file, so a file is only
+    converted once.'''
+
+    def __init__(self, cache_folder, extension='converted.xlsx', timeout=120, startup_timeout=120) -> None:
+        '''Initialize the xlsConverter class. The subprocess is started with the first conversion.
+
+        Attributes:
+        cache_folder -> str
+            Folder of the converted files (<SHA-256 of the .xls file>_<extension>).
+        extension -> str
+            Extension of the converted files.
+        timeout -> float
+            Maximum time in seconds per file of a batch. If a batch is not answered in time, the subprocess is
+            terminated and the files not converted are reported as errors. None: no timeout.
+        startup_timeout -> float
+            Additional time in seconds per batch for the start of the JVM.'''
+        self.cache_folder = cache_folder
+        self.extension = extension
+        self.timeout = timeout
+        self.startup_timeout = startup_timeout
+        self.process = None
+        self.connection = None
+
+    def __getstate__(self):
+        # the subprocess belongs to the process which started it (e.g. not to the workers of xlsxParser.read_files)
+        return {"cache_folder": self.cache_folder, "extension": self.extension, "timeout": self.timeout,
+                "startup_timeout": self.startup_timeout, "process": None, "connection": None}
+
+    @staticmethod
+    def serve(connection):
+        '''Loop of the conversion subprocess: start the JVM once and convert the batches of (xls path, xlsx path) until
+        None is received. Answers with an error message (None if converted) per file.
+
+        Attributes:
+        connection -> multiprocessing.connection.Connection
+            Pipe to the xlsConverter object.'''
+        try:
+            jpype.startJVM()
+            from asposecells.api import Workbook
+            startup_error = None
+        except Exception as error:
+            startup_error = f'{type(error).__name__}: {error}'
+        while True:
+            try:
+                batch = connection.recv()
+            except EOFError:
+                break
+            if batch is None:
+                break
+            errors = []
+            for xls_path, xlsx_path in batch:
+                if startup_error is not None:
+                    errors.append(startup_error)
+                    continue
+                try:
+                    temp_path = os.path.splitext(xlsx_path)[0] + '.tmp.xlsx'
+                    Workbook(xls_path).save(temp_path)
+                    os.replace(temp_path, xlsx_path)
+                    errors.append(None)
+                except Exception as error:
+                    errors.append(f'{type(error).__name__}: {error}')
+            connection.send(errors)
+        if startup_error is None:
+            jpype.shutdownJVM()
+
+    def start(self):
+        '''Start the conversion subprocess if it is not running.'''
+        if self.process is not None and self.process.is_alive():
+            return
+        self.connection, child_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=xlsConverter.serve, args=(child_connection,), daemon=True)
+        self.process.start()
+        child_connection.close()
+
+    def close(self):
+        '''Stop the conversion subprocess (shuts down the JVM).'''
+        if self.process is not None:
+            try:
+                self.connection.send(None)
+            except OSError:
+                pass
+            self.process.join()
+            self.connection.close()
+        self.process, self.connection = None, None
+
+    def terminate(self):
+        '''Kill the conversion subprocess (e.g. a hanging conversion in the JVM).'''
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join()
+            self.connection.close()
+        self.process, self.connection = None, None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def get_cache_path(self, xls_file_path) -> str:
+        '''Return the path of the converted file in the cache.
+
+        Attributes:
+        xls_file_path -> str
+            Path to the .xls file.'''
+        file_hash = hashlib.sha256()
+        with open(xls_file_path, 'rb') as f:
+            for block in iter(lambda: f.read(2**20), b''):
+                file_hash.update(block)
+        return os.path.join(self.cache_folder, file_hash.hexdigest() + '_' + self.extension)
+
+    def convert(self, xls_file_paths, timeout=None) -> dict:
+        '''Convert a batch of .xls files. Returns the path of the .xlsx file for each .xls file, or the exception of the
+        file if it could not be converted. Cached files are not sent to the subprocess.
+
+        Attributes:
+        xls_file_paths -> list
+            Paths to the .xls files.
+        timeout -> float
+            Maximum time in seconds per file (None: timeout of the converter).'''
+        timeout = self.timeout if timeout is None else timeout
+        if not os.path.exists(self.cache_folder):
+            os.makedirs(self.cache_folder, exist_ok=True)
+        results, batch = {}, []
+        for xls_file_path in xls_file_paths:
+            try:
+                xlsx_file_path = self.get_cache_path(xls_file_path)
+            except OSError as error:
+                results[xls_file_path] = error
+                continue
+            results[xls_file_path] = xlsx_file_path
+            if not os.path.exists(xlsx_file_path) and (xls_file_path, xlsx_file_path) not in batch:
+                batch.append((xls_file_path, xlsx_file_path))
+
+        if batch:
+            self.start()
+            try:
+                self.connection.send(batch)
+                if timeout is None or self.connection.poll(self.startup_timeout + timeout * len(batch)):
+                    errors = self.connection.recv()
+                else:       # conversion hangs: the files converted so far are kept
+                    self.terminate()
+                    errors = [None if os.path.exists(xlsx_file_path) else f'not converted within {timeout} s per file'
+                              for _, xlsx_file_path in batch]
+            except (EOFError, OSError):     # subprocess died (e.g. crash of the JVM): restarted with the next batch
+                self.close()
+                errors = [None if os.path.exists(xlsx_file_path) else 'conversion process terminated' for _, xlsx_file_path in batch]
+            for (xls_file_path, xlsx_file_path), error in zip(batch, errors):
+                if error is not None:
+                    results[xls_file_path] = RuntimeError(f'{xls_file_path} not converted: {error}')
+        return results
+
 class xlsxParser():
     '''Class to parse the contents of each cell of a excel file.'''
 
     # def __init__(self, path: str) -> None:
     #     return self.get_path_info(path)
     def __init__(self, color_valid = [], metadata_vertical = True, trigger_metadata = '', double_metadata = False, 
-    trigger_double_metadata = '', main_category = True, main_category_pos = -1, sub_category= True, exclude_in_subcategory = [], recog_format=True) -> None:
+    trigger_double_metadata = '', main_category = True, main_category_pos = -1, sub_category= True, exclude_in_subcategory = [], recog_format=True, trace=True, audit=False, audit_folder=None,
+    cache_folder=None, cache_size=2**30, native_xls=False, style_cache_folder=None, layout_cache=False, cell_range=None, metadata_names=None,
+    decode_workers=None, xml_engine='etree', info_patterns=None) -> None:
         '''Initialize the xlsxParser class.
         
         Attributes:
@@ -557,7 +2120,53 @@ class xlsxParser():
         exclude_in_subcategory -> list
             List of excluded subcategories.
         recog_format -> bool
-            True if format is recognized.'''
+            True if format is recognized.
+        trace -> bool
+            True (default, as before the switch) to write a debug log of the format recognition per sheet. The records
+            are written by a background thread. If False no log file is created and the decoding does no logging work
+            per cell.
+        audit -> bool
+            True to build an audit table of the keep/drop decision of every cell (see get_audit_table). The table of
+            the last read workbook is held in audit_table.
+        audit_folder -> str
+            Folder to write the audit table of each workbook as Parquet file (requires pyarrow or fastparquet, checked
+            here). None: not written.
+        cache_folder -> str
+            Folder of the persistent cache of the results of process_file, keyed by file content and parser
+            configuration. None: no cache.
+        cache_size -> int
+            Maximum size of the cache in bytes. The least recently used entries are removed if exceeded.
+        native_xls -> bool
+            True to decode .xls files directly with xlrd (see xlsDecoder). False to convert them to .xlsx first (JVM,
+            see convert_xls2xlsx). Opt-in until the native result has been checked against the conversion on a
+            machine with a JVM (tests/test_xlsxDataParser.py).
+        style_cache_folder -> str
+            Folder of the style parts of known templates (see xlsxDecoder.load_style_parts). None: only in memory.
+        layout_cache -> bool
+            True to learn the layout of each template (trigger of metadata, metadata names, categories) and reuse it
+            for sheets of the same layout instead of searching the trigger and renaming the columns again (see
+            match_layout). Opt-in: a sheet with the same metadata names and categories at the learned trigger is
+            assumed to have no other trigger of metadata before it. Required by cell_range 'trigger' and the row
+            projection of metadata_names.
+        cell_range -> str or tuple
+            Cell range decoded per sheet: explicit range (e.g. "A1:V402"), 'dimension' (range of <dimension>),
+            'trigger' (block of the learned layout, see get_sheet_range) or None for all cells. Cells outside are not
+            read, as if the sheet had no cells there.
+        metadata_names -> list
+            Names of the metadata to be read: metadata name or joined with its categories ("category$name"). Only these
+            columns are returned; for sheets of a known layout only their rows are decoded and combined (see
+            get_projected_columns). None: all metadata.
+        decode_workers -> int
+            Number of worker processes decoding a large worksheet in row partitions (see
+            xlsxDecoder.decode_partitioned). The result is the same as decoded in one pass. None: one pass. In the
+            workers of read_files it is capped to their share of the CPUs (see get_decode_workers).
+        xml_engine -> str
+            Parser of the worksheets and shared strings of xlsx files: 'etree' (ElementTree, reference) or 'expat' (see
+            xlsxDecoder.parse_cells_expat). Both give the same cells.
+        info_patterns -> list
+            Additional patterns with named groups (e.g. r'(?P<vds_number>VDS\\d+)') extracted from the values together
+            with the endurance number (see get_dataframe_info). A group found by several patterns is taken from the
+            first one.'''
         self.vehicle_number = []
         self.vehicle_series = []
         self.vehicle_plattform = []
@@ -582,36 +2191,97 @@ class xlsxParser():
         self.metadata_vertical = metadata_vertical
         self.trigger_metadata = trigger_metadata
         self.double_metadata = double_metadata
+        self.double_metadata_config = double_metadata     # argument of the configuration (double_metadata is set while reading, see get_cache_key)
         self.trigger_double_metadata = trigger_double_metadata
         self.sub_category = sub_category      # BE CAREFUL: if metadata of subcategories are of equal named, CONCAT/INGEST TO SQL will not work
         self.exclude_in_subcategory = exclude_in_subcategory    # metadata included by self.trigger_double_metadata but should not have a subcategory
         self.main_category = main_category      # BE CAREFUL: if metadata of non-subcategories are of equal named, CONCAT/INGEST TO SQL will not work
         self.main_category_pos = main_category_pos     # location relative to metadata
         self.recog_format = recog_format    # if TRUE: metadata will be removed not fulfilling certain condittions
-        
-    def setup_logger(self, log_file):
-        '''Set up the logger.
+        self.color_valid_cache = {}     # color -> result of compare_font_color
+        self.trace = trace
+        self.log_listener = None        # background writer of the debug log (see setup_logger)
+        self.audit = audit or audit_folder is not None
+        self.audit_folder = audit_folder
+        if audit_folder is not None and not any(importlib.util.find_spec(engine) for engine in ('pyarrow', 'fastparquet')):
+            raise ImportError('audit_folder requires a Parquet engine: install pyarrow or fastparquet (or use audit=True without audit_folder)')
+        self.audit_table = None         # audit table of the last read workbook (see get_audit_table)
+        self.projections = {}           # sheet -> projection of the last read workbook (only the wanted rows decoded, see data_cleaning)
+        self.cache_folder = cache_folder
+        self.cache_size = cache_size
+        self.converter = None           # conversion service of .xls files (see convert_xls2xlsx)
+        self.native_xls = native_xls
+        self.style_cache_folder = style_cache_folder
+        self.layout_cache = layout_cache
+        self.layouts = []               # learned layouts of known templates, last used first (see match_layout)
+        self.layouts_size = 16          # maximum number of layouts
+        self.cell_range = cell_range
+        self.metadata_names = metadata_names
+        self.decode_workers = decode_workers
+        self.xml_engine = xml_engine
+        self.info_patterns = info_patterns if info_patterns is not None else []
+
+    def setup_logger(self, log_file=None):
+        '''Set up the logger. If tracing is on, the records are put in a queue and written to the log file by a
+        background thread; otherwise debug records are not created at all.
         
         Attributes:
         log_file -> str
-            Path to the log file.'''
+            Path to the log file (only used if tracing is on).'''
         # Logger konfigurieren
         logger = logging.getLogger('FORMAT-LOG')
+        self.close_logger(logger)
+        if not self.trace:
+            logger.setLevel(logging.WARNING)
+            return logger
         logger.setLevel(logging.DEBUG)
         
-        # Datei-Handler hinzufügen
+        # Datei-Handler hinzufügen (schreibt im Hintergrund-Thread)
         file_handler = logging.FileHandler(log_file)
         file_handler.setLevel(logging.DEBUG)
         
         # Format für Logs festlegen
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        formatter = TraceFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
         file_handler.setFormatter(formatter)
         
-        # Handler zum Logger hinzufügen
-        logger.addHandler(file_handler)
+        # Queue-Handler zum Logger hinzufügen
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(TraceQueueHandler(log_queue))
+        # the writer collects the records and writes them in blocks
+        buffer_handler = logging.handlers.MemoryHandler(capacity=4096, flushLevel=logging.ERROR, target=file_handler)
+        self.log_listener = logging.handlers.QueueListener(log_queue, buffer_handler, respect_handler_level=True)
+        self.log_listener.start()
         
         return logger    
 
+    def close_logger(self, logger):
+        '''Write the pending records of the log file and remove the handlers of the logger.
+
+        Attributes:
+        logger -> logging.Logger
+            Logger object (see setup_logger).'''
+        if self.log_listener is not None:
+            self.log_listener.stop()    # flushes the queue
+            for handler in self.log_listener.handlers:
+                file_handler = handler.target
+                handler.close()     # writes the remaining records to the file handler
+                file_handler.close()
+            self.log_listener = None
+        for handler in logger.handlers[:]:
+            handler.close()
+            logger.removeHandler(handler)
+
+    def get_log_folder(self):
+        '''Return the folder of the log files and temporary files (created if it does not exist).'''
+        user = os.environ['USERPROFILE']
+        if not os.path.exists(user+r'\.bigbrems'):
+            os.makedirs(user+r'\.bigbrems')
+        if not os.path.exists(user+r'\.bigbrems\logs'):
+            os.makedirs(user+r'\.bigbrems\logs')
+        if not os.path.exists(user+r'\.bigbrems\logs\endu_nvh'):
+            os.makedirs(user+r'\.bigbrems\logs\endu_nvh')
+        return user+r'\.bigbrems\logs\endu_nvh'
+
 
     def get_pattern(self) -> str:
         '''Get the pattern for the endurance number.'''
@@ -620,6 +2290,11 @@ class xlsxParser():
 
         return pattern
 
+    def get_patterns(self) -> list:
+        '''Get the patterns whose named groups are extracted from the values (see get_dataframe_info): pattern for the
+        endurance number and the additional patterns (info_patterns).'''
+        return [self.get_pattern()] + list(self.info_patterns)
+
     def get_trigger_metadata(self, df, matches):
         '''Get row and colum of metadata trigger of metadata identifying the header of the data.
         
@@ -697,8 +2372,15 @@ class xlsxParser():
         Attributes:
         df -> pd.DataFrame
             Dataframe of the xlsx file.'''
-        duplicates = df.columns[df.columns.duplicated()].unique()
-        duplicates_positions = {col: [i for i, x in enumerate(df.columns) if x == col] for col in duplicates}
+        columns = df.columns
+        codes, uniques = pd.factorize(columns)
+        # Positionen aller Spalten je Name in einem Durchlauf (NaN-Namen sind keinem Namen gleich)
+        named = np.flatnonzero(codes >= 0)
+        order = named[np.argsort(codes[named], kind='stable')]
+        positions = np.split(order, np.cumsum(np.bincount(codes[named], minlength=len(uniques)))[:-1])
+        duplicated = columns.duplicated()
+        duplicates_positions = {col: positions[code].tolist() if code >= 0 else []
+                                for col, code in zip(columns[duplicated].unique(), pd.unique(codes[duplicated]))}
         return duplicates_positions
 
     def reset_duplicate_columns(self, df, category_names):
@@ -716,12 +2398,11 @@ class xlsxParser():
         # get all ducplicate columns
         duplicates_positions = self.get_duplicate_columns(df)
         # print(f"Doppelte Spaltennamen und deren Positionen: {duplicates_positions}")
-        not_notice = []
+        not_notice = set()
         for col, positions in duplicates_positions.items():
             for excluded_metadata_in_subcategory in self.exclude_in_subcategory:
                 if str(excluded_metadata_in_subcategory).lower() in str(col).lower():
-                    for pos in positions:
-                        not_notice.append(pos)
+                    not_notice.update(positions)
         # print(f'not_notice: {not_notice}')
 
         # find the names of the subcategories being the next fields after the "note" field and rename
@@ -732,6 +2413,8 @@ class xlsxParser():
                 duplicates_positions[key] = np.flip(values)
                 # print('Flipped Indizes für {1} der Duplikate: {0}'.format(duplicates_positions[key],key))
 
+            # first position of the main category of each position
+            category_start = {idx: idx_cat[0] for idx_cat in category_names.values() for idx in idx_cat}
             last_note_excluded = False      # False: Exclude last trigger since there is no subcategory after this last trigger
             last_note_position = 0
             for duplicates_value, duplicates_position in duplicates_positions.items():  # if mulitple note fields exist
@@ -745,35 +2428,19 @@ class xlsxParser():
                         if row_to_read in not_notice:       # add +1 since a metadatum is after the trigger which is not a subcategory nor a specific metadatum must be added to a subcategory
                             df.columns.values[row_to_read] = df.columns[row_to_read]
                             row_to_read += 1
-                        for _, idx_cat in category_names.items():     # main categories
-                            if row_to_read in idx_cat:      # save first occurence of the main category for the current subcategory
-                                last_cat_idx = idx_cat[0]
-                                continue
+                        if row_to_read in category_start:       # save first occurence of the main category for the current subcategory
+                            last_cat_idx = category_start[row_to_read]
                         if last_note_excluded:
                             subcategory = df.columns[row_to_read]       # read subcategory name after trigger
                             # print('Subkategorie: {0}'.format(subcategory))
-                            for idx, subcategory_col in enumerate(df.columns[row_to_read:last_note_position+1]):      # last_note_position = pos of the last iteration; +2 to include the trigger in the given subcategory
-                                if idx > 0:      
-                                    add_subcategory = row_to_read + idx
-                                    if pd.isna(subcategory_col):
-                                        subcategory_col = self.get_nan_columns(iter_unnamed)
-                                        iter_unnamed += 1
-                                    # print('In Zeile {0} füge Metadatum {1}${2} hinzu'.format(add_subcategory,subcategory,subcategory_col), flush=True)
-                                    df.columns.values[add_subcategory] = subcategory + '$' + subcategory_col
+                            # last_note_position = pos of the last iteration
+                            iter_unnamed = self.set_subcategory(df.columns, row_to_read, last_note_position, subcategory, iter_unnamed)
                         last_note_excluded = True
                         last_note_position = pos
                     if duplicates_position[-1] > last_cat_idx:          # if the first subcategory is not after the given trigger
                         subcategory = df.columns[last_cat_idx]
                         # print('Subkategorie: {0}'.format(subcategory))
-                        for idx, subcategory_col in enumerate(df.columns[last_cat_idx:last_note_position+1]):       # +2 to include the trigger in the given subcategory
-                            if idx > 0:
-                                add_subcategory = last_cat_idx + idx
-                                # print('In Zeile {0} füge Metadatum {1} hinzu'.format(add_subcategory,subcategory_col))
-                                if pd.isna(subcategory_col):
-                                        subcategory_col = self.get_nan_columns(iter_unnamed)
-                                        iter_unnamed += 1
-                                df.columns.values[add_subcategory] = subcategory + '$' + subcategory_col
-                                # print('In Zeile {0} füge Metadatum {1}${2} hinzu'.format(add_subcategory,subcategory,subcategory_col), flush=True)
+                        iter_unnamed = self.set_subcategory(df.columns, last_cat_idx, last_note_position, subcategory, iter_unnamed)
         else:
             print('Keine Bemerkungsfelder im Template.')
 
@@ -791,20 +2458,93 @@ class xlsxParser():
             Row number.'''
         cat_names = {}
         if index_spalte > 0:
-            cat_name = ''
-            for idx, cat in enumerate(df[df.columns[index_spalte - 1]]):
-                if pd.notna(cat):
-                    cat_name = cat
-                if cat_name:
-                    if cat_name not in cat_names.keys():
-                        cat_names[cat_name] = []
-                    cat_names[cat_name].append(idx-row_lfd_nr)
-                    if len(cat_names[cat_name]) > 1:
-                        self.double_metadata = True
+            categories, named = self.get_category_rows(df, index_spalte - 1)
+            rows = np.flatnonzero(named)
+            codes, uniques = pd.factorize(categories[rows])
+            order = rows[np.argsort(codes, kind='stable')] - row_lfd_nr
+            for cat_name, idx_cat in zip(uniques, np.split(order, np.cumsum(np.bincount(codes))[:-1])):
+                cat_names[cat_name] = idx_cat.tolist()
+                if len(idx_cat) > 1:
+                    self.double_metadata = True
         # print(f'Main category names: {cat_names}')
 
         return cat_names
 
+    def set_main_categories(self, df, df_vehicle, column, row_trigger_metadata, iter_unnamed):
+        '''Add the main category of each metadata row to the column names of the vehicle frame (category$name). The first
+        row names the index. Columns without a name are numbered as unnamed columns.
+        
+        Attributes:
+        df -> pd.DataFrame
+            Dataframe of the xlsx file.
+        df_vehicle -> pd.DataFrame
+            Vehicles x metadata, columns renamed in place.
+        column -> int
+            Column index of the main categories.
+        row_trigger_metadata -> int
+            Row of the trigger of metadata.
+        iter_unnamed -> int
+            Number of the next unnamed column.'''
+        categories, named = self.get_category_rows(df, column)
+        if named[0]:
+            df_vehicle.index.name = categories[0] + '$' + str(df_vehicle.index.name)
+        rows = np.flatnonzero(named[1:]) + 1
+        # Zeilen über dem Trigger treffen die Spalten vom Ende her (negative Position), daher einzeln und zuerst
+        for idx in rows[rows < row_trigger_metadata]:
+            colname = df_vehicle.columns.values[idx-row_trigger_metadata]
+            if pd.isna(colname):
+                colname = self.set_nan_columns(iter_unnamed)
+                iter_unnamed += 1
+            df_vehicle.columns.values[idx-row_trigger_metadata] = categories[idx] + '$' + str(colname)
+        rows = rows[rows >= row_trigger_metadata]
+        if len(rows):
+            # df hat mehr Zeilen an Metadaten als df_vehicle, da df_vehicle die Spalten nicht bis zum Ende besetzt
+            positions = rows - row_trigger_metadata
+            colnames = np.asarray(df_vehicle.columns.values[positions], dtype=object)
+            unnamed = pd.isna(colnames)
+            if unnamed.any():
+                colnames[unnamed] = [self.set_nan_columns(iter) for iter in range(iter_unnamed, iter_unnamed + int(unnamed.sum()))]
+                iter_unnamed += int(unnamed.sum())
+            df_vehicle.columns.values[positions] = categories[rows] + '$' + np.frompyfunc(str, 1, 1)(colnames)
+
+    def get_category_rows(self, df, column):
+        '''Get the category of each row: the last category given in or above the row (forward fill of the category column).
+        Returns the categories and the mask of the rows with a category; rows above the first category get ''.
+        
+        Attributes:
+        df -> pd.DataFrame
+            Dataframe of the xlsx file.
+        column -> int
+            Column index of the categories.'''
+        values = df[df.columns[column]].to_numpy(dtype=object)
+        last = np.maximum.accumulate(np.where(pd.notna(values), np.arange(len(values)), -1))     # Position der letzten Kategorie
+        categories = np.where(last >= 0, values[last], '')
+        return categories, np.frompyfunc(bool, 1, 1)(categories).astype(bool)
+
+    def set_subcategory(self, columns, start, stop, subcategory, iter_unnamed):
+        '''Add the subcategory to the names of the columns after start up to stop (subcategory$name). Columns without a name
+        are numbered as unnamed columns. Returns the next number of the unnamed columns.
+        
+        Attributes:
+        columns -> pd.Index
+            Columns of the dataframe, renamed in place.
+        start -> int
+            Position of the subcategory.
+        stop -> int
+            Last position of the subcategory.
+        subcategory -> str
+            Name of the subcategory.
+        iter_unnamed -> int
+            Number of the next unnamed column.'''
+        names = columns[start + 1:stop + 1].to_numpy(dtype=object)
+        if len(names) == 0:
+            return iter_unnamed
+        unnamed = pd.isna(names)
+        n_unnamed = int(unnamed.sum())
+        names[unnamed] = [self.set_nan_columns(iter) for iter in range(iter_unnamed, iter_unnamed + n_unnamed)]
+        columns.values[start + 1:stop + 1] = subcategory + '$' + names
+        return iter_unnamed + n_unnamed
+
     def set_nan_columns(self, iter):
         '''Set NaN columns.
         
@@ -828,8 +2568,279 @@ class xlsxParser():
                 result.append((idx, col))
         return result
 
+    def get_cell_text(self, value):
+        '''Return the text of a cell as compared in the layout fingerprints (None if the cell is empty). Rich text runs
+        are joined as in filter_cell_value, so decoded cells and cells of the dataframe give the same text.
+
+        Attributes:
+        value -> object
+            Value of the dataframe or value list of a decoded cell.'''
+        if isinstance(value, list):
+            if len(value) > 1:
+                text = ' '.join(' '.join(str(sub_value) for sub_value in value).split())
+                return text.replace('\n','').replace('\r', '')
+            value = value[0] if value else None
+        if value is None or (not isinstance(value, str) and pd.isna(value)):
+            return None
+        return str(value)
+
+    def get_store_text(self, cell_store, row, col):
+        '''Return the text of a decoded cell (see get_cell_text).
+
+        Attributes:
+        cell_store -> xlsxCellStore
+            Decoded cells of a worksheet.
+        row -> int
+            Row index of the cell (0-based).
+        col -> int
+            Column index of the cell (0-based).'''
+        pos = cell_store.find_cell(row, col)
+        return self.get_cell_text(cell_store.get_value(pos)) if pos >= 0 else None
+
+    def get_frame_text(self, df, row, col):
+        '''Return the text of a cell of the dataframe by position (see get_cell_text).
+
+        Attributes:
+        df -> pd.DataFrame
+            Dataframe of the xlsx file.
+        row -> int
+            Row position of the cell.
+        col -> int
+            Column position of the cell.'''
+        if row >= df.shape[0] or col >= df.shape[1]:
+            return None
+        return self.get_cell_text(df.iat[row, col])
+
+    def get_layout_samples(self, df, row, col):
+        '''Return the cells checked to recognise a layout: first, middle and last filled cell below the trigger of
+        metadata in the column of the metadata names and in the column left of it (categories) as (row, column, text).
+
+        Attributes:
+        df -> pd.DataFrame
+            Dataframe of the xlsx file.
+        row -> int
+            Row position of the trigger of metadata.
+        col -> int
+            Column position of the trigger of metadata.'''
+        samples = []
+        for sample_col in (col, col - 1):
+            if sample_col < 0:
+                continue
+            filled = np.flatnonzero(df.iloc[row + 1:, sample_col].notna().to_numpy()) + row + 1
+            if filled.size:
+                for sample_row in dict.fromkeys(filled[[0, filled.size // 2, -1]].tolist()):
+                    samples.append((sample_row, sample_col, self.get_frame_text(df, sample_row, sample_col)))
+        return samples
+
+    def match_layout(self, get_text, has_naming=None):
+        '''Return the first learned layout of which the trigger of metadata and the sample cells are found in a sheet
+        (None if no layout matches). Only a few cells are read instead of searching the trigger in the whole sheet; the
+        whole naming of a matching sheet is validated before the layout is used (see has_layout_naming).
+
+        Attributes:
+        get_text -> callable
+            Function (row, column) -> text of the cell of the sheet (see get_store_text, get_frame_text).
+        has_naming -> callable
+            Function layout -> True if the sheet has the whole naming of the layout (see has_layout_naming). Layouts of
+            the same samples but another naming (e.g. the title of the sheet) are skipped. None: samples only.'''
+        for id, layout in enumerate(self.layouts):
+            if get_text(layout['row'], layout['column']) == self.trigger_metadata and \
+                    all(get_text(row, col) == text for row, col, text in layout['samples']) and \
+                    (has_naming is None or has_naming(layout)):
+                self.layouts.insert(0, self.layouts.pop(id))
+                return layout
+        return None
+
+    def match_store_layout(self, cell_store, logger):
+        '''Return the learned layout of a decoded sheet (see match_layout) with the filtered cells and the dataframe of its
+        trigger of metadata, which validated the naming. (None, None, None) if no layout matches.
+
+        Attributes:
+        cell_store -> xlsxCellStore
+            Decoded cells of the sheet (see xlsxDecoder.decode_columnar).
+        logger -> logging.Logger
+            Logger object.'''
+        frames = {}     # (row, column) of the trigger of metadata -> (filtered_cells, df)
+
+        def has_naming(layout):
+            position = (layout['row'], layout['column'])
+            if position not in frames:
+                filtered_cells = [(cell_store,) + self.filter_cells(cell_store, layout['row'], layout['column'], logger)]
+                frames[position] = filtered_cells, self.get_filtered_frame(filtered_cells)
+            return self.has_layout_naming(frames[position][1], layout)
+
+        layout = self.match_layout(lambda row, col: self.get_store_text(cell_store, row, col), has_naming)
+        if layout is None:
+            return None, None, None
+        return (layout,) + frames[(layout['row'], layout['column'])]
+
+    def has_layout_naming(self, df, layout) -> bool:
+        '''Return True if the metadata names and categories at the trigger of metadata of a learned layout are the same
+        as in the sheet (naming key, see get_naming_key). The sample cells of match_layout only preselect the layout;
+        a sheet of the same naming is assumed to have no other trigger of metadata before the learned one.
+
+        Attributes:
+        df -> pd.DataFrame
+            Dataframe of the xlsx file.
+        layout -> dict
+            Learned layout (see store_layout).'''
+        if self.metadata_vertical:
+            return self.get_frame_naming_key(df, layout['row'], layout['column']) == layout['key']
+        return self.get_frame_naming_key(df.T, layout['column'], layout['row']) == layout['key']
+
+    def get_naming_key(self, df, index_spalte, index_name):
+        '''Return everything the column names of get_single_columns depend on: the metadata names and the columns of
+        the main and sub categories (None for empty cells).
+
+        Attributes:
+        df -> pd.DataFrame
+            Dataframe of the xlsx file (transposed if the metadata is horizontal).
+        index_spalte -> int
+            Column position of the metadata names.
+        index_name -> pd.Series
+            Metadata names.'''
+        columns = [index_name]
+        if index_spalte > 0:
+            if self.sub_category:
+                columns.append(df[df.columns[index_spalte - 1]])
+            if self.main_category:
+                columns.append(df[df.columns[index_spalte + self.main_category_pos]])
+        return tuple(tuple(None if pd.isna(value) else value for value in column) for column in columns)
+
+    def store_layout(self, layout):
+        '''Store a learned layout in front of the known layouts and remove the least recently used ones.
+
+        Attributes:
+        layout -> dict
+            Trigger of metadata ("row", "column"), sample cells ("samples"), naming key ("key") and the resulting column
+            names ("columns", "index_name", "double_metadata", "sets_double").'''
+        self.layouts.insert(0, layout)
+        del self.layouts[self.layouts_size:]
+
+    def get_projection(self, columns) -> list:
+        '''Return the positions of the columns of the wanted metadata (see metadata_names). A column is wanted if its
+        name or the name without leading categories ("category$sub category$name" -> "sub category$name", "name") is
+        one of the metadata names. Position 0 (vehicles) is not included.
+
+        Attributes:
+        columns -> pd.Index
+            Column names of get_single_columns.'''
+        wanted = set(self.metadata_names)
+        positions = []
+        for pos, name in enumerate(columns[1:], 1):
+            parts = str(name).split('$')
+            if any('$'.join(parts[id:]) in wanted for id in range(len(parts))):
+                positions.append(pos)
+        return positions
+
+    def get_naming_range(self, decoder, sheet_nr, sheet_range, layout) -> tuple:
+        '''Return the cell range of the metadata names and categories of a sheet of a known layout: the columns from the
+        category column to the metadata names (see get_sheet_range) in all rows of sheet_range.
+
+        Attributes:
+        decoder -> xlsxDecoder
+            Decoder of the workbook.
+        sheet_nr -> int
+            Number of the sheet to be read.
+        sheet_range -> str or tuple
+            Cell range decoded of the sheet (see get_sheet_range).
+        layout -> dict
+            Learned layout (see store_layout).'''
+        first_row, first_col, last_row, last_col = decoder.get_cell_range(sheet_nr, sheet_range) or (1, 1, decoder.max_rows, decoder.max_columns)
+        return (first_row, max(first_col, max(layout['column'] + min(-1, self.main_category_pos), 0) + 1), last_row, min(last_col, layout['column'] + 1))
+
+    def get_projection_rows(self, layout) -> set:
+        '''Return the rows (1-based) of the trigger of metadata and of the wanted metadata of a known layout.
+
+        Attributes:
+        layout -> dict
+            Learned layout (see store_layout).'''
+        return {layout['row'] + 1} | {layout['row'] + pos + 1 for pos in self.get_projection(layout['columns'])}
+
+    def get_frame_naming_key(self, df, row, col):
+        '''Return the naming key of a sheet (see get_naming_key) with the trigger of metadata at a given position.
+
+        Attributes:
+        df -> pd.DataFrame
+            Dataframe of the xlsx file.
+        row -> int
+            Row position of the trigger of metadata.
+        col -> int
+            Column position of the trigger of metadata.'''
+        return self.get_naming_key(df, col, pd.Series(df.iloc[row + 1:, col].to_numpy()))
+
+    def get_known_layout(self, row, col, naming_key):
+        '''Return the first learned layout with the trigger of metadata at the same position and the same naming key, so
+        its column names can be reused (None if unknown).
+
+        Attributes:
+        row -> int
+            Row position of the trigger of metadata.
+        col -> int
+            Column position of the trigger of metadata.
+        naming_key -> tuple
+            Metadata names and categories of the sheet (see get_naming_key).'''
+        for layout in self.layouts:
+            if (layout['row'], layout['column'], layout['key']) == (row, col, naming_key) and \
+                    layout['double_metadata'] == (self.double_metadata or layout['sets_double']):
+                return layout
+        return None
+
+    def get_projected_layout(self, layout) -> dict:
+        '''Return the part of a learned layout needed to build the columns of the wanted metadata: their positions
+        ("positions", see get_projection), column names ("columns", with the vehicles), "index_name" and
+        "double_metadata".
+
+        Attributes:
+        layout -> dict
+            Learned layout (see store_layout).'''
+        positions = self.get_projection(layout['columns'])
+        return {"positions": positions, "columns": layout['columns'][[0] + positions], "index_name": layout['index_name'],
+                "double_metadata": layout['double_metadata']}
+
+    def get_projected_columns(self, df, row_trigger_metadata, col_trigger_metadata, trigger_metadata_dict, projection):
+        '''Build the columns of the wanted metadata of a sheet of a known layout (see get_single_columns). Only the rows
+        of the wanted metadata are combined, the column names are taken from the layout. The pattern (see
+        get_dataframe_info) is searched in these rows only.
+
+        Attributes:
+        df -> pd.DataFrame
+            Dataframe of the xlsx file.
+        row_trigger_metadata -> int
+            Row of the trigger of metadata.
+        col_trigger_metadata -> int
+            Column of the trigger of metadata.
+        trigger_metadata_dict -> dict
+            Vehicles and their columns (see get_trigger_metadata).
+        projection -> dict
+            Wanted metadata of the layout (see get_projected_layout).'''
+        positions = projection['positions']
+        df = df.reindex([row_trigger_metadata] + [row_trigger_metadata + pos for pos in positions])
+
+        # combine columns of same lfd. Nr.: col = metadata, index = vehicles
+        metadata_index = pd.Index(df[col_trigger_metadata].iloc[1:].to_numpy(), name=self.trigger_metadata)
+        df_vehicle, df_rows = self.get_vehicle_frame(df, trigger_metadata_dict, metadata_index)
+        df_pattern = self.get_dataframe_info(df_rows)
+
+        self.double_metadata = self.double_metadata or projection['double_metadata']
+        df_vehicle.columns = projection['columns'].copy()
+        df_vehicle.index.name = projection['index_name']
+        df_vehicle = self.drop_empty_rows(df_vehicle)    # drop all rows showing only NaN values
+        return df_vehicle, df_pattern
+
+    def project_columns(self, df_vehicle, df_rows):
+        '''Keep only the columns of the wanted metadata (see metadata_names) and search the pattern (see
+        get_dataframe_info) in their rows.
 
-    def data_cleaning(self, df, pat):
+        Attributes:
+        df_vehicle -> pd.DataFrame
+            Vehicles with all metadata columns (see get_single_columns).
+        df_rows -> pd.DataFrame
+            Metadata rows of the vehicles before transposing.'''
+        positions = self.get_projection(df_vehicle.columns)
+        return df_vehicle.iloc[:, [0] + positions], self.get_dataframe_info(df_rows.iloc[[pos - 1 for pos in positions]])
+
+    def data_cleaning(self, df, pat, sheet_name=None):
         '''Clean the data. Use this function to start the excel cleaning after reading it with function read_data. After applying this function
         only excel cell entries with valid format will stay in the pandas dataframe.
         
@@ -837,9 +2848,17 @@ class xlsxParser():
         df -> pd.DataFrame
             Dataframe of the xlsx file.
         pat -> str
-            Path of the xlsx file.'''
-        matches = self.find_string_in_dataframe(df)
-        df_vehicle, df_pattern = self.get_single_columns(df, matches)
+            Path of the xlsx file.
+        sheet_name -> str
+            Name of the sheet in the dict of read_data. Required for sheets of which only the wanted metadata were read
+            (metadata_names, see projections).'''
+        layout = self.match_layout(lambda row, col: self.get_frame_text(df, row, col),
+                                   lambda layout: self.has_layout_naming(df, layout)) if self.layout_cache else None
+        if layout is not None:
+            matches = [(df.index[layout['row']], df.columns[layout['column']])]
+        else:
+            matches = self.find_string_in_dataframe(df)
+        df_vehicle, df_pattern = self.get_single_columns(df, matches, self.projections.get(sheet_name))
         df_vehicle['Pfad'] = pat
 
         return df_vehicle, df_pattern
@@ -856,51 +2875,126 @@ class xlsxParser():
                 result.append(str(val))
         return '|'.join(result)
 
-    def get_single_columns(self, df, matches):
+    def join_columns(self, df, trigger_metadata_dict):
+        '''Combine the columns of each trigger key (e.g. vehicle) as conditional_join does per row: the values which
+        are not null, as text, joined with |. Returns the joined values as array (rows x keys). The used columns are
+        taken once, converted in place and the further columns of a key are joined into its first column over all
+        rows.
+
+        Attributes:
+        df -> pd.DataFrame
+            Dataframe of the xlsx file.
+        trigger_metadata_dict -> dict
+            Positions of the columns of each trigger key (see get_trigger_metadata).'''
+        first = [values[0] for values in trigger_metadata_dict.values()]
+        further = [pos for values in trigger_metadata_dict.values() for pos in values[1:]]
+        block = np.empty((len(df), len(first) + len(further)), dtype=object)      # only copy of the values
+        for id, pos in enumerate(first + further):
+            block[:, id] = df.iloc[:, pos].to_numpy(dtype=object)
+        valid = pd.notna(block)
+        np.frompyfunc(str, 1, 1)(block, out=block, where=valid)
+        block[~valid] = ''
+
+        column = len(first)
+        for id, values in enumerate(trigger_metadata_dict.values()):
+            result, found = block[:, id], valid[:, id]
+            for _ in values[1:]:
+                separator = np.where(found & valid[:, column], '|', '').astype(object)
+                result[:] = result + separator + block[:, column]
+                found = found | valid[:, column]
+                column += 1
+        return block[:, :len(first)]
+
+    def get_vehicle_frame(self, df, trigger_metadata_dict, metadata_index):
+        '''Combine the columns of each trigger key (see join_columns) and lay out the sheet as vehicles x metadata in
+        one step: vehicle name (trigger row) in the first column, metadata in the next columns, empty values as NaN.
+        Returns the vehicle frame and the metadata rows of the vehicles (df_rows, view on the same values, see
+        project_columns).
+
+        Attributes:
+        df -> pd.DataFrame
+            Dataframe of the xlsx file from the trigger row on: trigger row first, then the metadata rows.
+        trigger_metadata_dict -> dict
+            Positions of the columns of each trigger key (see get_trigger_metadata).
+        metadata_index -> pd.Index
+            Metadata names of the rows (named as trigger_metadata).'''
+        values = self.join_columns(df, trigger_metadata_dict).T     # vehicles x (trigger row, metadata rows)
+        metadata = values[:, 1:]
+        metadata[(metadata == '') | (metadata == ' ')] = np.nan
+
+        vehicle_nr = pd.Index(values[:, 0], name=self.trigger_metadata)
+        df_rows = pd.DataFrame(metadata.T, index=metadata_index, columns=vehicle_nr, dtype=object, copy=False)
+        # dtype of the former reshaping (transpose, reset_index), which inferred the dtype of the joined strings: "str" with
+        # string inference (default from pandas 3), object before. Results and cached layouts must stay equal to it.
+        string_dtype = "str" if pd.get_option("future.infer_string") else object
+        df_vehicle = pd.DataFrame(values, columns=metadata_index.insert(0, vehicle_nr.name), dtype=string_dtype)     # "str": one copy per column
+        return df_vehicle, df_rows
+
+    def drop_empty_rows(self, df_vehicle):
+        '''Drop the rows (vehicles) showing only NaN values. A row with a vehicle name (first column) is not empty, so
+        the frame is only filtered if a vehicle name is missing.
+
+        Attributes:
+        df_vehicle -> pd.DataFrame
+            Vehicles and their metadata (see get_vehicle_frame).'''
+        if not df_vehicle.iloc[:, 0].isna().any():
+            return df_vehicle
+        return df_vehicle.dropna(how="all")
+
+    def get_single_columns(self, df, matches, projection=None):
         '''Get the single columns and put Excel data in dataframe with header row-wise sorted.
         
         Attributes:
         df -> pd.DataFrame
             Dataframe of the xlsx file.
         matches -> list
-            List of matches.'''
+            List of matches.
+        projection -> dict
+            Projection of a sheet of which only the rows of the wanted metadata were decoded (see
+            get_projected_layout). None: all rows decoded.'''
        # find IDs based on trigger_metadata variable
         row_trigger_metadata, col_trigger_metadata, trigger_metadata_dict = self.get_trigger_metadata(df, matches)
 
-        # combine columns of same lfd. Nr.
-        df_vehicle = pd.DataFrame()
+        row_layout, col_layout = df.index.get_loc(row_trigger_metadata), df.columns.get_loc(col_trigger_metadata)
+        df_sheet = df
         if not self.metadata_vertical:
             df = df.T
-        for keys, values in trigger_metadata_dict.items():
-            column_name_target = keys
-            column_name = df.columns[values]
-            df_vehicle[column_name_target] = df[column_name].apply(self.conditional_join, axis=1)
-        
-        vehicle_nr = df_vehicle.iloc[row_trigger_metadata]
-        df_vehicle = df_vehicle.replace(["", " ", None], np.nan)
-        df_vehicle.columns = vehicle_nr
-        df_vehicle = df_vehicle.iloc[row_trigger_metadata+1:].reset_index(drop=True)
 
         # get metadata naming
         index_name = self.get_metadata_naming(df, row_trigger_metadata, col_trigger_metadata)
         # print(f'index_name: {index_name}')
         index_name = pd.Series(index_name)
-        df_vehicle = df_vehicle.reindex(index_name.index, fill_value=nan)
-        df_vehicle[self.trigger_metadata] = index_name
-        df_vehicle.set_index(self.trigger_metadata, inplace=True)
 
-        # get pattern in dataframe
-        df_pattern = self.get_dataframe_info(df_vehicle)
-
-        # transpose dataframe: col = metadata, index = vehicles
-        col_names = df_vehicle.columns
-        df_vehicle = df_vehicle.transpose()
-        df_vehicle.index.name = self.trigger_metadata
-        df_vehicle.index = col_names
-        df_vehicle = df_vehicle.reset_index()
+        # known layout: same metadata names and categories give the same column names
+        index_spalte = df.columns.get_loc(col_trigger_metadata)
+        naming_key = self.get_naming_key(df, index_spalte, index_name) if self.layout_cache else None
+        known_layout = self.get_known_layout(row_layout, col_layout, naming_key) if self.layout_cache else None
+
+        # wanted metadata of a known layout: only their rows are combined
+        if projection is None and known_layout is not None and self.metadata_names is not None and self.metadata_vertical:
+            projection = self.get_projected_layout(known_layout)
+        if projection is not None:
+            return self.get_projected_columns(df, row_trigger_metadata, col_trigger_metadata, trigger_metadata_dict, projection)
+
+        # combine columns of same lfd. Nr.: col = metadata, index = vehicles
+        df_vehicle, df_rows = self.get_vehicle_frame(df.iloc[row_trigger_metadata:], trigger_metadata_dict, pd.Index(index_name, name=self.trigger_metadata))
+
+        # get pattern in dataframe (wanted metadata only, see project_columns)
+        df_pattern = self.get_dataframe_info(df_rows) if self.metadata_names is None else None
+
+        # known layout: reuse the column names
+        if known_layout is not None:
+            self.double_metadata = known_layout['double_metadata']
+            df_vehicle.columns = known_layout['columns'].copy()
+            df_vehicle.index.name = known_layout['index_name']
+            if self.metadata_names is not None:
+                df_vehicle, df_pattern = self.project_columns(df_vehicle, df_rows)
+            df_vehicle = self.drop_empty_rows(df_vehicle)    # drop all rows showing only NaN values
+            return df_vehicle, df_pattern
+        double_metadata = self.double_metadata
 
         # get and set duplicate columns
-        index_spalte = df.columns.get_loc(col_trigger_metadata)
+        iter_unnamed = 1    # Iterator for unnamend columns
         if self.sub_category:
             category_names = self.get_category_names(df, index_spalte, row_trigger_metadata)
             if self.double_metadata:
@@ -909,25 +3003,15 @@ class xlsxParser():
         # get categories of metadata naming
         if self.main_category:
             if index_spalte > 0:
-                cat_name = ''
-                for idx, cat in enumerate(df[df.columns[index_spalte + self.main_category_pos]]):
-                    if pd.notna(cat):
-                        cat_name = cat
-                    if cat_name:
-                        # print('Kategorie: {0}'.format(cat_name))
-                        if idx == 0:
-                            # print(cat_name + '$' + str(df_vehicle.index.name))
-                            df_vehicle.index.name = cat_name + '$' + str(df_vehicle.index.name)
-                        else:
-                            # print(cat_name + '$' + str(df_vehicle.columns.values[idx-row_trigger_metadata]))
-                            colname = df_vehicle.columns.values[idx-row_trigger_metadata]
-                            if pd.isna(df_vehicle.columns.values[idx-row_trigger_metadata]):
-                                    colname = self.set_nan_columns(iter_unnamed)
-                                    iter_unnamed += 1
-                            df_vehicle.columns.values[idx-row_trigger_metadata]  = cat_name + '$' + str(colname)
-                            # df hat mehr Zeilen an Metadaten als df_vehicle, da df_vehicle die Spalten nicht bis zum Ende besetzt 
-
-        df_vehicle = df_vehicle.dropna(how="all")    # drop all rows showing only NaN values
+                self.set_main_categories(df, df_vehicle, index_spalte + self.main_category_pos, row_trigger_metadata, iter_unnamed)
+
+        if self.layout_cache:
+            self.store_layout({"row": row_layout, "column": col_layout, "samples": self.get_layout_samples(df_sheet, row_layout, col_layout),
+                               "key": naming_key, "columns": df_vehicle.columns.copy(), "index_name": df_vehicle.index.name,
+                               "double_metadata": self.double_metadata, "sets_double": self.double_metadata and not double_metadata})
+        if self.metadata_names is not None:
+            df_vehicle, df_pattern = self.project_columns(df_vehicle, df_rows)
+        df_vehicle = self.drop_empty_rows(df_vehicle)    # drop all rows showing only NaN values
         
         return df_vehicle, df_pattern
     
@@ -959,19 +3043,219 @@ class xlsxParser():
         data_path -> str
             Path to the xlsx file'''
         print('-------- Read file: '+data_path+' --------')
-        excel_file = pd.ExcelFile(data_path)
-        sheet_names = [(id, sheet) for id, sheet in enumerate(excel_file.sheet_names) if sheet.startswith('Fzg')]
-
-        dfs = {sheet: excel_file.parse(sheet, header=None) for id, sheet in sheet_names}
-        matches = {sheet: self.find_string_in_dataframe(dfs[sheet]) for id, sheet in sheet_names}
-
         if self.recog_format: # format = true?
-            dfs = self.get_data_formatting(sheet_names, excel_file, data_path, matches)
+            dfs = self.get_data_formatting(data_path)
         else:
+            excel_file = pd.ExcelFile(data_path)
+            sheet_names = [(id, sheet) for id, sheet in enumerate(excel_file.sheet_names) if sheet.startswith('Fzg')]
             dfs = {sheet: excel_file.parse(sheet, header=None) for id, sheet in sheet_names}
 
         return dfs
 
+    start_queue = None      # set in the worker processes of read_files
+    pool_workers = None     # number of worker processes of read_files (set in its workers, see get_decode_workers)
+
+    @staticmethod
+    def init_worker(start_queue, pool_workers=None):
+        '''Initializer of the worker processes of read_files: the workers report each file they start to the queue.
+
+        Attributes:
+        start_queue -> multiprocessing.SimpleQueue
+            Queue of the started files (path, process ID of the worker).
+        pool_workers -> int
+            Number of worker processes of read_files.'''
+        xlsxParser.start_queue = start_queue
+        xlsxParser.pool_workers = pool_workers
+
+    def get_decode_workers(self):
+        '''Return the number of worker processes decoding the row partitions of a worksheet (decode_workers). In a
+        worker of read_files the pools are nested: each of its workers may only use its share of the CPUs, so at most
+        about os.cpu_count() processes decode at the same time.'''
+        if self.decode_workers is None or self.pool_workers is None:
+            return self.decode_workers
+        share = (os.cpu_count() or 1) // self.pool_workers
+        return min(self.decode_workers, share) if share > 1 else None
+
+    def process_file(self, data_path) -> dict:
+        '''Read and clean all 'Fzg' sheets of a file (see read_data and data_cleaning). Errors are returned instead of
+        raised, so one bad workbook does not stop a batch (see read_files).
+
+        Attributes:
+        data_path -> str
+            Path to the xlsx file.'''
+        if self.start_queue is not None:
+            self.start_queue.put((data_path, os.getpid()))     # synchronous: arrives even if the worker crashes afterwards
+        start = time.perf_counter()
+        try:
+            cache_key = self.get_cache_key(data_path) if self.cache_folder is not None else None
+            result = self.load_cache(cache_key, data_path) if cache_key is not None else None
+            if result is None:
+                dfs = self.read_data(data_path)
+                result = {sheet: self.data_cleaning(df, data_path, sheet) for sheet, df in dfs.items()}    # sheet -> (df_vehicle, df_pattern)
+                if cache_key is not None:
+                    self.store_cache(cache_key, result)
+            return {"result": result, "error": None, "time": time.perf_counter() - start}
+        except Exception as error:
+            return {"result": None, "error": f'{type(error).__name__}: {error}\n{traceback.format_exc()}', "time": time.perf_counter() - start}
+
+    def get_cache_key(self, data_path) -> str:
+        '''Return the key of a file in the cache: hash of the file content and of the parser configuration.
+
+        Attributes:
+        data_path -> str
+            Path to the xlsx file.'''
+        file_hash = hashlib.sha256()
+        with open(data_path, 'rb') as f:
+            for block in iter(lambda: f.read(2**20), b''):
+                file_hash.update(block)
+        config = repr((self.color_valid, self.metadata_vertical, self.trigger_metadata, self.double_metadata_config,
+                       self.trigger_double_metadata, self.main_category, self.main_category_pos, self.sub_category,
+                       self.exclude_in_subcategory, self.recog_format, self.native_xls, self.cell_range, self.metadata_names, self.info_patterns))
+        return hashlib.sha256(file_hash.digest() + config.encode()).hexdigest()
+
+    def load_cache(self, cache_key, data_path):
+        '''Return the cached result of process_file (sheet -> (df_vehicle, df_pattern)) or None if not cached.
+
+        Attributes:
+        cache_key -> str
+            Key of the file (see get_cache_key).
+        data_path -> str
+            Path to the xlsx file (the same content may be cached for another path).'''
+        cache_file = os.path.join(self.cache_folder, cache_key + '.pkl')
+        try:
+            with open(cache_file, 'rb') as f:
+                result = pickle.load(f)
+            os.utime(cache_file)    # last use for the eviction
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        for df_vehicle, df_pattern in result.values():
+            df_vehicle['Pfad'] = data_path
+        return result
+
+    def store_cache(self, cache_key, result):
+        '''Store the result of process_file in the cache and remove the least recently used entries if the cache exceeds
+        cache_size.
+
+        Attributes:
+        cache_key -> str
+            Key of the file (see get_cache_key).
+        result -> dict
+            Sheet -> (df_vehicle, df_pattern).'''
+        if not os.path.exists(self.cache_folder):
+            os.makedirs(self.cache_folder, exist_ok=True)
+        cache_file = os.path.join(self.cache_folder, cache_key + '.pkl')
+        temp_file = f'{cache_file}.{os.getpid()}.tmp'     # several workers may write the same entry
+        with open(temp_file, 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, cache_file)
+
+        entries, total_size = [], 0
+        for entry in os.scandir(self.cache_folder):
+            if entry.name.endswith('.pkl'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total_size += stat.st_size
+        for mtime, size, path in sorted(entries):   # least recently used first
+            if total_size <= self.cache_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total_size -= size
+
+    def read_files(self, paths, max_workers=None, timeout=None, poll_interval=0.1) -> dict:
+        '''Read and clean a batch of files (e.g. found by ParallelPathFinder.find_files) in a process pool. Returns the
+        result of process_file for each path: "result" (sheet -> (df_vehicle, df_pattern)) or "error" (message with
+        traceback), and "time" in seconds. The largest files are started first to avoid a slow tail. A file crashing
+        its worker process (e.g. in the JVM) is reported as error; files running at the same time are read again one
+        after the other to find the file that crashed.
+
+        Attributes:
+        paths -> list
+            Paths to the xlsx/xls files.
+        max_workers -> int
+            Number of worker processes (None: number of CPUs).
+        timeout -> float
+            Maximum time in seconds per file. The workers are terminated if a file exceeds it and the unfinished files
+            are started again in a new pool. None: no timeout.
+        poll_interval -> float
+            Interval in seconds to check for finished, crashed and timed out files.'''
+        sizes = {}
+        for path in paths:
+            try:
+                sizes[path] = os.path.getsize(path)
+            except OSError:
+                sizes[path] = 0     # error is reported by the worker
+        pending = sorted(sizes, key=sizes.get, reverse=True)   # largest files first
+        xls_file_paths = [path for path in pending if not path.endswith('.xlsx') and not self.is_native_xls(path) and sizes[path] > 0]
+        if xls_file_paths and self.recog_format:
+            # convert all .xls files in one batch with one JVM; the workers take them from the cache (errors are reported by the workers)
+            self.get_converter(self.get_temp_folder()).convert(xls_file_paths, timeout=timeout)
+            self.close()    # the JVM is not needed by the workers
+        suspects = []       # files running at a crash of a worker: read again one by one
+        results = {}
+
+        while pending or suspects:
+            isolated = not pending
+            batch, workers = (suspects, 1) if isolated else (pending, max_workers)
+            start_queue = multiprocessing.SimpleQueue()
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=xlsxParser.init_worker, initargs=(start_queue, workers or os.cpu_count()))
+            futures = {executor.submit(self.process_file, path): path for path in batch}
+            started = {}    # path -> time the worker started the file
+            worker_pids = set()     # process IDs of the workers which started a file
+            not_done = set(futures)
+            restart = False
+            while not_done and not restart:
+                done, not_done = wait(not_done, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                now = time.perf_counter()
+                while not start_queue.empty():
+                    path, pid = start_queue.get()
+                    started.setdefault(path, now)
+                    worker_pids.add(pid)
+                crashed = False
+                for future in done:
+                    try:
+                        results[futures[future]] = future.result()
+                    except BrokenProcessPool:
+                        crashed = True
+                if crashed:
+                    # a worker died: files started but not finished were running in the workers
+                    running = [path for path in started if path not in results]
+                    if len(running) == 1 or isolated:
+                        for path in running[:1] or [path for path in batch if path not in results][:1]:
+                            results[path] = {"result": None, "error": 'BrokenProcessPool: worker process terminated abruptly', "time": now - started.get(path, now)}
+                    else:   # unknown which file crashed (no file reported: all unfinished files)
+                        suspects += [path for path in running or batch if path not in results and path not in suspects]
+                    restart = True
+                    break
+                if timeout is not None:
+                    for path in [path for path in started if path not in results and now - started[path] > timeout]:
+                        results[path] = {"result": None, "error": f'TimeoutError: file not processed within {timeout} s', "time": now - started[path]}
+                        restart = True
+
+            remaining = [path for path in batch if path not in results and (isolated or path not in suspects)]
+            if isolated:
+                suspects = remaining
+            else:
+                pending = remaining
+            if restart:
+                # ProcessPoolExecutor cannot stop running tasks: the files not started are cancelled, the workers which
+                # started a file are terminated (child processes of this process, portable) and the remaining files
+                # are started again in a new pool
+                for future in futures:
+                    future.cancel()
+                while not start_queue.empty():      # files started since the last check
+                    worker_pids.add(start_queue.get()[1])
+                for process in multiprocessing.active_children():
+                    if process.pid in worker_pids:
+                        process.terminate()
+                executor.shutdown(wait=False, cancel_futures=True)
+            else:
+                executor.shutdown()
+
+        return {path: results[path] for path in paths}
+
     def get_color_palette(self, file_path):
         '''Get the color palette of the xlsx file.
         
@@ -1040,269 +3324,690 @@ class xlsxParser():
                     return True
             return False
 
+    def is_native_xls(self, data_path) -> bool:
+        '''Return True if a file is decoded with xlsDecoder instead of being converted to .xlsx.
+
+        Attributes:
+        data_path -> str
+            Path to the file.'''
+        return self.native_xls and os.path.splitext(data_path)[1].lower() == '.xls'
+
+    def get_converter(self, target_folder, extension='converted.xlsx'):
+        '''Return the conversion service of .xls files of this process (see xlsConverter).
+
+        Attributes:
+        target_folder -> str
+            Path to the target folder (cache of the converted files).
+        extension -> str
+            Extension of the converted file.'''
+        if self.converter is None or (self.converter.cache_folder, self.converter.extension) != (target_folder, extension):
+            if self.converter is not None:
+                self.converter.close()
+            self.converter = xlsConverter(cache_folder=target_folder, extension=extension)
+        return self.converter
+
+    def close(self):
+        '''Stop the conversion service of .xls files (JVM subprocess, see xlsConverter). It is started again by the next
+        conversion.'''
+        if self.converter is not None:
+            self.converter.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def get_temp_folder(self):
+        '''Return the folder of the converted .xls files (created if it does not exist).'''
+        folder = self.get_log_folder()
+        if not os.path.exists(folder+r'\temp'):
+            os.makedirs(folder+r'\temp')
+        return folder+r'\temp'
+
     def convert_xls2xlsx(self,xls_file_path,target_folder,extension='converted.xlsx'):
-        '''Convert .xls file to .xlsx file.
+        '''Convert .xls file to .xlsx file. The conversion service (see xlsConverter) keeps the JVM running for all files
+        of this process; files converted before are taken from target_folder.
         
         Attributes:
         xls_file_path -> str
             Path to the .xls file.
         target_folder -> str
-            Path to the target folder.
+            Path to the target folder (cache of the converted files).
         extension -> str
             Extension of the converted file.'''
-        jpype.startJVM() 
-        from asposecells.api import Workbook
-
         print(f'xls_file_path: {xls_file_path}')
-        # load .xls file in path
-        workbook = Workbook(xls_file_path)
-
-        filename_with_extension = os.path.basename(xls_file_path)
-        filename, _ = os.path.splitext(filename_with_extension)
-        filename = filename+'_'+extension
-        xlsx_file_path = os.path.join(target_folder, filename)
+        xlsx_file_path = self.get_converter(target_folder, extension).convert([xls_file_path])[xls_file_path]
+        if isinstance(xlsx_file_path, Exception):
+            raise xlsx_file_path
         print(f'xlsx_file_path: {xlsx_file_path}')
 
-        # save .xls as .xlsx file
-        workbook.save(xlsx_file_path)
-        # shut down JVM
-        jpype.shutdownJVM()
-
         return xlsx_file_path
 
-    def get_data_formatting(self, sheet_names, excel_file, data_path, matches):
-        '''Get the data formatting of the xlsx file.
+    def find_trigger_in_cells(self, cell_store):
+        '''Find the trigger of metadata in the decoded cells. Returns the matches as (row, column) with 0-based indices
+        in the same order as find_string_in_dataframe (column-wise).
+
+        Attributes:
+        cell_store -> xlsxCellStore
+            Decoded cells of a worksheet (see xlsxDecoder.decode_columnar).'''
+        text_types = [id for id, cell_type in enumerate(cell_store.types) if cell_type in ('s', 'str')]
+        matches = []
+        for pos in np.flatnonzero(np.isin(cell_store.type_ids, text_types)):
+            value = cell_store.get_value(pos)
+            if value and ''.join(str(sub_value) for sub_value in value) == self.trigger_metadata:
+                matches.append((int(cell_store.rows[pos]), int(cell_store.columns[pos])))
+        return sorted(matches, key=lambda match: (match[1], match[0]))
+
+    def get_sheet_range(self, decoder, sheet_nr, logger):
+        '''Return the cell range to be decoded of a sheet (see cell_range). For 'trigger' the block of the last used
+        layout is taken: from the category column left of the metadata names to the last cell of the trigger row. Only
+        the rows up to the trigger row are parsed to find this cell. None (all cells) if no layout is known or the
+        trigger row is empty.
+
+        Attributes:
+        decoder -> xlsxDecoder
+            Decoder of the workbook.
+        sheet_nr -> int
+            Number of the sheet to be read.
+        logger -> logging.Logger
+            Logger object.'''
+        if self.cell_range != 'trigger':
+            return self.cell_range
+        if not self.layout_cache or not self.layouts:
+            return None
+        layout = self.layouts[0]
+        first_col = max(layout['column'] + min(-1, self.main_category_pos), 0) + 1     # 1-based
+        trigger_row = decoder.decode_columnar(sheet_nr, logger, cell_range=(layout['row'] + 1, first_col, layout['row'] + 1, decoder.max_columns))
+        if len(trigger_row) == 0:
+            return None
+        return (1, first_col, decoder.max_rows, int(trigger_row.columns.max()) + 1)
+
+    def filter_cell_value(self, cell_format, trigger_cell, logger):
+        '''Return the valid value of a decoded cell and if the cell is kept. A value is valid if its color is valid and
+        it is not struck out. Cells in the row of the trigger of metadata, in its column and the column left of it are
+        kept regardless of their format.
+
+        Attributes:
+        cell_format -> dict
+            Decoded cell (see xlsxDecoder.decoder).
+        trigger_cell -> bool
+            True if the cell is in the row or columns of the trigger of metadata.
+        logger -> logging.Logger
+            Logger object.'''
+        values = cell_format['value']
+        styles = cell_format['style'] if isinstance(cell_format['style'], list) else []
+        if values is np.nan or values is None:
+            return True, None
+
+        trace = logger.isEnabledFor(logging.DEBUG)     # no record is built in the hot loop if tracing is off
+        cell_valid_values = []
+        for id, sub_value in enumerate(values):
+            style = styles[id] if id < len(styles) and isinstance(styles[id], dict) else {}     # no style: standard font
+            if trigger_cell:
+                if trace:
+                    logger.debug('Investigating Subvalue: %s', sub_value)
+                    logger.debug('Trigger of metadata found! Format of value not of interest!')
+                cell_valid_values.append(sub_value)
+            elif not self.is_color_valid(style.get('color')):
+                if trace:
+                    logger.debug('Investigating Subvalue: %s', sub_value)
+                    logger.debug('Color is valid?: False')
+                    logger.debug('Color found: %s', style.get('color'))
+            elif style.get('strike', False):
+                if trace:
+                    logger.debug('Investigating Subvalue: %s', sub_value)
+                    logger.debug('Color is valid?: True')
+                    logger.debug('Struck out?: True')
+            else:
+                if trace:
+                    logger.debug('Investigating Subvalue: %s', sub_value)
+                    logger.debug('Color is valid?: True')
+                    logger.debug('Struck out?: False')
+                cell_valid_values.append(sub_value)
+
+        if len(values) > 1:  # nested values of different styles in selected cell
+            cell_valid_values = ' '.join(cell_valid_values) # join by spaces
+            cell_valid_values = ' '.join(cell_valid_values.split()) # remove double spaces if exist
+            cell_valid_values = cell_valid_values.replace('\n','').replace('\r', '') # remove syntax commands
+            if trace:
+                logger.debug('Valid Values in cell: %s', cell_valid_values)
+            return True, cell_valid_values
+        if cell_valid_values:
+            if trace:
+                logger.debug('Valid Value in cell: %s', cell_valid_values[0])
+            return True, cell_valid_values[0]
+        return False, None
+
+    def is_color_valid(self, color) -> bool:
+        '''Cached compare_font_color: a workbook only has a few distinct colors compared with its cells.
+
+        Attributes:
+        color -> list
+            RGB-values of the color.'''
+        key = tuple(color) if isinstance(color, (list, tuple)) else color
+        valid = self.color_valid_cache.get(key)
+        if valid is None:
+            valid = self.color_valid_cache[key] = self.compare_font_color(color)
+        return valid
+
+    def get_style_validity(self, styles):
+        '''Return the color validity and the strike flag of each interned style list of a cell store (style of the first
+        value of a cell).
+
+        Attributes:
+        styles -> list
+            Interned style lists (see xlsxCellStore).'''
+        color_valid = np.ones(len(styles), dtype=bool)
+        struck_out = np.zeros(len(styles), dtype=bool)
+        for id, style in enumerate(styles):
+            first_style = style[0] if isinstance(style, list) and style and isinstance(style[0], dict) else {}     # no style: standard font
+            color_valid[id] = self.is_color_valid(first_style.get('color'))
+            struck_out[id] = bool(first_style.get('strike', False))
+        return color_valid, struck_out
+
+    def get_trigger_mask(self, cell_store, row_trigger, col_trigger):
+        '''Return the mask of cells kept regardless of their format: row of the trigger of metadata, its column and the
+        column left of it.
+
+        Attributes:
+        cell_store -> xlsxCellStore
+            Decoded cells of a worksheet.
+        row_trigger -> int
+            Row of the trigger of metadata (0-based, None if not found).
+        col_trigger -> int
+            Column of the trigger of metadata (0-based, None if not found).'''
+        if row_trigger is None:
+            return np.zeros(len(cell_store), dtype=bool)
+        return (cell_store.rows == row_trigger) | (cell_store.columns == col_trigger - 1) | (cell_store.columns == col_trigger)
+
+    def get_audit_table(self, cell_store, sheet_name, row_trigger, col_trigger, keep, values):
+        '''Return the keep/drop decision of every cell of a worksheet as dataframe. The table is built column by column
+        from the cell store, one row per cell: sheet, row and column (0-based as in the dataframe), value (runs of rich
+        text joined by spaces), type (cell type of the sheet as in the cell store, e.g. "s" shared string, "b" boolean,
+        None for a number), color (hex RGB, None for the standard font) and strike of the run deciding the cell,
+        trigger (exempt from the format check), keep and valid_value (value in the filtered dataframe). The deciding
+        run is the first run kept in valid_value (see filter_cell_value), or the first run if no run is kept or the
+        cell is a trigger cell.
+
+        Attributes:
+        cell_store -> xlsxCellStore
+            Decoded cells of a worksheet.
+        sheet_name -> str
+            Name of the worksheet.
+        row_trigger -> int
+            Row of the trigger of metadata (0-based, None if not found).
+        col_trigger -> int
+            Column of the trigger of metadata (0-based, None if not found).
+        keep -> np.ndarray
+            Mask of kept cells (see filter_cells).
+        values -> np.ndarray
+            Valid values of the cells (see filter_cells).'''
+        # color and strike once per style: first run and first kept run (rich text)
+        style_colors, struck_out = [[], []], np.zeros((2, len(cell_store.styles)), dtype=bool)
+        for id, style in enumerate(cell_store.styles):
+            runs = [run if isinstance(run, dict) else {} for run in style] if isinstance(style, list) and style else [{}]    # no style: standard font
+            kept_runs = [run for run in runs if self.is_color_valid(run.get('color')) and not run.get('strike', False)]
+            for deciding, run in enumerate((runs[0], (kept_runs or runs)[0])):
+                color = run.get('color')
+                style_colors[deciding].append('#%02x%02x%02x' % tuple(color[:3]) if isinstance(color, (list, tuple)) and len(color) >= 3 else None)
+                struck_out[deciding, id] = bool(run.get('strike', False))
+        color_names = sorted({color for colors in style_colors for color in colors if color is not None})
+        color_codes = np.array([[color_names.index(color) if color is not None else -1 for color in colors] for colors in style_colors], dtype=np.int32)
+        trigger = self.get_trigger_mask(cell_store, row_trigger, col_trigger)
+        deciding = (~trigger).astype(np.intp)       # trigger cells: all runs kept, first run
+
+        # value and valid value as text: the cell type tells how to read them back (e.g. "1" of a number or a text)
+        type_names = sorted({cell_type for cell_type in cell_store.types if cell_type is not None})
+        type_codes = np.array([type_names.index(cell_type) if cell_type is not None else -1 for cell_type in cell_store.types], dtype=np.int32)
+        cell_values = cell_store.get_first_values()
+        for pos in np.flatnonzero(cell_store.get_value_counts() > 1):    # rich text: all runs
+            cell_values[pos] = ' '.join(str(value) for value in cell_store.get_value(pos))
+
+        return pd.DataFrame({
+            'sheet': pd.Categorical.from_codes(np.zeros(len(cell_store), dtype=np.int8), categories=[sheet_name]),
+            'row': cell_store.rows,
+            'column': cell_store.columns,
+            'value': pd.array(cell_values, dtype='string'),
+            'type': pd.Categorical.from_codes(type_codes[cell_store.type_ids], categories=type_names),
+            'color': pd.Categorical.from_codes(color_codes[deciding, cell_store.style_ids], categories=color_names),
+            'strike': struck_out[deciding, cell_store.style_ids],
+            'trigger': trigger,
+            'keep': keep,
+            'valid_value': pd.array(np.where(keep, values, None), dtype='string'),
+        })
+
+    def write_audit_table(self, audit_table, data_path):
+        '''Write the audit table of a workbook as Parquet file in audit_folder.
+
+        Attributes:
+        audit_table -> pd.DataFrame
+            Audit table of the workbook (see get_audit_table).
+        data_path -> str
+            Path to the xlsx file.'''
+        filename, ext = os.path.splitext(os.path.basename(data_path))
+        subfolder = os.path.basename(os.path.dirname(data_path))
+        if not os.path.exists(self.audit_folder):
+            os.makedirs(self.audit_folder)
+        audit_file = os.path.join(self.audit_folder, 'audit_folder-'+subfolder+'_file-'+filename+'-'+ext[1:]+'.parquet')
+        audit_table.to_parquet(audit_file, index=False)
+        return audit_file
+
+    def filter_cells(self, cell_store, row_trigger, col_trigger, logger):
+        '''Return the mask of kept cells and their valid values for a whole worksheet. Color validity and strike flag are
+        computed once per style and applied to all cells as boolean mask; only cells with rich text runs of different
+        styles are filtered one by one (see filter_cell_value).
+
+        Attributes:
+        cell_store -> xlsxCellStore
+            Decoded cells of a worksheet.
+        row_trigger -> int
+            Row of the trigger of metadata (0-based, None if not found).
+        col_trigger -> int
+            Column of the trigger of metadata (0-based, None if not found).
+        logger -> logging.Logger
+            Logger object.'''
+        n_values = cell_store.get_value_counts()
+        color_valid, struck_out = self.get_style_validity(cell_store.styles)
+        color_valid, struck_out = color_valid[cell_store.style_ids], struck_out[cell_store.style_ids]
+        trigger_cell = self.get_trigger_mask(cell_store, row_trigger, col_trigger)
+
+        keep = (n_values != 1) | trigger_cell | (color_valid & ~struck_out)
+        values = np.where(n_values == 1, cell_store.get_first_values(), None)
+
+        trace = logger.isEnabledFor(logging.DEBUG)
+        cell_logger = TraceBatch() if trace else logger     # per-cell records of the sheet logged as one record
+        cell_logger.debug('Start reading cell data according to valid format. Check:')
+        cell_logger.debug('1. Is color valid? If YES then do 2. If NO do not consider those values and check the next cell.')
+        cell_logger.debug('2. Are the values struck out? If NO consider values. If YES do not consider values.')
+        for pos in np.flatnonzero(n_values > 1):    # nested values of different styles in selected cell
+            if trace:
+                cell_ref = cell_store.get_cell_ref(pos)
+                cell_logger.debug('--------------------------------------')
+                cell_logger.debug('Read cell: %s', cell_ref)
+                cell_logger.debug('Values with different styles found in cell %s.', cell_ref)
+            _, values[pos] = self.filter_cell_value(cell_store.get_cell(pos), bool(trigger_cell[pos]), cell_logger)
+        if trace:
+            for pos in np.flatnonzero(n_values == 1):
+                cell_ref = cell_store.get_cell_ref(pos)
+                cell_logger.debug('--------------------------------------')
+                cell_logger.debug('Read cell: %s', cell_ref)
+                cell_logger.debug('Value: %s', values[pos])
+                if trigger_cell[pos]:
+                    cell_logger.debug('Trigger of metadata found! Format of value not of interest!')
+                else:
+                    cell_logger.debug('Color is valid?: %s', color_valid[pos])
+                    cell_logger.debug('Color found: %s', cell_store.styles[cell_store.style_ids[pos]])
+                    cell_logger.debug('Struck out?: %s', struck_out[pos])
+                cell_logger.debug('Valid Value in cell: %s', values[pos] if keep[pos] else None)
+            logger.debug(cell_logger)
+
+        return keep, values
+
+    def get_data_formatting(self, data_path):
+        '''Get the data formatting of the xlsx file. The file is read once from disk and every 'Fzg' sheet is decoded
+        in a single pass: the filtered dataframe is built directly from the decoded cells. If audit is set, the
+        keep/drop decisions of all cells are held in audit_table (and written to audit_folder). Sheets of which only
+        the rows of the wanted metadata were decoded are held with their projection in projections.
         
         Attributes:
-        sheet_names -> list
-            List of sheet names.
-        excel_file -> pd.ExcelFile
-            Excel file.
         data_path -> str
-            Path to the xlsx file.
-        matches -> list
-            List of matches.'''
-        user = os.environ['USERPROFILE']
-        if not os.path.exists(user+r'\.bigbrems'):
-            os.makedirs(user+r'\.bigbrems')
-        if not os.path.exists(user+r'\.bigbrems\logs'):
-            os.makedirs(user+r'\.bigbrems\logs')
-        if not os.path.exists(user+r'\.bigbrems\logs\endu_nvh'):
-            os.makedirs(user+r'\.bigbrems\logs\endu_nvh')
-        folder = user+r'\.bigbrems\logs\endu_nvh'
+            Path to the xlsx file.'''
+        self.projections = {}
         filename_with_extension = os.path.basename(data_path)
         filename, ext = os.path.splitext(filename_with_extension)
 
         subfolder = os.path.basename(os.path.dirname(data_path))
-        
-        if not os.path.exists(folder+r'\temp'):
-            os.makedirs(folder+r'\temp')
-        temp_dir = folder+r'\temp'
 
         dfs = {}
-        if not data_path.endswith('.xlsx'):
+        audit_tables = []
+        source_path = data_path
+        native_xls = self.is_native_xls(data_path)
+        if not data_path.endswith('.xlsx') and not native_xls:
             # NEW (convert to XLSX file)
+            temp_dir = self.get_temp_folder()
             print('File found in XLS format. Converting and reading again.')
             data_path = self.convert_xls2xlsx(xls_file_path=data_path, target_folder=temp_dir)
-            excel_file = pd.ExcelFile(data_path)
-            sheet_names = [(id, sheet) for id, sheet in enumerate(excel_file.sheet_names) if sheet.startswith('Fzg')]
-            dfs = {sheet: excel_file.parse(sheet, header=None) for id, sheet in sheet_names}
-            matches = {sheet: self.find_string_in_dataframe(dfs[sheet]) for id, sheet in sheet_names}
 
-            
-        workbook = load_workbook(excel_file, data_only=True)
-        for id, sheet_name in sheet_names:
-            match_trigger_metadata = matches[sheet_name]
-            for row_skip_trigger_metadata, col_skip_trigger_metadata in match_trigger_metadata:
-                break
+        # read the zip file only once
+        with open(data_path, 'rb') as f:
+            xlsx_file = io.BytesIO(f.read())
+        # one decoder per workbook: shared strings, styles and themes are parsed once for all sheets, the pool of the row partitions is stopped at the end
+        with (xlsDecoder(xls_file=xlsx_file) if native_xls else xlsxDecoder(xlsx_file=xlsx_file, style_cache_folder=self.style_cache_folder,
+                                                                         max_workers=self.get_decode_workers(), engine=self.xml_engine,
+                                                                         source_path=data_path)) as xls_object:
+            sheet_names = [(id, sheet) for id, sheet in enumerate(xls_object.get_sheet_names()) if sheet.startswith('Fzg')]
+
+            for id, sheet_name in sheet_names:
+                log_path = None
+                if self.trace:
+                    log_file_name = 'log_folder-'+subfolder+'_file-'+filename+'-'+ext[1:]+'_sheet-'+sheet_name+'.log'
+                    log_path = os.path.join(self.get_log_folder(), log_file_name)
+                logger = self.setup_logger(log_path)
+                logger.info('Funktion FORMATIERUNG gestartet')
+                print(f'Read sheet: {sheet_name}')
+                logger.debug('Read sheet: %s', sheet_name)
+
+                # NEW: use xlsxDecoder class
+                sheet_range = self.get_sheet_range(xls_object, id+1, logger)
+                projection, df = None, None
+                if self.metadata_names is not None and self.metadata_vertical and self.layout_cache and self.layouts:
+                    # wanted metadata: the naming columns are decoded first, then only the rows of these metadata of a known naming
+                    naming_range = self.get_naming_range(xls_object, id+1, sheet_range, self.layouts[0])
+                    cell_store = xls_object.decoder(sheet_nr = id+1, logger = logger, columnar = True, cell_range = naming_range)
+                    layout = self.match_layout(lambda row, col: self.get_store_text(cell_store, row, col))
+                    if layout is not None and self.get_naming_range(xls_object, id+1, sheet_range, layout) == naming_range:
+                        row_skip_trigger_metadata, col_skip_trigger_metadata = layout['row'], layout['column']
+                        filtered_cells = [(cell_store,) + self.filter_cells(cell_store, row_skip_trigger_metadata, col_skip_trigger_metadata, logger)]
+                        naming_key = self.get_frame_naming_key(self.get_filtered_frame(filtered_cells), row_skip_trigger_metadata, col_skip_trigger_metadata)
+                        projection = self.get_known_layout(row_skip_trigger_metadata, col_skip_trigger_metadata, naming_key)
+                    if projection is not None:
+                        sheet_rows = self.get_projection_rows(projection)
+                        logger.debug('Known naming of layout: decode rows %s', sorted(sheet_rows))
+                        cell_store = xls_object.decoder(sheet_nr = id+1, logger = logger, columnar = True, cell_range = sheet_range, rows = sheet_rows)
+                        filtered_cells.append((cell_store,) + self.filter_cells(cell_store, row_skip_trigger_metadata, col_skip_trigger_metadata, logger))
+                    else:
+                        logger.debug('Naming in columns %s not known: decode all rows', naming_range)
 
-            sheet_select = workbook[sheet_name]
-            log_file_name = 'log_folder-'+subfolder+'_file-'+filename+'-'+ext[1:]+'_sheet-'+sheet_name+'.log'
-            log_path = os.path.join(folder, log_file_name)
-            logger = self.setup_logger(log_path)
-            logger.info('Funktion FORMATIERUNG gestartet')
-            print(f'Read sheet: {sheet_name}')
-            logger.debug(f'Read sheet: {sheet_name}')
-            
-            # Dataframe for filtered data
-            filtered_data = []
-
-            # NEW: use xlsxDecoder class
-            xls_object = xlsxDecoder(xlsx_file=data_path)
-            cell_data = xls_object.decoder(sheet_nr = id+1, logger = logger)    # +1 since enumerate starts with index = 0
-            logger.debug('Start reading cell data according to valid format. Check:')
-            logger.debug('1. Is color valid? If YES then do 2. If NO do not consider those values and check the next cell.')
-            logger.debug('2. Are the values struck out? If YES consider values. If NO do not consider values.')
-            for row in sheet_select.iter_rows():
-                filtered_row = []
-                for cell in row:
-                    logger.debug('--------------------------------------')
-                    cell_coordinate = cell.coordinate
-                    logger.debug(f'Read cell: {cell.coordinate}')
-                
-                    if cell_coordinate not in cell_data.keys():
-                        logger.debug(f'Cell {cell.coordinate} not in range of active cells in the given row.')
-                        continue
+                if projection is None:
+                    cell_store = xls_object.decoder(sheet_nr = id+1, logger = logger, columnar = True, cell_range = sheet_range)    # +1 since enumerate starts with index = 0
 
-                    # Check the cell of valid coloring and struck outs
-                    cell_format = cell_data[cell_coordinate]
-                    if cell_format['value'] is np.nan or cell_format['value'] is None:
-                        filtered_row.append(None)
-                    elif len(cell_format['value']) > 1:  # nested values of different styles in selected cell
-                        logger.debug(f'Values with different styles found in cell {cell_coordinate}.')
-                        logger.debug(f"Values: {cell_format['value']}")
-                        cell_valid_values = []
-                        for id, sub_value in enumerate(cell_format['value']):
-                            logger.debug(f"Investigating Subvalue: {sub_value}")
-                            if self.compare_font_color(cell_format['style'][id]['color']):
-                                logger.debug('Color is valid?: True')
-                                logger.debug(f"Color found: {cell_format['style'][id]['color']}")
-                                if not cell_format['style'][id]['strike']:
-                                    logger.debug('Struck out?: False')
-                                    cell_valid_values.append(sub_value)
-                                    if cell.row == row_skip_trigger_metadata + 1 or cell.column == col_skip_trigger_metadata or cell.column == col_skip_trigger_metadata + 1:
-                                        logger.debug('Trigger of metadata found! Format of value not of interest!')
-                                else:
-                                    if cell.row == row_skip_trigger_metadata + 1 or cell.column == col_skip_trigger_metadata or cell.column == col_skip_trigger_metadata + 1:
-                                        cell_valid_values.append(sub_value)
-                                        logger.debug('Trigger of metadata found! Format of value not of interest!')
-                                    else:
-                                        logger.debug('Struck out?: True')
-                            else:
-                                if cell.row == row_skip_trigger_metadata + 1 or cell.column == col_skip_trigger_metadata or cell.column == col_skip_trigger_metadata + 1:
-                                    filtered_row.append(cell_format['value'])
-                                    logger.debug('Trigger of metadata found! Format of value not of interest!')
-                                else:
-                                    logger.debug('Color is valid?: False')
-                                    logger.debug(f"Color found: {cell_format['style'][id]['color']}")
-
-                        cell_valid_values = ' '.join(cell_valid_values) # join by spaces
-                        cell_valid_values = ' '.join(cell_valid_values.split()) # remove double spaces if exist
-                        cell_valid_values = cell_valid_values.replace('\n','').replace('\r', '') # remove syntax commands
-                        filtered_row.append(cell_valid_values)
-                        logger.debug(f"Valid Values in cell: {cell_valid_values}")
+                    # row and column of the trigger of metadata (0-based as in the dataframe)
+                    layout, filtered_cells, df = self.match_store_layout(cell_store, logger) if self.layout_cache else (None, None, None)
+                    if layout is not None:
+                        row_skip_trigger_metadata, col_skip_trigger_metadata = layout['row'], layout['column']
+                        logger.debug('Known layout: trigger of metadata in row %s, column %s', layout['row'], layout['column'])
                     else:
-                        logger.debug(f"Value: {cell_format['value']}")
-                        if self.compare_font_color(cell_format['style'][0]['color']):
-                            logger.debug('Color is valid?: True')
-                            logger.debug("Color found: {cell_format['style'][0]['color']}")
-                            if not cell_format['style'][0]['strike']:
-                                logger.debug('Struck out?: False')
-                                filtered_row.append(cell_format['value'][0])
-                                if cell.row == row_skip_trigger_metadata + 1 or cell.column == col_skip_trigger_metadata or cell.column == col_skip_trigger_metadata + 1:
-                                    logger.debug('Trigger of metadata found! Format of value not of interest!')
-                            else:
-                                if cell.row == row_skip_trigger_metadata + 1 or cell.column == col_skip_trigger_metadata or cell.column == col_skip_trigger_metadata + 1:
-                                    filtered_row.append(cell_format['value'][0])
-                                    logger.debug('Trigger of metadata found! Format of value not of interest!')
-                                else:
-                                    logger.debug('Struck out?: True')
-                        else:
-                            if cell.row == row_skip_trigger_metadata + 1 or cell.column == col_skip_trigger_metadata or cell.column == col_skip_trigger_metadata + 1:
-                                filtered_row.append(cell_format['value'][0])
-                                logger.debug('Trigger of metadata found! Format of value not of interest!')
-                            else:
-                                logger.debug('Color is valid?: False')
-                                logger.debug("Color found: {cell_format['style'][0]['color']}")
-                        logger.debug(f"Valid Value in cell: {cell_format['value'][0]}")
-                filtered_data.append(filtered_row)
+                        if self.cell_range == 'trigger' and sheet_range is not None:
+                            logger.debug('Layout not found in block %s: decode all cells', sheet_range)
+                            cell_store = xls_object.decoder(sheet_nr = id+1, logger = logger, columnar = True)
+                        row_skip_trigger_metadata, col_skip_trigger_metadata = None, None
+                        for row_skip_trigger_metadata, col_skip_trigger_metadata in self.find_trigger_in_cells(cell_store):
+                            break
+                        filtered_cells = [(cell_store,) + self.filter_cells(cell_store, row_skip_trigger_metadata, col_skip_trigger_metadata, logger)]
+
+                if df is None:
+                    df = self.get_filtered_frame(filtered_cells)
+                if projection is not None:
+                    self.projections[sheet_name] = self.get_projected_layout(projection)     # names of the skipped rows are only known by the layout
+                dfs[sheet_name] = df
+                if self.audit:
+                    audit_table = pd.concat([self.get_audit_table(cell_store, sheet_name, row_skip_trigger_metadata, col_skip_trigger_metadata, keep, values)
+                                             for cell_store, keep, values in filtered_cells], ignore_index=True)
+                    audit_tables.append(audit_table.drop_duplicates(['row', 'column'], ignore_index=True))   # naming columns and rows overlap
+
+                logger.info('Funktion erfolgreich abgeschlossen')
+                self.close_logger(logger)
+
+        if self.audit:
+            self.audit_table = pd.concat(audit_tables, ignore_index=True).astype({'sheet': 'category', 'type': 'category', 'color': 'category'}) if audit_tables else None
+            if self.audit_folder is not None and self.audit_table is not None:
+                self.write_audit_table(self.audit_table, source_path)
 
+        return dfs
 
-            # DataFrame aus den gefilterten Daten erstellen
-            df_proper = pd.DataFrame(filtered_data)
-            dfs[sheet_name] = []
-            dfs[sheet_name] = df_proper
-
-            logger.info('Funktion erfolgreich abgeschlossen')
-            handlers = logger.handlers[:]
-            for handler in handlers:
-                handler.close()
-                logger.removeHandler(handler)
+    def get_filtered_frame(self, filtered_cells):
+        '''Return the dataframe of the kept cells of a worksheet. Cells keep their position in the sheet.
 
-        return dfs
+        Attributes:
+        filtered_cells -> list
+            Decoded cells of the worksheet, mask of the kept cells and their values (see filter_cells) as
+            (cell_store, keep, values) per decoded part of the sheet.'''
+        # DataFrame aus den gefilterten Daten erstellen
+        shape = (max(cell_store.rows.max(initial=-1) for cell_store, keep, values in filtered_cells) + 1,
+                 max(cell_store.columns.max(initial=-1) for cell_store, keep, values in filtered_cells) + 1)
+        filtered_data = np.full(shape, np.nan, dtype=object)
+        for cell_store, keep, values in filtered_cells:
+            filtered_data[cell_store.rows[keep], cell_store.columns[keep]] = values[keep]
+        return pd.DataFrame(filtered_data)
 
     def get_dataframe_info(self, df):
-        '''Get the dataframe information.
+        '''Get the dataframe information: the named groups of the patterns (see get_patterns) found in the values of
+        each column. The values of the frame are matched in one pass, each distinct value once; the last value of a
+        column giving a group wins.
         
         Attributes:
         df -> pd.DataFrame
             Dataframe of the xlsx file.'''
-        pattern = self.get_pattern()
-
-        regex = re.compile(pattern)
-        group_names = list(regex.groupindex.keys())
-
-        # # Leeres DataFrame für die extrahierten Werte
-        result_df = pd.DataFrame(index=df.columns.tolist(),columns=group_names)
-
-        # Iteriere über jede Spalte von df
-        for col in df.columns:
-            # Wende das Regex-Pattern auf jede Zeile der Spalte an
-            for idx, value in df[col].items():
-                regex_match = re.match(pattern, str(value))
+        regexes = [re.compile(pattern) for pattern in self.get_patterns()]
+        group_names = list(dict.fromkeys(name for regex in regexes for name in regex.groupindex))
+
+        # # Leeres Array für die extrahierten Werte
+        result = np.full((df.shape[1], len(group_names)), np.nan, dtype=object)
+        if df.size == 0 or not group_names:
+            return pd.DataFrame(result, index=df.columns.tolist(), columns=group_names, dtype=object)
+
+        # distinct values of the stacked frame (as text)
+        codes, texts = pd.factorize(np.frompyfunc(str, 1, 1)(df.to_numpy(dtype=object)).ravel())
+        codes = codes.reshape(df.shape)
+        group_texts = {name: np.full(len(texts), None, dtype=object) for name in group_names}
+        for regex in regexes:
+            for id, text in enumerate(texts):
+                regex_match = regex.match(text)
                 if regex_match:
-                    # Extrahiere die benannten Gruppen und ordne sie den Spalten von result_df zu
-                    group_values = regex_match.groupdict()
-                    for group_name, group_value in group_values.items():
-                        if group_value:  # Nur wenn der Wert nicht None oder leer ist
-                            result_df.iloc()
-                            result_df.at[col, group_name] = group_value
+                    for group_name, group_value in regex_match.groupdict().items():
+                        if group_value and group_texts[group_name][id] is None:     # Nur wenn der Wert nicht None oder leer ist (first pattern wins)
+                            group_texts[group_name][id] = group_value
 
-        return result_df
+        # last row of each column giving the group
+        columns = np.arange(df.shape[1])
+        for id, values in enumerate(group_texts.values()):
+            found = pd.notna(values)[codes]
+            last_row = df.shape[0] - 1 - found[::-1].argmax(axis=0)
+            result[:, id] = np.where(found.any(axis=0), values[codes[last_row, columns]], np.nan)
+
+        return pd.DataFrame(result, index=df.columns.tolist(), columns=group_names, dtype=object)
 
 class ParallelPathFinder():
     '''Class to search for files in a directory and its subdirectories in parallel.'''
 
-    def __init__(self, path, allowed_extensions) -> None:
+    def __init__(self, path, allowed_extensions, name_filter=None, ext_filter=None, max_workers=None, manifest_file=None) -> None:
         '''Initialize the ParallelPathFinder class.
         
         Attributes:
         path -> str
             Path to the directory.
         allowed_extensions -> list
-            List of allowed extensions.'''
+            List of allowed extensions.
+        name_filter -> callable
+            Predicate on the file name (with extension). None: file name starts with "Ausrüstung".
+        ext_filter -> callable
+            Predicate on the extension in lowercase (e.g. ".xlsx"). None: extension in allowed_extensions.
+        max_workers -> int
+            Number of threads listing directories (None: default of ThreadPoolExecutor).
+        manifest_file -> str
+            JSON file of the directory and file modification times of the last search (see rescan). The manifest
+            belongs to the path and the filters it was written with (see get_manifest_key).'''
         self.allowed_extensions = allowed_extensions
         self.path = path
+        self.name_filter = name_filter if name_filter is not None else (lambda name: name.startswith("Ausrüstung"))
+        self.ext_filter = ext_filter if ext_filter is not None else (lambda ext: ext in self.allowed_extensions)
+        self.max_workers = max_workers
+        self.manifest_file = manifest_file
 
-    def search_in_directory(self, directory):
-        '''Search in a directory for files.
+    def scan_directory(self, directory):
+        '''List a directory once (os.scandir) and return the matching files and the subdirectories.
         
         Attributes:
         directory -> str
             Directory to be searched.'''
-        matches = []
+        matches, subdirectories = [], []
         try:
-            for entry in os.listdir(directory):
-                full_path = os.path.join(directory, entry)
-                # Prüfe, ob es eine Datei ist
-                if os.path.isfile(full_path):
-                    # Extrahiere Dateiname und Dateiendung (in Kleinbuchstaben)
-                    name, ext = os.path.splitext(entry)
-                    ext = ext.lower()
-                    # Datei muss mit "Ausrüstung" beginnen und eine erlaubte Excel-Endung haben
-                    if entry.startswith("Ausrüstung") and ext in self.allowed_extensions:
-                        matches.append(full_path)
-        except PermissionError:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    # Dateityp aus dem Verzeichniseintrag (meist ohne zusätzlichen stat-Aufruf)
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.path)
+                    elif entry.is_file():
+                        # Extrahiere Dateiendung (in Kleinbuchstaben)
+                        name, ext = os.path.splitext(entry.name)
+                        # Datei muss den Filtern entsprechen (Standard: beginnt mit "Ausrüstung" und hat eine erlaubte Excel-Endung)
+                        if self.ext_filter(ext.lower()) and self.name_filter(entry.name):
+                            matches.append(entry.path)
+        except (PermissionError, FileNotFoundError):
             # Überspringe Verzeichnisse, auf die nicht zugegriffen werden kann
             pass
-        return matches
+        return matches, subdirectories
+
+    def search_in_directory(self, directory):
+        '''Search in a directory for files.
+        
+        Attributes:
+        directory -> str
+            Directory to be searched.'''
+        return self.scan_directory(directory)[0]
+
+    def iter_files(self):
+        '''Yield the files in the directory and its subdirectories as soon as they are found. Subdirectories are listed
+        in parallel as they are discovered.'''
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            futures = {executor.submit(self.scan_directory, self.path)}
+            while futures:
+                done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    matches, subdirectories = future.result()
+                    # Starte für jedes gefundene Unterverzeichnis einen Suchjob
+                    futures |= {executor.submit(self.scan_directory, directory) for directory in subdirectories}
+                    yield from matches
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
 
     def find_files(self):
         '''Find files in the directory and its subdirectories.'''
-        directories = []
-        # Mit os.walk alle Verzeichnisse sammeln
-        for root, dirs, files in os.walk(self.path):
-            directories.append(root)
-        
-        found_files = []
-        # Verwende ThreadPoolExecutor für parallele I/O-Operationen
-        with ThreadPoolExecutor() as executor:
-            # Starte für jedes Verzeichnis einen Suchjob
-            futures = {executor.submit(self.search_in_directory, directory): directory for directory in directories}
-            
-            for future in as_completed(futures):
-                result = future.result()
-                if result:
-                    found_files.extend(result)
-        
-        return found_files
\ No newline at end of file
+        return list(self.iter_files())
+
+    def get_filter_key(self, predicate) -> str:
+        '''Return a key of a filter predicate which changes with its behavior: module, qualified name, bytecode,
+        constants, defaults, closure values and used global values of a function (a lambda is known by its code),
+        repr() of other callables (e.g. functools.partial). Functions called by the predicate are known by their name
+        only.
+
+        Attributes:
+        predicate -> callable
+            Filter of the file names or extensions.'''
+        def get_value_key(value):
+            # functions, classes and modules by their name, objects without own repr by their type (the repr holds the memory address)
+            if callable(value) or isinstance(value, type(os)):
+                return getattr(value, '__qualname__', getattr(value, '__name__', type(value).__qualname__))
+            return repr(value) if type(value).__repr__ is not object.__repr__ else type(value).__qualname__
+
+        def get_code_parts(code):
+            # nested code objects (e.g. a comprehension) by their content, their repr holds the memory address
+            consts = tuple(get_code_parts(const) if hasattr(const, 'co_code') else repr(const) for const in code.co_consts)
+            return code.co_code, consts, code.co_names
+
+        if getattr(predicate, '__code__', None) is None:
+            return repr(predicate)
+        defaults = tuple(get_value_key(value) for value in predicate.__defaults__ or ())
+        closure = tuple(get_value_key(cell.cell_contents) for cell in predicate.__closure__ or ())
+        names = getattr(predicate, '__globals__', {})
+        global_values = tuple((name, get_value_key(names[name])) for name in predicate.__code__.co_names if name in names)
+        parts = (predicate.__module__, predicate.__qualname__, get_code_parts(predicate.__code__), defaults, closure, global_values)
+        return hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()
+
+    def get_manifest_key(self) -> dict:
+        '''Return everything the matching files of a search depend on: absolute root path, allowed extensions and
+        the keys of name_filter and ext_filter (see get_filter_key).'''
+        return {"path": os.path.abspath(self.path), "allowed_extensions": list(self.allowed_extensions or []),
+                "name_filter": self.get_filter_key(self.name_filter), "ext_filter": self.get_filter_key(self.ext_filter)}
+
+    def load_manifest(self) -> dict:
+        '''Return the manifest of the last search (empty if it does not exist or was written for another path or other
+        filters, see get_manifest_key).'''
+        key = self.get_manifest_key()
+        manifest = {"key": key, "dirs": {}, "files": {}}
+        if self.manifest_file is None or not os.path.exists(self.manifest_file):
+            return manifest
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return manifest
+        if stored.get("key") != key:
+            return manifest     # full search
+        return stored
+
+    def save_manifest(self, manifest):
+        '''Write the manifest (see rescan).
+
+        Attributes:
+        manifest -> dict
+            Directories (mtime, subdirectories, matching files) and files (size, mtime).'''
+        temp_file = self.manifest_file + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(temp_file, self.manifest_file)
+
+    def check_directory(self, directory, known, known_files, check_files=False):
+        '''Return the manifest entry of a directory and size and mtime of its matching files. The mtime of the directory
+        is compared first: an unchanged directory is neither listed nor are its files checked, their entries are taken
+        from the manifest. A changed directory (files added, deleted or renamed) is listed again and its matching
+        files are checked.
+
+        Attributes:
+        directory -> str
+            Directory to be checked.
+        known -> dict
+            Manifest entry of the directory of the last search (None if unknown).
+        known_files -> dict
+            Size and mtime of the files of the last search.
+        check_files -> bool
+            True to check the files of unchanged directories as well (files written in place, see rescan).'''
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except (PermissionError, FileNotFoundError):
+            return None, {}
+        if known is not None and known["mtime"] == mtime:
+            matches, subdirectories = known["files"], known["subdirs"]
+            if not check_files:
+                return known, {path: known_files[path] for path in matches if path in known_files}
+        else:
+            matches, subdirectories = self.scan_directory(directory)
+        files = {}
+        for path in matches:
+            try:
+                stat = os.stat(path)
+            except (PermissionError, FileNotFoundError):
+                continue
+            files[path] = [stat.st_size, stat.st_mtime_ns]
+        return {"mtime": mtime, "subdirs": subdirectories, "files": list(files)}, files
+
+    def rescan(self, check_files=False) -> dict:
+        '''Search the directory and its subdirectories again (see manifest_file). Only directories of which the mtime
+        changed since the last search are listed and their files checked; the subdirectories of an unchanged directory
+        are still checked by their mtime (one stat per directory), as a change in a subdirectory does not change the
+        mtime of its parent. Returns the paths of the files "added", "modified" (size or mtime changed) and "deleted"
+        since the last search; on the first search all files are added.
+
+        Attributes:
+        check_files -> bool
+            True to check size and mtime of every matching file. A file written in place (not saved through a new
+            file and rename, as Excel does) does not change the mtime of its directory and is only reported as
+            modified with check_files.'''
+        manifest = self.load_manifest()
+        known_dirs, known_files = manifest["dirs"], manifest["files"]
+        dirs, files = {}, {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.check_directory, self.path, known_dirs.get(self.path), known_files, check_files): self.path}
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    directory = futures.pop(future)
+                    entry, dir_files = future.result()
+                    if entry is None:
+                        continue
+                    dirs[directory] = entry
+                    files.update(dir_files)
+                    for subdirectory in entry["subdirs"]:
+                        futures[executor.submit(self.check_directory, subdirectory, known_dirs.get(subdirectory), known_files, check_files)] = subdirectory
+
+        changes = {
+            "added": sorted(path for path in files if path not in known_files),
+            "modified": sorted(path for path in files if path in known_files and list(known_files[path]) != files[path]),
+            "deleted": sorted(path for path in known_files if path not in files),
+        }
+        if self.manifest_file is not None:
+            manifest.update(dirs=dirs, files=files)
+            self.save_manifest(manifest)
+        return changes